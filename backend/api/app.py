@@ -1,9 +1,25 @@
 from __future__ import annotations
 
-from fastapi import FastAPI
+from contextlib import asynccontextmanager, suppress
+import asyncio
+import importlib
+import logging
+import os
+
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 
+from api.compression import CompressionMiddleware
 from api.config import settings
+from api.deps import get_query_batcher, get_query_recorder, get_sparql_client
+from api.http_cache import RevalidationMiddleware
+from api.instrumentation import ProfilingMiddleware, RequestMetricsMiddleware
+from api.responses import FastJSONResponse
+from api.warmup import warmup_runner
+from services import llm_service
+from services.llm_scheduler import LLMSaturated
+from services.metrics import REGISTRY
 
 # Routers
 from api.routes_dbpedia_foot import router as dbpedia_foot_router
@@ -14,11 +30,57 @@ from api.routes_ask import router as ask_router
 from api.routes_explain import router as explain_router
 
 
+logger = logging.getLogger(__name__)
+
+# Heavy modules no longer imported at startup (graph metrics, LLM client, similarity
+# index). They are loaded in a background thread once the worker is up, so the
+# first request using them does not pay for the import.
+_DEFERRED_MODULES = ("networkx", "community", "openai", "services.similarity")
+
+
+def _preload_modules() -> None:
+    for name in _DEFERRED_MODULES:
+        try:
+            importlib.import_module(name)
+        except Exception as e:  # optional dependency (python-louvain) missing
+            logger.info("Preload of %s skipped: %s", name, e)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Hot queries recorded by the previous process feed the warm-up job
+    recorder = get_query_recorder()
+    recorder.load(settings.WARMUP_RECORD_PATH)
+
+    if settings.PRELOAD_MODULES:
+        asyncio.get_running_loop().run_in_executor(None, _preload_modules)
+
+    task = None
+    if settings.WARMUP_ENABLED:
+        task = asyncio.create_task(warmup_runner.run_forever())
+
+    try:
+        yield
+    finally:
+        if task is not None:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+        await llm_service.aclose()
+        if recorder.top(1):
+            try:
+                recorder.save(settings.WARMUP_RECORD_PATH)
+            except Exception as e:
+                logger.warning("Could not save recorded queries: %s", e)
+
+
 def create_app() -> FastAPI:
     app = FastAPI(
         title="4IF-WS Foot Explorer API (DBpedia-only)",
         version="1.0.0",
         description="API for exploring football entities using DBpedia SPARQL + graph endpoints.",
+        lifespan=lifespan,
+        default_response_class=FastJSONResponse,
     )
 
     # CORS
@@ -33,6 +95,33 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
 
+    # ETag / Cache-Control / 304 from the cache entries behind each GET response
+    app.add_middleware(RevalidationMiddleware)
+
+    if settings.COMPRESSION_MIN_BYTES > 0:
+        app.add_middleware(
+            CompressionMiddleware,
+            minimum_size=settings.COMPRESSION_MIN_BYTES,
+            gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+            brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+        )
+
+    # Server-Timing / profiles for flagged or sampled requests
+    if settings.PROFILE_TOKEN or settings.PROFILE_SAMPLE_RATE > 0:
+        app.add_middleware(ProfilingMiddleware)
+
+    # Outermost: times the whole request, compression included
+    app.add_middleware(RequestMetricsMiddleware)
+
+    # LLM saturé : on répond tout de suite au lieu de laisser la requête expirer
+    @app.exception_handler(LLMSaturated)
+    async def llm_saturated(request: Request, exc: LLMSaturated):
+        return FastJSONResponse(
+            status_code=503,
+            content={"detail": exc.reason},
+            headers={"Retry-After": str(exc.retry_after)},
+        )
+
     # ✅ Routers (DBpedia-foot + le reste)
     app.include_router(dbpedia_foot_router)
     app.include_router(entity_router)
@@ -57,6 +146,10 @@ def create_app() -> FastAPI:
                 "dbpedia_search": "/dbpedia-foot/search?q=messi&kind=player&lang=fr&limit=20",
                 "entity": "/entity?id=http://dbpedia.org/resource/Lionel_Messi&limit=30",
                 "graph": "/graph?seed=http://dbpedia.org/resource/Lionel_Messi&limit=50",
+                "warmup": "/warmup",
+                "llm": "/llm",
+                "diagnostics": "/diagnostics",
+                "metrics": "/metrics",
             },
         }
 
@@ -64,6 +157,29 @@ def create_app() -> FastAPI:
     async def health():
         return {"status": "ok"}
 
+    @app.get("/warmup", tags=["meta"])
+    async def warmup_status():
+        return {"enabled": settings.WARMUP_ENABLED, **warmup_runner.status.as_dict()}
+
+    @app.get("/diagnostics", tags=["meta"])
+    async def diagnostics():
+        # Per worker, like /metrics: the pid says which one answered
+        return {
+            "pid": os.getpid(),
+            "dbpedia": get_sparql_client().diagnostics(),
+            "query_batcher": get_query_batcher().stats(),
+        }
+
+    @app.get("/metrics", tags=["meta"], response_class=PlainTextResponse)
+    async def metrics():
+        # Prometheus text exposition format. Process-local: with several workers each
+        # scrape sees one of them (see services.metrics.Registry)
+        return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+    @app.get("/llm", tags=["meta"])
+    async def llm_status():
+        return llm_service.scheduler.stats()
+
     return app
 
 
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+from typing import Dict, List, Optional
+import gzip
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli  # optional: pip install brotli
+except Exception:
+    brotli = None
+
+# Only text payloads are worth compressing (images/already compressed bodies are not)
+_COMPRESSIBLE = ("application/json", "text/", "application/javascript", "application/x-ndjson")
+
+
+def _accepted(header: str) -> Dict[str, float]:
+    """
+    Accept-Encoding -> {coding: q}. "identity;q=0" style refusals are kept as q=0.
+    """
+    out: Dict[str, float] = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        out[coding] = q
+    return out
+
+
+class CompressionMiddleware:
+    """
+    Brotli (if the `brotli` package is installed) or gzip for complete responses
+    of at least `minimum_size` bytes, when the client accepts it.
+
+    Streamed bodies (SSE, NDJSON exports) pass through untouched: compressing
+    them would buffer events that the client must see as they are produced.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 5):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def _choose(self, scope: Scope) -> Optional[str]:
+        accepted = _accepted(Headers(scope=scope).get("accept-encoding", ""))
+        if brotli is not None and accepted.get("br", 0) > 0:
+            return "br"
+        if accepted.get("gzip", accepted.get("*", 0)) > 0:
+            return "gzip"
+        return None
+
+    @staticmethod
+    def _weaken_etag(headers: MutableHeaders) -> None:
+        # A strong ETag names the uncompressed bytes. Every response negotiated with an
+        # encoding gets the weak form, so a 304 (no body, never compressed) carries the
+        # same validator as the 200 it revalidates.
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            headers["ETag"] = "W/" + etag
+            if "accept-encoding" not in headers.get("vary", "").lower():
+                headers.add_vary_header("Accept-Encoding")
+
+    def _compress(self, body: bytes, coding: str) -> bytes:
+        if coding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        coding = self._choose(scope)
+        if coding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: List[Message] = []
+        passthrough = False
+
+        async def wrapped_send(message: Message) -> None:
+            nonlocal passthrough
+            if message["type"] == "http.response.start":
+                start.append(message)
+                return
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            # First body message: decide once for the whole response
+            body = message.get("body", b"")
+            headers = MutableHeaders(raw=start[0]["headers"])
+            ctype = headers.get("content-type", "")
+            if (
+                message.get("more_body", False)
+                or len(body) < self.minimum_size
+                or "content-encoding" in headers
+                or not ctype.startswith(_COMPRESSIBLE)
+            ):
+                passthrough = True
+                if "content-encoding" not in headers:
+                    self._weaken_etag(headers)
+                await send(start[0])
+                await send(message)
+                return
+
+            compressed = self._compress(body, coding)
+            headers["Content-Encoding"] = coding
+            headers["Content-Length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+            self._weaken_etag(headers)
+            await send(start[0])
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, wrapped_send)
+
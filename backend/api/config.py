@@ -18,6 +18,13 @@ def _get_float(name: str, default: float) -> float:
         return default
 
 
+def _get_bool(name: str, default: bool) -> bool:
+    raw = os.getenv(name)
+    if raw is None:
+        return default
+    return raw.strip().lower() in ("1", "true", "yes", "on")
+
+
 @dataclass(frozen=True)
 class Settings:
     # DBpedia-only endpoint
@@ -25,15 +32,106 @@ class Settings:
 
     # IA Générative (OpenAI / Mistral / Ollama)
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "ollama").strip()
+    LLM_BASE_URL: str = os.getenv("LLM_BASE_URL", "http://localhost:11434/v1").strip()
+    LLM_MODEL: str = os.getenv("LLM_MODEL", "mistral").strip()
+    LLM_TIMEOUT_S: float = _get_float("LLM_TIMEOUT_S", 30.0)
+    LLM_MAX_CONCURRENCY: int = _get_int("LLM_MAX_CONCURRENCY", 2)
+    # LLM scheduler: waiting generations beyond this depth/deadline get a 503
+    LLM_MAX_QUEUE: int = _get_int("LLM_MAX_QUEUE", 16)
+    LLM_QUEUE_TIMEOUT_S: float = _get_float("LLM_QUEUE_TIMEOUT_S", 10.0)
+
+    # /graph/explain (native Ollama API)
+    OLLAMA_URL: str = os.getenv("OLLAMA_URL", "http://127.0.0.1:11434").strip().rstrip("/")
+    OLLAMA_MODEL: str = os.getenv("OLLAMA_MODEL", "llama3.2:3b").strip()
+    EXPLAIN_TIMEOUT_S: float = _get_float("EXPLAIN_TIMEOUT_S", 60.0)
+    EXPLAIN_CACHE_TTL_S: int = _get_int("EXPLAIN_CACHE_TTL_S", 86400)
+
+    # /ask rule-based pre-classifier (skips the LLM for easy questions)
+    INTENT_RULES_ENABLED: bool = _get_bool("INTENT_RULES_ENABLED", True)
+    INTENT_MIN_CONFIDENCE: float = _get_float("INTENT_MIN_CONFIDENCE", 0.7)
+    GAZETTEER_PATH: str = os.getenv("GAZETTEER_PATH", "data/gazetteer.json").strip()
+
+    # /ask semantic cache: normalized question -> intent, (intent, entity) -> answer
+    ASK_INTENT_CACHE_TTL_S: int = _get_int("ASK_INTENT_CACHE_TTL_S", 86400)
+    ASK_ANSWER_CACHE_TTL_S: int = _get_int("ASK_ANSWER_CACHE_TTL_S", 900)
+    ASK_CACHE_MAX_ITEMS: int = _get_int("ASK_CACHE_MAX_ITEMS", 5000)
+
+    # DBpedia protection: AIMD cap on outstanding requests + circuit breaker
+    DBPEDIA_CONCURRENCY: int = _get_int("DBPEDIA_CONCURRENCY", 8)  # starting limit
+    DBPEDIA_CONCURRENCY_MIN: int = _get_int("DBPEDIA_CONCURRENCY_MIN", 1)
+    DBPEDIA_CONCURRENCY_MAX: int = _get_int("DBPEDIA_CONCURRENCY_MAX", 32)
+    BREAKER_WINDOW_S: float = _get_float("BREAKER_WINDOW_S", 30.0)
+    BREAKER_MIN_REQUESTS: int = _get_int("BREAKER_MIN_REQUESTS", 10)
+    BREAKER_ERROR_RATE: float = _get_float("BREAKER_ERROR_RATE", 0.5)
+    BREAKER_OPEN_S: float = _get_float("BREAKER_OPEN_S", 30.0)
+
+    # Micro-batching of concurrent single-entity queries (one VALUES/UNION query per window)
+    QUERY_BATCH_WINDOW_MS: int = _get_int("QUERY_BATCH_WINDOW_MS", 10)
+    QUERY_BATCH_MAX: int = _get_int("QUERY_BATCH_MAX", 20)
+
+    # Paged bulk queries (LIMIT/OFFSET pages fetched concurrently, e.g. players-clubs edges)
+    PAGE_SIZE: int = _get_int("PAGE_SIZE", 10000)  # DBpedia's Virtuoso returns at most 10k rows per request
+    PAGE_CONCURRENCY: int = _get_int("PAGE_CONCURRENCY", 4)
+    PAGE_MAX_ROWS: int = _get_int("PAGE_MAX_ROWS", 200000)
+
+    # Response compression (br if the brotli package is installed, else gzip), 0 = off
+    COMPRESSION_MIN_BYTES: int = _get_int("COMPRESSION_MIN_BYTES", 1024)
+    COMPRESSION_GZIP_LEVEL: int = _get_int("COMPRESSION_GZIP_LEVEL", 6)
+    COMPRESSION_BROTLI_QUALITY: int = _get_int("COMPRESSION_BROTLI_QUALITY", 5)
+
+    # Request profiling: Server-Timing for requests carrying X-Profile: <token> (empty = off),
+    # plus a random sample of all requests (spans logged); PROFILE_DIR keeps a profile per request
+    PROFILE_TOKEN: str = os.getenv("PROFILE_TOKEN", "").strip()
+    PROFILE_SAMPLE_RATE: float = _get_float("PROFILE_SAMPLE_RATE", 0.0)
+    PROFILE_DIR: str = os.getenv("PROFILE_DIR", "").strip()
+    PROFILE_FORMAT: str = os.getenv("PROFILE_FORMAT", "collapsed").strip().lower()  # collapsed | pstats
+    PROFILE_INTERVAL_MS: int = _get_int("PROFILE_INTERVAL_MS", 5)
 
     # Guard rails
     HTTP_TIMEOUT_S: float = _get_float("HTTP_TIMEOUT_S", 15.0)
+    # Queries longer than this (URL-encoded) are sent as a POST form body, not in the URL
+    SPARQL_GET_MAX_BYTES: int = _get_int("SPARQL_GET_MAX_BYTES", 2048)
     MAX_LIMIT: int = _get_int("MAX_LIMIT", 200)
     DEFAULT_LIMIT: int = _get_int("DEFAULT_LIMIT", 50)
 
+    # Batch endpoints (/entity/batch, /similarity/batch)
+    BATCH_MAX_IDS: int = _get_int("BATCH_MAX_IDS", 50)
+    BATCH_CHUNK_SIZE: int = _get_int("BATCH_CHUNK_SIZE", 10)
+
+    # Row cap for /entity/detail (the detail page shows every property)
+    DETAIL_MAX_ROWS: int = _get_int("DETAIL_MAX_ROWS", 2000)
+
     # Simple cache
     CACHE_TTL_S: int = _get_int("CACHE_TTL_S", 900)  # 15 min
     CACHE_MAX_ITEMS: int = _get_int("CACHE_MAX_ITEMS", 2000)
+    # Multi-worker mode: caches shared by every uvicorn worker through this SQLite file
+    # (WAL), with cross-process single-flight on SPARQL queries. Empty = per-process caches.
+    # /metrics and /diagnostics stay per worker either way
+    SHARED_CACHE_PATH: str = os.getenv("SHARED_CACHE_PATH", "").strip()
+
+    # Similarity index (MinHash/LSH), one <kind>.npz file per entity type
+    SIMILARITY_INDEX_DIR: str = os.getenv("SIMILARITY_INDEX_DIR", "data/similarity").strip()
+    SIMILARITY_NUM_PERM: int = _get_int("SIMILARITY_NUM_PERM", 128)
+    SIMILARITY_BANDS: int = _get_int("SIMILARITY_BANDS", 64)
+
+    # Cache warm-up (startup + optional schedule)
+    WARMUP_ENABLED: bool = _get_bool("WARMUP_ENABLED", False)
+    WARMUP_SEEDS: str = os.getenv(
+        "WARMUP_SEEDS",
+        "http://dbpedia.org/resource/Lionel_Messi,"
+        "http://dbpedia.org/resource/Cristiano_Ronaldo,"
+        "http://dbpedia.org/resource/Paris_Saint-Germain_F.C.,"
+        "http://dbpedia.org/resource/FC_Barcelona,"
+        "http://dbpedia.org/resource/Real_Madrid_CF",
+    ).strip()
+    WARMUP_SEARCHES: str = os.getenv("WARMUP_SEARCHES", "messi,ronaldo,mbappe,psg,barcelona").strip()
+    WARMUP_TOP_N: int = _get_int("WARMUP_TOP_N", 50)  # most frequent recorded queries to replay
+    WARMUP_CONCURRENCY: int = _get_int("WARMUP_CONCURRENCY", 4)
+    WARMUP_INTERVAL_S: int = _get_int("WARMUP_INTERVAL_S", 0)  # 0 = startup only
+    WARMUP_RECORD_PATH: str = os.getenv("WARMUP_RECORD_PATH", "data/hot_queries.json").strip()
+
+    # Import the heavy deferred modules (networkx, openai, numpy...) in the background after startup
+    PRELOAD_MODULES: bool = _get_bool("PRELOAD_MODULES", True)
 
     # CORS (comma-separated list), optional
     # Example: "http://localhost:5500,http://127.0.0.1:5500"
@@ -50,15 +148,77 @@ def _normalize_settings(s: Settings) -> Settings:
     if timeout <= 0:
         timeout = 15.0
 
+    # sanitize MinHash params (bands must divide num_perm)
+    num_perm = max(8, s.SIMILARITY_NUM_PERM)
+    bands = min(max(1, s.SIMILARITY_BANDS), num_perm)
+    while num_perm % bands != 0:
+        bands -= 1
+
+    # sanitize DBpedia concurrency bounds
+    conc_min = max(1, s.DBPEDIA_CONCURRENCY_MIN)
+    conc_max = max(conc_min, s.DBPEDIA_CONCURRENCY_MAX)
+
     # rebuild frozen dataclass with corrected values
     return Settings(
         DBPEDIA_ENDPOINT=s.DBPEDIA_ENDPOINT,
         OPENAI_API_KEY=s.OPENAI_API_KEY,
+        LLM_BASE_URL=s.LLM_BASE_URL,
+        LLM_MODEL=s.LLM_MODEL,
+        LLM_TIMEOUT_S=s.LLM_TIMEOUT_S if s.LLM_TIMEOUT_S > 0 else 30.0,
+        LLM_MAX_CONCURRENCY=max(1, s.LLM_MAX_CONCURRENCY),
+        LLM_MAX_QUEUE=max(0, s.LLM_MAX_QUEUE),
+        LLM_QUEUE_TIMEOUT_S=max(0.0, s.LLM_QUEUE_TIMEOUT_S),
+        OLLAMA_URL=s.OLLAMA_URL,
+        OLLAMA_MODEL=s.OLLAMA_MODEL,
+        EXPLAIN_TIMEOUT_S=s.EXPLAIN_TIMEOUT_S if s.EXPLAIN_TIMEOUT_S > 0 else 60.0,
+        EXPLAIN_CACHE_TTL_S=max(1, s.EXPLAIN_CACHE_TTL_S),
+        INTENT_RULES_ENABLED=s.INTENT_RULES_ENABLED,
+        INTENT_MIN_CONFIDENCE=min(max(0.0, s.INTENT_MIN_CONFIDENCE), 1.0),
+        GAZETTEER_PATH=s.GAZETTEER_PATH,
+        ASK_INTENT_CACHE_TTL_S=max(1, s.ASK_INTENT_CACHE_TTL_S),
+        ASK_ANSWER_CACHE_TTL_S=max(1, s.ASK_ANSWER_CACHE_TTL_S),
+        ASK_CACHE_MAX_ITEMS=max(1, s.ASK_CACHE_MAX_ITEMS),
+        DBPEDIA_CONCURRENCY_MIN=conc_min,
+        DBPEDIA_CONCURRENCY_MAX=conc_max,
+        DBPEDIA_CONCURRENCY=min(max(conc_min, s.DBPEDIA_CONCURRENCY), conc_max),
+        BREAKER_WINDOW_S=max(1.0, s.BREAKER_WINDOW_S),
+        BREAKER_MIN_REQUESTS=max(1, s.BREAKER_MIN_REQUESTS),
+        BREAKER_ERROR_RATE=min(max(0.01, s.BREAKER_ERROR_RATE), 1.0),
+        BREAKER_OPEN_S=max(1.0, s.BREAKER_OPEN_S),
+        QUERY_BATCH_WINDOW_MS=max(0, s.QUERY_BATCH_WINDOW_MS),
+        QUERY_BATCH_MAX=max(1, s.QUERY_BATCH_MAX),
+        PAGE_SIZE=max(1, s.PAGE_SIZE),
+        PAGE_CONCURRENCY=max(1, s.PAGE_CONCURRENCY),
+        PAGE_MAX_ROWS=max(1, s.PAGE_MAX_ROWS),
+        COMPRESSION_MIN_BYTES=max(0, s.COMPRESSION_MIN_BYTES),
+        COMPRESSION_GZIP_LEVEL=min(max(1, s.COMPRESSION_GZIP_LEVEL), 9),
+        COMPRESSION_BROTLI_QUALITY=min(max(0, s.COMPRESSION_BROTLI_QUALITY), 11),
+        PROFILE_TOKEN=s.PROFILE_TOKEN,
+        PROFILE_SAMPLE_RATE=min(max(0.0, s.PROFILE_SAMPLE_RATE), 1.0),
+        PROFILE_DIR=s.PROFILE_DIR,
+        PROFILE_FORMAT=s.PROFILE_FORMAT if s.PROFILE_FORMAT in ("collapsed", "pstats") else "collapsed",
+        PROFILE_INTERVAL_MS=max(1, s.PROFILE_INTERVAL_MS),
         HTTP_TIMEOUT_S=timeout,
+        SPARQL_GET_MAX_BYTES=max(0, s.SPARQL_GET_MAX_BYTES),
         MAX_LIMIT=max_limit,
         DEFAULT_LIMIT=default_limit,
+        BATCH_MAX_IDS=max(1, s.BATCH_MAX_IDS),
+        BATCH_CHUNK_SIZE=max(1, s.BATCH_CHUNK_SIZE),
+        DETAIL_MAX_ROWS=max(1, s.DETAIL_MAX_ROWS),
         CACHE_TTL_S=max(1, s.CACHE_TTL_S),
         CACHE_MAX_ITEMS=max(1, s.CACHE_MAX_ITEMS),
+        SHARED_CACHE_PATH=s.SHARED_CACHE_PATH,
+        SIMILARITY_INDEX_DIR=s.SIMILARITY_INDEX_DIR,
+        SIMILARITY_NUM_PERM=num_perm,
+        SIMILARITY_BANDS=bands,
+        WARMUP_ENABLED=s.WARMUP_ENABLED,
+        WARMUP_SEEDS=s.WARMUP_SEEDS,
+        WARMUP_SEARCHES=s.WARMUP_SEARCHES,
+        WARMUP_TOP_N=max(0, s.WARMUP_TOP_N),
+        WARMUP_CONCURRENCY=max(1, s.WARMUP_CONCURRENCY),
+        WARMUP_INTERVAL_S=max(0, s.WARMUP_INTERVAL_S),
+        WARMUP_RECORD_PATH=s.WARMUP_RECORD_PATH,
+        PRELOAD_MODULES=s.PRELOAD_MODULES,
         CORS_ORIGINS=s.CORS_ORIGINS,
     )
 
@@ -1,17 +1,60 @@
 from __future__ import annotations
 
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+import asyncio
+
 from api.config import settings
 from services.cache import TTLCache
+from services.query_batcher import QueryBatcher
+from services.shared_cache import make_cache
 from services.sparql_client import SparqlClient
+from services.warmup import QueryRecorder
+
+if TYPE_CHECKING:
+    from services.similarity import SimilarityIndex
 
 
-# Singletons (shared across requests)
-_cache: TTLCache = TTLCache(
+# Singletons (shared across requests; across workers too when SHARED_CACHE_PATH is set)
+_cache: TTLCache = make_cache(
+    settings.SHARED_CACHE_PATH,
+    "sparql",
     ttl_seconds=settings.CACHE_TTL_S,
     max_items=settings.CACHE_MAX_ITEMS,
 )
 
-_sparql: SparqlClient = SparqlClient(cache=_cache)
+# /ask semantic cache (two levels)
+_ask_intent_cache: TTLCache = make_cache(
+    settings.SHARED_CACHE_PATH,
+    "ask_intent",
+    ttl_seconds=settings.ASK_INTENT_CACHE_TTL_S,
+    max_items=settings.ASK_CACHE_MAX_ITEMS,
+)
+_ask_answer_cache: TTLCache = make_cache(
+    settings.SHARED_CACHE_PATH,
+    "ask_answer",
+    ttl_seconds=settings.ASK_ANSWER_CACHE_TTL_S,
+    max_items=settings.ASK_CACHE_MAX_ITEMS,
+)
+
+# /graph/explain results, keyed on a hash of the summarized prompt inputs
+_explain_cache: TTLCache = make_cache(
+    settings.SHARED_CACHE_PATH,
+    "explain",
+    ttl_seconds=settings.EXPLAIN_CACHE_TTL_S,
+    max_items=settings.CACHE_MAX_ITEMS,
+)
+
+# Hot-query recorder (replayed by the warm-up job after a deploy)
+_recorder: QueryRecorder = QueryRecorder()
+
+_sparql: SparqlClient = SparqlClient(cache=_cache, recorder=_recorder)
+
+# Concurrent single-entity queries of the same template are merged into one upstream query
+_batcher: QueryBatcher = QueryBatcher(
+    _sparql,
+    window_s=settings.QUERY_BATCH_WINDOW_MS / 1000,
+    max_batch=settings.QUERY_BATCH_MAX,
+)
 
 
 def get_sparql_client() -> SparqlClient:
@@ -21,8 +64,46 @@ def get_sparql_client() -> SparqlClient:
     return _sparql
 
 
+def get_query_batcher() -> QueryBatcher:
+    return _batcher
+
+
 def get_cache() -> TTLCache:
     """
     Optional dependency provider for cache (useful for debugging/tests).
     """
     return _cache
+
+
+def get_ask_caches() -> Tuple[TTLCache, TTLCache]:
+    """
+    (normalized question -> {intent, entity}, "intent::entity" -> answer payload)
+    """
+    return _ask_intent_cache, _ask_answer_cache
+
+
+def get_explain_cache() -> TTLCache:
+    return _explain_cache
+
+
+def get_query_recorder() -> QueryRecorder:
+    return _recorder
+
+
+# Similarity indexes are loaded from disk on first use (one per entity kind)
+_similarity: Dict[str, Optional[SimilarityIndex]] = {}
+_similarity_lock = asyncio.Lock()
+
+
+async def get_similarity_index(kind: str) -> Optional[SimilarityIndex]:
+    """
+    Lazily load the persisted MinHash/LSH index for an entity kind (None if not built).
+    Reading the arrays is blocking: it runs in a worker thread, off the event loop.
+    """
+    if kind not in _similarity:
+        async with _similarity_lock:
+            if kind not in _similarity:
+                from services.similarity import load_index  # numpy, only once an index is needed
+
+                _similarity[kind] = await asyncio.to_thread(load_index, settings.SIMILARITY_INDEX_DIR, kind)
+    return _similarity[kind]
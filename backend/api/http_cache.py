@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional
+import hashlib
+import time
+
+from fastapi import Response
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from api.config import settings
+from services.cache import Validator, cache_validators
+
+# Bump when a payload shape changes, so clients drop representations built by older code
+_ETAG_SALT = "1"
+
+
+def _etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = [c.strip() for c in header.split(",")]
+    # Weak comparison (RFC 9110 §13.1.2): W/"x" matches "x"
+    return any(c.removeprefix("W/") == etag for c in candidates)
+
+
+class Revalidation:
+    """
+    Per-request state: the cache entries (key, version) the response is built from.
+    Their versions change whenever an entry is refreshed, so they give a strong
+    ETag without serializing (or even building) the body.
+    """
+
+    __slots__ = ("target", "if_none_match", "validators")
+
+    def __init__(self, target: str, if_none_match: Optional[str]):
+        self.target = target
+        self.if_none_match = if_none_match
+        self.validators: List[Validator] = []
+
+    def etag(self) -> Optional[str]:
+        if not self.validators or any(v is None for _, v, _ in self.validators):
+            return None  # part of the payload was not served from the cache
+        h = hashlib.sha256(f"{_ETAG_SALT}|{self.target}".encode("utf-8"))
+        for key, version, _ in sorted(set(self.validators)):
+            h.update(f"|{key}:{version}".encode("utf-8"))
+        return '"' + h.hexdigest()[:32] + '"'
+
+    def headers(self, etag: Optional[str]) -> Dict[str, str]:
+        if etag is None:
+            return {"Cache-Control": "no-store"}
+        # Fresh for as long as the oldest entry behind it, then served stale while revalidating
+        remaining = min(expires_at for _, _, expires_at in self.validators) - time.time()
+        return {
+            "ETag": etag,
+            "Cache-Control": (
+                f"public, max-age={max(0, int(remaining))}, "
+                f"stale-while-revalidate={settings.CACHE_TTL_S}"
+            ),
+        }
+
+
+_current: ContextVar[Optional[Revalidation]] = ContextVar("http_revalidation", default=None)
+
+
+class RevalidationMiddleware:
+    """
+    Opens a Revalidation for every GET/HEAD request; routes then call
+    not_modified() / with_cache_headers().
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+
+        query = "&".join(sorted(scope.get("query_string", b"").decode("latin-1").split("&")))
+        rv = Revalidation(f"{scope['path']}?{query}", Headers(scope=scope).get("if-none-match"))
+        token = _current.set(rv)
+        collect = cache_validators.set(rv.validators)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            cache_validators.reset(collect)
+            _current.reset(token)
+
+
+def not_modified() -> Optional[Response]:
+    """
+    304 when the client's If-None-Match names the current representation.
+    Call once the handler has read its cached data, before building the body.
+    """
+    rv = _current.get()
+    if rv is None:
+        return None  # called outside a request (warm-up)
+    etag = rv.etag()
+    if etag is not None and _etag_matches(rv.if_none_match, etag):
+        return Response(status_code=304, headers=rv.headers(etag))
+    return None
+
+
+def with_cache_headers(response: Response) -> Response:
+    rv = _current.get()
+    if rv is not None:
+        response.headers.update(rv.headers(rv.etag()))
+    return response
+
+
+def revalidated(build: Callable[[], Response]) -> Response:
+    """
+    304 if the client is up to date, else build() with ETag/Cache-Control headers.
+    """
+    response = not_modified()
+    if response is None:
+        response = with_cache_headers(build())
+    return response
@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs
+import asyncio
+import hmac
+import logging
+import os
+import random
+import re
+import time
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from api.config import settings
+from api.deps import get_ask_caches, get_cache, get_explain_cache, get_query_batcher, get_sparql_client
+from services import llm_service
+from services.get_dbpedia import get_dbpedia_service
+from services.metrics import HTTP_LATENCY, HTTP_REQUESTS, REGISTRY, Sample
+from services.profiling import Profiler, end_trace, start_trace
+
+logger = logging.getLogger(__name__)
+
+
+class RequestMetricsMiddleware:
+    """
+    Count and time every HTTP request by route template (/entity, not /entity?id=...),
+    up to the last body chunk, so streamed responses are timed in full.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        t0 = time.perf_counter()
+        status = 500
+
+        async def wrapped_send(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, wrapped_send)
+        finally:
+            route = scope.get("route")
+            # Unmatched paths share one label so scanners can't blow up the series count
+            name = getattr(route, "path", None) or "<unmatched>"
+            method = scope["method"]
+            HTTP_REQUESTS.inc(method=method, route=name, status=str(status))
+            HTTP_LATENCY.observe(time.perf_counter() - t0, method=method, route=name)
+
+
+class ProfilingMiddleware:
+    """
+    Opt-in request profiling. A request carrying `X-Profile: <PROFILE_TOKEN>` (or
+    `?profile=<token>`) gets a Server-Timing header with its stage spans (sparql,
+    normalize, graph_build, centrality, louvain, llm...); PROFILE_SAMPLE_RATE of all
+    requests are traced too, their spans only logged. With PROFILE_DIR set, traced
+    requests also leave a .pstats or .collapsed (flamegraph) file there.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    @staticmethod
+    def _authorized(scope: Scope) -> bool:
+        token = settings.PROFILE_TOKEN
+        if not token:
+            return False
+        given = Headers(scope=scope).get("x-profile")
+        if given is None:
+            query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+            given = (query.get("profile") or [None])[0]
+        return given is not None and hmac.compare_digest(given.encode("utf-8"), token.encode("utf-8"))
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        authorized = self._authorized(scope)
+        if not authorized and not (settings.PROFILE_SAMPLE_RATE and random.random() < settings.PROFILE_SAMPLE_RATE):
+            await self.app(scope, receive, send)
+            return
+
+        trace, token = start_trace()
+        profiler: Optional[Profiler] = None
+        if settings.PROFILE_DIR:
+            try:
+                profiler = Profiler.acquire(settings.PROFILE_FORMAT, settings.PROFILE_INTERVAL_MS / 1000)
+            except Exception as e:  # e.g. another profiler/debugger already hooked in
+                logger.warning("Could not start profiler: %s", e)
+
+        async def wrapped_send(message: Message) -> None:
+            if authorized and message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("Server-Timing", trace.server_timing())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, wrapped_send)
+        finally:
+            end_trace(token)
+            if profiler is not None:
+                profiler.stop()
+            route = getattr(scope.get("route"), "path", None) or scope["path"]
+            if not authorized:  # flagged requests already got their Server-Timing header
+                logger.info("profile %s %s: %s", scope["method"], route, trace.server_timing())
+            if profiler is not None:
+                slug = re.sub(r"[^A-Za-z0-9]+", "_", route).strip("_") or "root"
+                path = os.path.join(settings.PROFILE_DIR, f"{int(time.time() * 1000)}-{slug}.{profiler.extension}")
+                try:
+                    os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+                    await asyncio.to_thread(profiler.dump, path)
+                except Exception as e:
+                    logger.warning("Could not write profile %s: %s", path, e)
+
+
+def _collect_state() -> List[Sample]:
+    """
+    Counters and gauges already kept by the caches, the DBpedia guards and the LLM
+    scheduler, read at scrape time.
+    """
+    intent_cache, answer_cache = get_ask_caches()
+    caches = {"sparql": get_cache(), "ask_intent": intent_cache, "ask_answer": answer_cache, "explain": get_explain_cache()}
+    wrapper_cache = get_dbpedia_service().cache
+    if wrapper_cache is not None:
+        caches["dbpedia_wrapper"] = wrapper_cache
+    cache_stats = {name: c.stats() for name, c in caches.items()}
+
+    sparql = get_sparql_client()
+    limiter = sparql.limiter.stats()
+    breaker = sparql.breaker.stats()
+    batcher = get_query_batcher().stats()
+    scheduler = llm_service.scheduler.stats()
+    intents = llm_service.intent_stats
+
+    def per_cache(field: str) -> List[tuple]:
+        return [({"cache": name}, s[field]) for name, s in cache_stats.items()]
+
+    by_priority: Dict[str, Dict[str, float]] = scheduler["by_priority"]  # type: ignore[assignment]
+
+    return [
+        ("cache_hits_total", "counter", "TTLCache lookups served from the cache.", per_cache("hits")),
+        ("cache_misses_total", "counter", "TTLCache lookups that missed (absent or expired).", per_cache("misses")),
+        ("cache_items", "gauge", "Entries currently held.", per_cache("current_items")),
+        ("cache_hit_ratio", "gauge", "hits / (hits + misses) since start.", per_cache("hit_ratio")),
+        ("cache_shared_errors_total", "counter", "SQLite errors of the shared cache (lookups served locally).",
+         [({"cache": name}, s["sqlite_errors"]) for name, s in cache_stats.items() if "sqlite_errors" in s]),
+        ("sparql_concurrency_limit", "gauge", "Current AIMD limit on outstanding DBpedia requests.", [({}, limiter["limit"])]),
+        ("sparql_inflight", "gauge", "DBpedia requests in flight.", [({}, limiter["inflight"])]),
+        ("sparql_limiter_waiting", "gauge", "Requests waiting for a DBpedia slot.", [({}, limiter["waiting"])]),
+        ("sparql_breaker_open", "gauge", "1 while the DBpedia circuit breaker is open.",
+         [({}, 1 if breaker["state"] == "open" else 0)]),
+        ("sparql_breaker_opened_total", "counter", "Times the circuit breaker opened.", [({}, breaker["times_opened"])]),
+        ("sparql_stale_served_total", "counter", "Stale cache entries served while DBpedia was failing.",
+         [({}, sparql.stale_served)]),
+        ("query_batcher_upstream_queries_total", "counter", "Merged queries sent by the batcher.",
+         [({}, batcher["upstream_queries"])]),
+        ("query_batcher_queries_saved_total", "counter", "Upstream queries avoided by batching.",
+         [({}, batcher["upstream_queries_saved"])]),
+        ("llm_active", "gauge", "LLM generations running.", [({}, scheduler["active"])]),
+        ("llm_queued", "gauge", "LLM generations waiting for a slot.", [({}, scheduler["queued"])]),
+        ("llm_admitted_total", "counter", "Generations admitted by the scheduler, by priority class.",
+         [({"priority": p}, s["admitted"]) for p, s in by_priority.items()]),
+        ("llm_rejected_total", "counter", "Generations refused (503) by the scheduler, by priority class and reason.",
+         [({"priority": p, "reason": "queue_full"}, s["rejected_full"]) for p, s in by_priority.items()]
+         + [({"priority": p, "reason": "deadline"}, s["rejected_deadline"]) for p, s in by_priority.items()]),
+        ("ask_intent_total", "counter", "/ask intent resolutions, by path.",
+         [({"path": "rules"}, intents.bypassed), ({"path": "llm"}, intents.llm_calls),
+          ({"path": "fallback"}, intents.llm_failures)]),
+    ]
+
+
+REGISTRY.add_collector(_collect_state)
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Optional
+import json
+
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+
+try:
+    import orjson
+except Exception:
+    orjson = None
+
+
+def dumps(payload: Any) -> bytes:
+    """
+    Compact UTF-8 JSON (orjson when installed). Dates and other non-JSON values
+    from typed rows are written as strings.
+    """
+    if orjson is not None:
+        return orjson.dumps(payload, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    App-wide default response class: same contract as JSONResponse, faster encoder.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def model_response(model: BaseModel, status_code: int = 200, headers: Optional[Dict[str, str]] = None) -> Response:
+    """
+    Send a response model built by the route (usually with model_construct) as is.
+
+    Returning the model lets FastAPI dump it, validate it again against a cloned
+    response_model and re-encode it; for graph/entity payloads (thousands of
+    Dict[str, Any] items) that is most of the request's CPU time. pydantic-core
+    serializes the model straight to JSON instead. Keep response_model on the route
+    for the OpenAPI schema.
+    """
+    return Response(
+        content=model.model_dump_json(),
+        status_code=status_code,
+        headers=headers,
+        media_type="application/json",
+    )
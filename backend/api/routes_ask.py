@@ -1,54 +1,107 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Any, Awaitable, Callable, Dict, Optional
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from api.schemas import AskRequest, AskResponse, ApiMeta
-from api.deps import get_sparql_client 
+from api.deps import get_ask_caches, get_sparql_client
+from api.sse import SSE_HEADERS, sse_event
 from services.sparql_client import SparqlClient
 from services.normalize import sparql_json_to_rows
-from services.llm_service import analyze_football_intent
+from services.llm_scheduler import LLMSaturated
+from services.llm_service import analyze_football_intent, intent_stats
 # On importe les fonctions depuis le service que tu as fusionné
 from services.ask_service import build_sparql_player_club, build_sparql_club_stadium, format_answer
+from services.intent_rules import normalize_text
 
 router = APIRouter(prefix="/ask", tags=["ask"])
 
-@router.post("", response_model=AskResponse)
-async def ask(
-    payload: AskRequest, 
-    sparql: SparqlClient = Depends(get_sparql_client)
-):
-    question = payload.question.strip()
+# emit(event, data) : reçoit chaque étape du pipeline (utilisé par /ask/stream)
+Emit = Callable[[str, Dict[str, Any]], Awaitable[None]]
+
+
+async def _run_ask(
+    question: str,
+    sparql: SparqlClient,
+    emit: Optional[Emit] = None,
+    stream_tokens: bool = False,
+) -> AskResponse:
+    async def send(event: str, data: Dict[str, Any]) -> None:
+        if emit is not None:
+            await emit(event, data)
+
+    async def on_token(delta: str) -> None:
+        await send("token", {"text": delta})
+
+    question = question.strip()
     if not question:
         raise HTTPException(status_code=400, detail="Question is required")
 
+    intent_cache, answer_cache = get_ask_caches()
+    limit = 10
+
     # 1. IA analyse l'intention via Ollama (Mistral/Llama)
     # Cette étape valide la consigne 3.3 : NL2Entity
-    analysis = analyze_football_intent(question)
+    # Niveau 1 du cache : "Où joue Messi ?" et "ou joue messi" partagent la même clé
+    qkey = normalize_text(question)
+    analysis = intent_cache.get(qkey)
+    if analysis is None:
+        analysis = await analyze_football_intent(
+            question, on_token=on_token if (emit is not None and stream_tokens) else None
+        )
+        # Le fallback mots-clés (Ollama indisponible) n'est pas mémorisé
+        if analysis.get("source") != "fallback":
+            intent_cache.set(qkey, analysis)
     intent = analysis.get("intent", "player_club")
     entity = analysis.get("entity", question)
+    await send("intent", {"intent": intent, "entity": entity, "source": analysis.get("source")})
 
     # 2. Choix de la requête SPARQL (NL2SPARQL)
-    limit = 10
     if intent == "club_stadium":
         query = build_sparql_club_stadium(entity, limit=limit)
     else:
         query = build_sparql_player_club(entity, limit=limit)
+    await send("sparql", {"query": query})
+
+    # Niveau 2 : réponse déjà formatée pour (intent, requête). La clé suit l'entité
+    # telle qu'elle part dans la requête : le CONTAINS distingue "Piqué" de "pique".
+    akey = f"{intent}::{query}"
+    hit = answer_cache.get(akey)
+    if hit is not None:
+        await send("rows", {"rows": hit["rows"]})
+        await send("answer", {"answer": hit["answer"], "cached": True})
+        return AskResponse(
+            meta=ApiMeta(endpoint="dbpedia", limit=limit, cached=True),
+            question=question,
+            generated_sparql=hit["generated_sparql"],
+            rows=hit["rows"],
+            answer=hit["answer"],
+        )
 
     # 3. Exécution de la requête avec l'argument 'limit' (Correctif erreur 500)
     try:
         data = await sparql.query(
-            query=query, 
-            endpoint="dbpedia", 
+            query=query,
+            endpoint="dbpedia",
             limit=limit,      # Ajout de l'argument obligatoire
             use_cache=True
         )
-        rows = sparql_json_to_rows(data)
+        # Plain dicts: rows are cached, sent over SSE and returned as JSON
+        rows = [dict(r) for r in sparql_json_to_rows(data)]
     except Exception as e:
         raise HTTPException(
-            status_code=504, 
+            status_code=504,
             detail=f"Erreur lors de la requête DBpedia : {e}"
         )
+    await send("rows", {"rows": rows})
 
     # 4. Synthèse de connaissances (Réponse pédagogique)
     # On transforme les données brutes en phrase naturelle
     answer = format_answer(intent, entity, rows)
+    # Pas de mémorisation des réponses vides (entité mal extraite, DBpedia incomplet)
+    if rows:
+        answer_cache.set(akey, {"generated_sparql": query, "rows": rows, "answer": answer})
+    await send("answer", {"answer": answer, "cached": False})
 
     # 5. Retour conforme au schéma AskResponse pour ask.js
     return AskResponse(
@@ -57,4 +110,72 @@ async def ask(
         generated_sparql=query,
         rows=rows,
         answer=answer
-    )
\ No newline at end of file
+    )
+
+
+@router.post("", response_model=AskResponse)
+async def ask(
+    payload: AskRequest,
+    sparql: SparqlClient = Depends(get_sparql_client)
+):
+    return await _run_ask(payload.question, sparql)
+
+
+@router.get("/stream")
+async def ask_stream(
+    question: str = Query(..., min_length=1),
+    tokens: bool = Query(False, description="Also stream LLM tokens (token events)"),
+    sparql: SparqlClient = Depends(get_sparql_client),
+):
+    """
+    Server-Sent Events version of /ask (GET, so EventSource can use it).
+    Events: token*, intent, sparql, rows, answer, then done (or error).
+    """
+    queue: "asyncio.Queue[Optional[tuple]]" = asyncio.Queue()
+
+    async def emit(event: str, data: Dict[str, Any]) -> None:
+        await queue.put((event, data))
+
+    async def worker() -> None:
+        try:
+            await _run_ask(question, sparql, emit=emit, stream_tokens=tokens)
+            await queue.put(("done", {}))
+        except HTTPException as e:
+            await queue.put(("error", {"status": e.status_code, "detail": e.detail}))
+        except LLMSaturated as e:
+            await queue.put(("error", {"status": 503, "detail": e.reason, "retry_after": e.retry_after}))
+        except Exception as e:
+            await queue.put(("error", {"status": 500, "detail": str(e)}))
+        finally:
+            await queue.put(None)
+
+    async def events():
+        task = asyncio.create_task(worker())
+        try:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                yield sse_event(*item)
+        finally:
+            # Client went away: stop the pipeline (and the LLM stream) too
+            task.cancel()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
+
+
+@router.get("/stats")
+async def ask_stats():
+    """
+    Pre-classifier metrics (LLM bypass rate, latency saved) and semantic cache hit ratios.
+    """
+    intent_cache, answer_cache = get_ask_caches()
+    return {
+        **intent_stats.as_dict(),
+        "intent_cache": intent_cache.stats(),
+        "answer_cache": answer_cache.stats(),
+    }
@@ -3,7 +3,7 @@ from __future__ import annotations
 from typing import Any, Dict, Optional
 from fastapi import APIRouter, Query
 
-from services.get_dbpedia import dbpedia_service
+from services.get_dbpedia import get_dbpedia_service
 
 router = APIRouter(prefix="/dbpedia", tags=["dbpedia"])
 
@@ -14,7 +14,7 @@ def stadiums_in_city(
     lang: str = Query("fr", pattern="^(fr|en)$", description="Label language (fr or en)"),
     limit: int = Query(50, ge=1, le=200),
 ) -> Dict[str, Any]:
-    stades = dbpedia_service.get_stadiums_in_city(city=city, lang=lang, limit=limit)
+    stades = get_dbpedia_service().get_stadiums_in_city(city=city, lang=lang, limit=limit)
 
     note: Optional[str] = None
     if len(stades) == 0:
@@ -33,7 +33,7 @@ def stadiums_in_city(
 def psg_info(
     lang: str = Query("fr", pattern="^(fr|en)$", description="Label language (fr or en)"),
 ) -> Dict[str, Any]:
-    info = dbpedia_service.get_psg_info(lang=lang)
+    info = get_dbpedia_service().get_psg_info(lang=lang)
     return {
         "lang": lang,
         "found": info is not None,
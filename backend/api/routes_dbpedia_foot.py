@@ -1,9 +1,18 @@
 from __future__ import annotations
 
 from typing import Any, Dict, List, Optional, Literal, Tuple
+import json
 
-from fastapi import APIRouter, Query
-from services.get_dbpedia import dbpedia_service as dbpedia
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from api.config import settings
+from api.deps import get_sparql_client
+from api.http_cache import revalidated
+from api.responses import FastJSONResponse
+from services.get_dbpedia import get_dbpedia_service, players_clubs_edges_query
+from services.sparql_client import SparqlClient
+from services.sparql_paging import paginate
 
 router = APIRouter(prefix="/dbpedia-foot", tags=["dbpedia-foot"])
 
@@ -81,7 +90,7 @@ ORDER BY {prefer_expr} STRLEN(STR(?label))
 LIMIT {int(limit_raw)}
 """.strip()
 
-    return dbpedia._run(sparql, retries=2)
+    return get_dbpedia_service()._run(sparql, retries=2)
 
 
 def _filter_by_type_batch(uris: List[str], rdf_type: str) -> set:
@@ -105,7 +114,7 @@ SELECT DISTINCT ?uri WHERE {{
 }}
 """.strip()
 
-    rows = dbpedia._run(sparql, retries=2)
+    rows = get_dbpedia_service()._run(sparql, retries=2)
     ok = set()
     for b in rows:
         u = _binding_value(b, "uri")
@@ -120,7 +129,7 @@ def status():
 PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
 SELECT (COUNT(*) AS ?n) WHERE { ?s rdfs:label ?o } LIMIT 1
 """.strip()
-    rows = dbpedia._run(q, retries=1)
+    rows = get_dbpedia_service()._run(q, retries=1)
     return {"ok": True, "bindings_len": len(rows)}
 
 
@@ -169,7 +178,7 @@ def search(
 
     # If no raw results, return empty
     if not raw_results:
-        return {"lang": lang, "kind": kind, "count": 0, "results": []}
+        return revalidated(lambda: FastJSONResponse({"lang": lang, "kind": kind, "count": 0, "results": []}))
 
     # Filter by kind (type) with batch query
     rdf_type = _type_for_kind(kind)
@@ -188,13 +197,13 @@ def search(
         for r in filtered[:limit]
     ]
 
-    return {
+    return revalidated(lambda: FastJSONResponse({
         "lang": lang,
         "kind": kind,
         "count": len(final),
         "used_fallback": used_fallback,
         "results": final,
-    }
+    }))
 
 
 # ---- Home endpoints ----
@@ -202,29 +211,29 @@ def search(
 @router.get("/players")
 def specific_players(lang: str = Query("fr")):
     lang = _normalize_lang(lang)
-    data = dbpedia.get_specific_players(lang=lang)
-    return {"lang": lang, "count": len(data), "results": data}
+    data = get_dbpedia_service().get_specific_players(lang=lang)
+    return revalidated(lambda: FastJSONResponse({"lang": lang, "count": len(data), "results": data}))
 
 
 @router.get("/clubs")
 def specific_clubs(lang: str = Query("fr")):
     lang = _normalize_lang(lang)
-    data = dbpedia.get_specific_clubs(lang=lang)
-    return {"lang": lang, "count": len(data), "results": data}
+    data = get_dbpedia_service().get_specific_clubs(lang=lang)
+    return revalidated(lambda: FastJSONResponse({"lang": lang, "count": len(data), "results": data}))
 
 
 @router.get("/competitions")
 def top_competitions(lang: str = Query("fr")):
     lang = _normalize_lang(lang)
-    data = dbpedia.get_top_competitions(lang=lang)
-    return {"lang": lang, "count": len(data), "results": data}
+    data = get_dbpedia_service().get_top_competitions(lang=lang)
+    return revalidated(lambda: FastJSONResponse({"lang": lang, "count": len(data), "results": data}))
 
 
 @router.get("/analytics/club-degree")
 def club_degree(lang: str = Query("fr"), limit: int = Query(10, ge=1, le=50)):
     lang = _normalize_lang(lang)
-    data = dbpedia.analytics_club_degree(lang=lang, limit=limit)
-    return {"lang": lang, "count": len(data), "results": data}
+    data = get_dbpedia_service().analytics_club_degree(lang=lang, limit=limit)
+    return revalidated(lambda: FastJSONResponse({"lang": lang, "count": len(data), "results": data}))
 
 
 @router.get("/analytics/player-mobility")
@@ -234,23 +243,78 @@ def player_mobility(
     min_clubs: int = Query(2, ge=2, le=10),
 ):
     lang = _normalize_lang(lang)
-    data = dbpedia.analytics_player_mobility(lang=lang, limit=limit, min_clubs=min_clubs)
-    return {"lang": lang, "count": len(data), "results": data}
+    data = get_dbpedia_service().analytics_player_mobility(lang=lang, limit=limit, min_clubs=min_clubs)
+    return revalidated(lambda: FastJSONResponse({"lang": lang, "count": len(data), "results": data}))
 
 
 @router.get("/analytics/players-clubs-graph")
 def players_clubs_graph(lang: str = Query("fr"), limit_edges: int = Query(500, ge=50, le=2000)):
     lang = _normalize_lang(lang)
-    g = dbpedia.analytics_players_clubs_edges(lang=lang, limit_edges=limit_edges)
-    return {"lang": lang, **g}
+    g = get_dbpedia_service().analytics_players_clubs_edges(lang=lang, limit_edges=limit_edges)
+    # Returned as a response so FastAPI skips jsonable_encoder over every node/edge
+    return revalidated(lambda: FastJSONResponse({"lang": lang, **g}))
+
+
+@router.get("/analytics/players-clubs-edges")
+async def players_clubs_edges(
+    lang: str = Query("fr"),
+    max_edges: int = Query(50000, ge=1, le=settings.PAGE_MAX_ROWS),
+    sparql: SparqlClient = Depends(get_sparql_client),
+):
+    """
+    Every player -> club edge as NDJSON ({"source", "target", "source_label", "target_label"}
+    per line), fetched as ORDER BY-stable LIMIT/OFFSET pages, several at a time, and
+    streamed page by page. A final {"error": ...} line reports a failure mid-stream.
+    """
+    lang = _normalize_lang(lang)
+    query = players_clubs_edges_query(lang, ordered=True)
+    # Label OPTIONALs (lang + en/fr) give at most 4 rows per edge: no page past that is needed
+    max_rows = min(settings.PAGE_MAX_ROWS, max_edges * 4)
+
+    async def lines():
+        seen = set()
+        try:
+            async for page in paginate(
+                sparql,
+                query,
+                page_size=settings.PAGE_SIZE,
+                max_rows=max_rows,
+                concurrency=settings.PAGE_CONCURRENCY,
+                use_cache=False,  # bulk export: pages would flush the shared cache
+            ):
+                out = []
+                for r in page:
+                    p_uri = r.get("player")
+                    c_uri = r.get("club")
+                    # label OPTIONALs repeat edges; ORDER BY keeps the repeats adjacent
+                    if not p_uri or not c_uri or (p_uri, c_uri) in seen:
+                        continue
+                    seen.add((p_uri, c_uri))
+                    out.append(json.dumps({
+                        "source": p_uri,
+                        "target": c_uri,
+                        "source_label": r.get("playerLabel") or p_uri,
+                        "target_label": r.get("clubLabel") or c_uri,
+                    }, ensure_ascii=False))
+                    if len(seen) >= max_edges:
+                        break
+                if out:
+                    yield "\n".join(out) + "\n"
+                if len(seen) >= max_edges:
+                    return
+        except HTTPException as e:
+            yield json.dumps({"error": e.detail, "status": e.status_code}) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
 
 
 @router.get("/home")
 def home(lang: str = Query("fr")):
     lang = _normalize_lang(lang)
-    return {
+    payload = {
         "lang": lang,
-        "clubs": dbpedia.get_specific_clubs(lang=lang),
-        "players": dbpedia.get_specific_players(lang=lang),
-        "competitions": dbpedia.get_top_competitions(lang=lang),
+        "clubs": get_dbpedia_service().get_specific_clubs(lang=lang),
+        "players": get_dbpedia_service().get_specific_players(lang=lang),
+        "competitions": get_dbpedia_service().get_top_competitions(lang=lang),
     }
+    return revalidated(lambda: FastJSONResponse(payload))
@@ -1,13 +1,20 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional
-from fastapi import APIRouter, Depends, Query, HTTPException
+from typing import Any, Dict, List, Optional, Tuple
+import base64
+import json
 
-from api.schemas import EntityResponse, ApiMeta
+from fastapi import APIRouter, Depends, Query, HTTPException, Response
+
+from api.schemas import BatchEntityRequest, BatchEntityResponse, EntityResponse, ApiMeta
 from api.config import settings
 from api.deps import get_sparql_client
+from api.http_cache import not_modified, revalidated, with_cache_headers
+from api.responses import FastJSONResponse
+from api.responses import model_response
 from services.sparql_client import SparqlClient
 from services.normalize import sparql_json_to_rows
+from services.batch import chunked, dedupe, run_chunks
 
 router = APIRouter(prefix="/entity", tags=["entity"])
 
@@ -22,59 +29,352 @@ def _validate_uri(u: str) -> str:
     return u
 
 
-@router.get("", response_model=EntityResponse)
-async def entity(
-    id: str = Query(..., description="Entity URI (http(s) IRI)"),
-    limit: int = Query(settings.DEFAULT_LIMIT, ge=1, le=settings.MAX_LIMIT),
-    sparql: SparqlClient = Depends(get_sparql_client),
-):
-    uri = _validate_uri(id)
+def _entity_query(subjects: List[str], per_subject: int) -> str:
+    """
+    (s, p, o) rows with fr/en labels for several subjects, capped per subject inside
+    SPARQL (one sub-query each, predicate order), labels joined after the cap.
+    Sorted, so the outer LIMIT budget always keeps the same rows.
+    """
+    blocks = "\n    UNION\n".join(
+        f"    {{ SELECT (<{u}> AS ?s) ?p ?o WHERE {{ <{u}> ?p ?o . }} ORDER BY ?p ?o LIMIT {int(per_subject)} }}"
+        for u in subjects
+    )
+    return f"""
+PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+
+SELECT ?s ?p ?pLabel ?o ?oLabel WHERE {{
+  {{
+{blocks}
+  }}
+
+  OPTIONAL {{ ?p rdfs:label ?pLabel . FILTER(lang(?pLabel) IN ("en","fr")) }}
+  OPTIONAL {{ ?o rdfs:label ?oLabel . FILTER(lang(?oLabel) IN ("en","fr")) }}
+}}
+ORDER BY ?s ?p ?o ?pLabel ?oLabel
+""".strip()
+
 
-    query = f"""
+def _predicates_query(uri: str, limit: int, offset: int) -> str:
+    """
+    One page of the entity's predicates (stable order) with their value counts.
+    """
+    return f"""
+SELECT ?p (COUNT(?o) AS ?n) WHERE {{
+  <{uri}> ?p ?o .
+}}
+GROUP BY ?p
+ORDER BY ?p
+LIMIT {int(limit)}
+OFFSET {int(offset)}
+""".strip()
+
+
+def _capped_values_query(uri: str, predicates: List[str], per_predicate: int) -> str:
+    """
+    Values of the given predicates, capped per predicate inside SPARQL (one sub-query each),
+    labels joined after the cap. Sorted, so the outer LIMIT budget always keeps the same rows.
+    """
+    blocks = "\n    UNION\n".join(
+        f"    {{ SELECT (<{p}> AS ?p) ?o WHERE {{ <{uri}> <{p}> ?o . }} ORDER BY ?o LIMIT {int(per_predicate)} }}"
+        for p in predicates
+    )
+    return f"""
 PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
 
 SELECT ?p ?pLabel ?o ?oLabel WHERE {{
-  BIND(<{uri}> AS ?s)
-  ?s ?p ?o .
+  {{
+{blocks}
+  }}
 
   OPTIONAL {{ ?p rdfs:label ?pLabel . FILTER(lang(?pLabel) IN ("en","fr")) }}
   OPTIONAL {{ ?o rdfs:label ?oLabel . FILTER(lang(?oLabel) IN ("en","fr")) }}
 }}
+ORDER BY ?p ?o ?pLabel ?oLabel
 """.strip()
 
-    data = await sparql.query(query=query, endpoint="dbpedia", limit=limit, use_cache=True)
-    rows = sparql_json_to_rows(data)
 
+def _detail_query(uri: str) -> str:
+    """
+    Same shape as the query front/detail.js used to send to dbpedia.org directly:
+    ontology/rdfs/foaf properties, fr property labels, fr value labels,
+    literals restricted to fr/en/untagged.
+    """
+    return f"""
+PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+PREFIX dbo: <http://dbpedia.org/ontology/>
+PREFIX foaf: <http://xmlns.com/foaf/0.1/>
+
+SELECT DISTINCT ?property ?value ?propLabel ?valLabel WHERE {{
+  <{uri}> ?property ?value .
+
+  FILTER(STRSTARTS(STR(?property), "http://dbpedia.org/ontology/") ||
+         STRSTARTS(STR(?property), "http://www.w3.org/2000/01/rdf-schema#") ||
+         ?property = foaf:depiction || ?property = foaf:name)
+
+  OPTIONAL {{
+    ?property rdfs:label ?propLabel .
+    FILTER(LANG(?propLabel) = "fr")
+  }}
+
+  OPTIONAL {{
+    ?value rdfs:label ?valLabel .
+    FILTER(ISIRI(?value) && LANG(?valLabel) = "fr")
+  }}
+
+  FILTER(!ISLITERAL(?value) || LANG(?value) = "" || LANG(?value) = "fr" || LANG(?value) = "en")
+}}
+""".strip()
+
+
+def _encode_cursor(offset: int) -> str:
+    raw = json.dumps({"offset": int(offset)}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: Optional[str]) -> int:
+    if not cursor:
+        return 0
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        offset = int(json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))["offset"])
+    except Exception:
+        raise HTTPException(status_code=400, detail="invalid cursor")
+    if offset < 0:
+        raise HTTPException(status_code=400, detail="invalid cursor")
+    return offset
+
+
+def _is_safe_iri(u: str) -> bool:
+    return bool(u) and not any(x in u for x in ["<", ">", "{", "}", '"', "'", " "])
+
+
+def _predicate_keys(rows: List[Dict[str, Any]]) -> Dict[str, str]:
+    """
+    Display key of each predicate: its first label in row order (the queries sort
+    on the label after p/o), else the IRI. facts and value_counts both use it.
+    """
+    keys: Dict[str, str] = {}
+    for r in rows:
+        p = r.get("p")
+        if p and (p not in keys or keys[p] == p):
+            keys[p] = str(r.get("pLabel") or p)
+    return keys
+
+
+def _build_entity(
+    uri: str,
+    rows: List[Dict[str, Any]],
+    limit: int,
+    per_predicate: int = 10,
+    counts: Optional[List[Tuple[str, int]]] = None,
+) -> EntityResponse:
+    """
+    counts: (predicate, total values) pairs, summed into value_counts under the
+    same keys as facts.
+    """
+    keys = _predicate_keys(rows)
     facts: Dict[str, List[Dict[str, Any]]] = {}
     neighbors: List[Dict[str, Any]] = []
     label: Optional[str] = None
+    seen: set = set()
 
     for r in rows:
         p = r.get("p")
         o = r.get("o")
-        p_label = r.get("pLabel") or p
         o_label = r.get("oLabel") or o
 
         if not p or not o:
             continue
 
+        # en/fr label OPTIONALs can repeat the same (p, o) pair
+        if (p, o) in seen:
+            continue
+        seen.add((p, o))
+
         # Try to pick entity label from rdfs:label (common on DBpedia)
         if isinstance(p, str) and p.endswith("/label") and isinstance(o_label, str):
             label = o_label
 
-        key = str(p_label)
+        key = keys[p]
         facts.setdefault(key, [])
-        if len(facts[key]) < 10:
+        if len(facts[key]) < per_predicate:
             facts[key].append({"value": o, "label": o_label})
 
         # Neighbors: objects that look like URIs
         if isinstance(o, str) and (o.startswith("http://") or o.startswith("https://")):
             neighbors.append({"predicate": key, "uri": o, "label": o_label})
 
-    return EntityResponse(
+    response = EntityResponse.model_construct(
         meta=ApiMeta(endpoint="dbpedia", limit=limit, cached=False),
-        uri=id,
+        uri=uri,
         label=label,
         facts=facts,
         neighbors=neighbors[:200],
     )
+    for p, n in counts or ():
+        key = keys.get(p, p)
+        response.value_counts[key] = response.value_counts.get(key, 0) + n
+    return response
+
+
+async def _predicate_page(
+    sparql: SparqlClient, uri: str, limit: int, offset: int
+) -> Tuple[List[Tuple[str, int]], int, bool]:
+    """
+    (predicates of the page, predicates consumed from the upstream order, has_more).
+    Unsafe IRIs are skipped but still consumed, so the next offset stays aligned.
+    """
+    # Fetch one extra predicate to know whether a next page exists
+    data = await sparql.query(
+        query=_predicates_query(uri, limit + 1, offset),
+        endpoint="dbpedia",
+        limit=limit + 1,
+        use_cache=True,
+        max_limit=limit + 1,
+    )
+
+    rows = sparql_json_to_rows(data, typed=True)
+    consumed = min(len(rows), limit)
+    page: List[Tuple[str, int]] = []
+    for r in rows[:consumed]:
+        p = r.get("p")
+        if not _is_safe_iri(p or ""):
+            continue
+        n = r.get("n")  # xsd:integer from COUNT
+        page.append((p, n if isinstance(n, int) else 0))
+
+    return page, consumed, len(rows) > limit
+
+
+@router.get("", response_model=EntityResponse)
+async def entity(
+    id: str = Query(..., description="Entity URI (http(s) IRI)"),
+    limit: int = Query(
+        settings.DEFAULT_LIMIT, ge=1, le=settings.MAX_LIMIT,
+        description="Predicates per page (used to be (p, o) rows: a page now holds up to limit × per_predicate values)",
+    ),
+    per_predicate: int = Query(10, ge=1, le=50, description="Values kept per predicate"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page (next_cursor)"),
+    sparql: SparqlClient = Depends(get_sparql_client),
+) -> Response:
+    """
+    Entity facts paged by predicate. The per-predicate cap is enforced in SPARQL,
+    so long predicates (e.g. dbo:wikiPageWikiLink) cannot crowd out the others.
+
+    Compatibility: `limit` counts predicates since pagination was added; it used
+    to cap the number of (p, o) rows. Clients wanting fewer values per page lower
+    `per_predicate`, and follow `next_cursor` for the remaining predicates.
+    """
+    uri = _validate_uri(id)
+    offset = _decode_cursor(cursor)
+
+    page, consumed, has_more = await _predicate_page(sparql, uri, limit, offset)
+
+    rows: List[Dict[str, Any]] = []
+    if page:
+        # en/fr labels may multiply rows by up to 4; past PAGE_SIZE (a sorted
+        # query over Virtuoso's MaxSortedTopRows) the endpoint would refuse it
+        budget = min(len(page) * per_predicate * 4, settings.PAGE_SIZE)
+        data = await sparql.query(
+            query=_capped_values_query(uri, [p for p, _ in page], per_predicate),
+            endpoint="dbpedia",
+            limit=budget,
+            use_cache=True,
+            max_limit=budget,
+        )
+        rows = sparql_json_to_rows(data)
+
+    cached = not_modified()
+    if cached is not None:
+        return cached
+
+    # value_counts: total values per displayed predicate key, so the UI can show "+N more"
+    response = _build_entity(id, rows, limit, per_predicate=per_predicate, counts=page)
+    response.next_cursor = _encode_cursor(offset + consumed) if has_more else None
+    return with_cache_headers(model_response(response))
+
+
+@router.get("/detail")
+async def entity_detail(
+    id: str = Query(..., description="Entity URI (http(s) IRI)"),
+    sparql: SparqlClient = Depends(get_sparql_client),
+) -> Response:
+    """
+    Raw SPARQL JSON for the detail page, proxied through the shared client
+    (cache, single-flight, retries, maintenance handling) with ETag/304 support.
+    """
+    uri = _validate_uri(id)
+    if "/page/" in uri:
+        uri = uri.replace("/page/", "/resource/")
+
+    data = await sparql.query(
+        query=_detail_query(uri),
+        endpoint="dbpedia",
+        limit=settings.DETAIL_MAX_ROWS,
+        use_cache=True,
+        max_limit=settings.DETAIL_MAX_ROWS,
+    )
+    return revalidated(lambda: FastJSONResponse(data.to_json()))
+
+
+@router.post("/batch", response_model=BatchEntityResponse)
+async def entity_batch(
+    payload: BatchEntityRequest,
+    sparql: SparqlClient = Depends(get_sparql_client),
+) -> Response:
+    """
+    Resolve up to BATCH_MAX_IDS entities with a few chunked queries run concurrently.
+    Each entity gets its first `limit` (p, o) rows in predicate order, capped in
+    SPARQL so one large entity cannot starve the others of its chunk. When an entity
+    is cut, `next_cursor` continues it page by page through GET /entity (which also
+    gives the per-predicate value_counts that the batch form leaves empty).
+    """
+    ids = dedupe(payload.ids)
+    if len(ids) > settings.BATCH_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"at most {settings.BATCH_MAX_IDS} ids per batch")
+
+    limit = min(payload.limit or settings.DEFAULT_LIMIT, settings.MAX_LIMIT)
+
+    errors: Dict[str, str] = {}
+    valid: List[str] = []
+    for u in ids:
+        try:
+            valid.append(_validate_uri(u))
+        except HTTPException as e:
+            errors[u] = str(e.detail)
+
+    async def run(chunk: List[str]) -> List[Dict[str, Any]]:
+        # en/fr labels may multiply rows by up to 4 (PAGE_SIZE: see entity())
+        budget = min(limit * len(chunk) * 4, settings.PAGE_SIZE)
+        data = await sparql.query(
+            query=_entity_query(chunk, limit),
+            endpoint="dbpedia",
+            limit=budget,
+            use_cache=True,
+            max_limit=budget,
+        )
+        return sparql_json_to_rows(data)
+
+    done, chunk_errors = await run_chunks(chunked(valid, settings.BATCH_CHUNK_SIZE), run)
+    errors.update(chunk_errors)
+
+    results: Dict[str, EntityResponse] = {}
+    for chunk, rows in done:
+        by_subject: Dict[str, List[Dict[str, Any]]] = {u: [] for u in chunk}
+        for r in rows:
+            s = r.get("s")
+            if s in by_subject:
+                by_subject[s].append(r)
+        for u in chunk:
+            results[u] = _build_entity(u, by_subject[u], limit)
+            pairs = {(r.get("p"), r.get("o")) for r in by_subject[u]}
+            if len(pairs) >= limit:
+                # Cut at `limit` rows: the last predicate may be partial, the ones before are complete
+                predicates = {p for p, _ in pairs}
+                results[u].next_cursor = _encode_cursor(max(0, len(predicates) - 1))
+
+    return model_response(BatchEntityResponse.model_construct(
+        meta=ApiMeta(endpoint="dbpedia", limit=limit, cached=False),
+        results={u: results[u] for u in ids if u in results},
+        errors=errors,
+    ))
@@ -1,17 +1,25 @@
 from __future__ import annotations
 
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Any, Dict, List, Optional
-import os
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import asyncio
+import hashlib
 import httpx
 import json
 import re
-from pydantic import BaseModel
-from typing import Any, Dict
 
+from api.config import settings
+from api.deps import get_explain_cache
+from api.sse import SSE_HEADERS, sse_event
+from services.cache import SingleFlight, TTLCache
+from services.json_stream import JsonFieldStream
+from services.llm_scheduler import PRIORITY_BACKGROUND, LLMSaturated
+from services.llm_service import get_ollama_http, scheduler
+from services.metrics import LLM_LATENCY
+from services.profiling import span
 
-    
 
 
 def parse_llm_json(text: str) -> dict:
@@ -36,14 +44,17 @@ class ExplainGraphResponse(BaseModel):
     provider: str
     data: Dict[str, Any]
 
-def build_prompt(req: ExplainGraphRequest) -> str:
+# Concurrent identical explanations share one generation
+_flights = SingleFlight()
+
+
+def summarize_metrics(req: ExplainGraphRequest) -> Dict[str, Any]:
+    """
+    The only metric fields that reach the prompt. Also the basis of the cache key.
+    """
     m = req.metrics or {}
     stats = m.get("stats", {}) or {}
 
-    top_deg = (m.get("top_degree") or [])[:5]
-    top_inf = (m.get("top_pagerank") or [])[:5]
-    top_bt = (m.get("top_betweenness") or [])[:5]
-
     # communautés: tailles
     comm = m.get("communities", {}) or {}
     sizes = {}
@@ -51,6 +62,31 @@ def build_prompt(req: ExplainGraphRequest) -> str:
         sizes[cid] = sizes.get(cid, 0) + 1
     top_comms = sorted(sizes.items(), key=lambda x: x[1], reverse=True)[:4]
 
+    return {
+        "seed": req.seed_uri,
+        "lang": req.lang,
+        "n_nodes": m.get("n_nodes", 0),
+        "n_edges": m.get("n_edges", 0),
+        "density": stats.get("density"),
+        "components": stats.get("components"),
+        "top_degree": (m.get("top_degree") or [])[:5],
+        "top_pagerank": (m.get("top_pagerank") or [])[:5],
+        "top_betweenness": (m.get("top_betweenness") or [])[:5],
+        "top_comms": top_comms,
+    }
+
+
+def explain_cache_key(summary: Dict[str, Any], model: str) -> str:
+    raw = json.dumps(summary, sort_keys=True, ensure_ascii=False, default=str)
+    return f"explain::{model}::" + hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def build_prompt(req: ExplainGraphRequest, summary: Optional[Dict[str, Any]] = None) -> str:
+    s = summary if summary is not None else summarize_metrics(req)
+    m = {"n_nodes": s["n_nodes"], "n_edges": s["n_edges"]}
+    stats = {"density": s["density"], "components": s["components"]}
+    top_deg, top_inf, top_bt, top_comms = s["top_degree"], s["top_pagerank"], s["top_betweenness"], s["top_comms"]
+
     return f"""
 Tu es un assistant d'analyse de graphes (niveau M1/école d'ingénieur).
 Tu interprètes un graphe local (ego-network) construit depuis DBpedia via SPARQL autour d'une entité seed.
@@ -91,54 +127,236 @@ IMPORTANT: N'inclus PAS de balises ``` ni de markdown. Réponds uniquement avec
 
 """.strip()
 
+async def _generate(prompt: str, model: str) -> Dict[str, Any]:
+    client = get_ollama_http()
+
+    # 1) Try /api/chat
+    r = await client.post(
+        "/api/chat",
+        json={
+            "model": model,
+            "messages": [
+                {"role": "system", "content": "Tu interprètes des graphes de connaissances de façon rigoureuse."},
+                {"role": "user", "content": prompt},
+            ],
+            "stream": False,
+        },
+    )
+
+    if r.status_code == 200:
+        data = r.json()
+        text = ((data.get("message") or {}).get("content") or "").strip()
+        if text:
+            return parse_llm_json(text)
+
+    # 2) Fallback /api/generate
+    r2 = await client.post(
+        "/api/generate",
+        json={"model": model, "prompt": prompt, "stream": False},
+    )
+
+    if r2.status_code != 200:
+        raise HTTPException(status_code=502, detail=f"Ollama error: {r2.text}")
+
+    data2 = r2.json()
+    text2 = (data2.get("response") or "").strip()
+    if not text2:
+        raise HTTPException(status_code=502, detail="Empty response from Ollama")
+
+    return parse_llm_json(text2)
+
+
+async def _stream_tokens(prompt: str, model: str) -> AsyncIterator[str]:
+    """
+    Text fragments from Ollama's NDJSON stream (/api/chat, then /api/generate when
+    chat fails or streams no content, like _generate).
+    Closing this generator closes the connection, which stops the generation upstream.
+    """
+    client = get_ollama_http()
+    attempts = [
+        (
+            "/api/chat",
+            {
+                "model": model,
+                "messages": [
+                    {"role": "system", "content": "Tu interprètes des graphes de connaissances de façon rigoureuse."},
+                    {"role": "user", "content": prompt},
+                ],
+                "stream": True,
+            },
+            lambda d: (d.get("message") or {}).get("content"),
+        ),
+        ("/api/generate", {"model": model, "prompt": prompt, "stream": True}, lambda d: d.get("response")),
+    ]
+
+    error = ""
+    for path, body, pick in attempts:
+        got = False
+        async with client.stream("POST", path, json=body) as r:
+            if r.status_code != 200:
+                error = f"Ollama error: {(await r.aread()).decode('utf-8', 'replace')}"
+                continue
+            async for line in r.aiter_lines():
+                if not line.strip():
+                    continue
+                d = json.loads(line)
+                if d.get("error"):
+                    raise HTTPException(status_code=502, detail=f"Ollama error: {d['error']}")
+                piece = pick(d)
+                if piece and (got or piece.strip()):
+                    got = True
+                    yield piece
+                if d.get("done"):
+                    break
+        if got:
+            return
+        error = "Empty response from Ollama"
+
+    raise HTTPException(status_code=502, detail=error)
+
+
+async def _generate_cached(
+    req: ExplainGraphRequest, summary: Dict[str, Any], model: str, key: str, cache: TTLCache
+) -> Dict[str, Any]:
+    # /ask passes first when the LLM is busy
+    async with scheduler.slot(PRIORITY_BACKGROUND):
+        with LLM_LATENCY.time(call="explain"), span("llm"):
+            obj = await _generate(build_prompt(req, summary), model)
+    cache.set(key, obj)
+    return obj
+
+
+async def _stream_cached(
+    req: ExplainGraphRequest,
+    summary: Dict[str, Any],
+    model: str,
+    key: str,
+    cache: TTLCache,
+    fields: "asyncio.Queue[Optional[Tuple[str, Any]]]",
+) -> Dict[str, Any]:
+    """
+    Streamed generation: each completed top-level field is put on `fields`;
+    returns the whole object.
+    """
+    parser = JsonFieldStream()
+    text: List[str] = []
+    async with scheduler.slot(PRIORITY_BACKGROUND):
+        tokens = _stream_tokens(build_prompt(req, summary), model)
+        try:
+            with LLM_LATENCY.time(call="explain_stream"), span("llm"):
+                async for piece in tokens:
+                    text.append(piece)
+                    for field in parser.feed(piece):
+                        fields.put_nowait(field)
+                    if parser.closed:
+                        break  # object complete: no need to let the model ramble on
+        finally:
+            # Also runs when the client disconnects: the upstream request is closed
+            await tokens.aclose()
+
+    obj = parser.fields if parser.closed else parse_llm_json("".join(text))
+    cache.set(key, obj)
+    return obj
+
+
+def _error_event(e: Exception) -> str:
+    if isinstance(e, LLMSaturated):
+        return sse_event("error", {"status": 503, "detail": e.reason, "retry_after": e.retry_after})
+    if isinstance(e, HTTPException):
+        return sse_event("error", {"status": e.status_code, "detail": e.detail})
+    if isinstance(e, httpx.RequestError):
+        return sse_event("error", {"status": 502, "detail": f"Ollama not reachable: {e}"})
+    return sse_event("error", {"status": 502, "detail": f"LLM JSON parsing failed: {e}"})
+
+
 @router.post("/explain", response_model=ExplainGraphResponse)
 async def explain(req: ExplainGraphRequest):
-    ollama_url = os.getenv("OLLAMA_URL", "http://127.0.0.1:11434").rstrip("/")
-    model = os.getenv("OLLAMA_MODEL", "llama3.2:3b")
+    model = settings.OLLAMA_MODEL
 
-    prompt = build_prompt(req)
+    summary = summarize_metrics(req)
+    key = explain_cache_key(summary, model)
+
+    cache = get_explain_cache()
+    cached = cache.get(key)
+    if cached is not None:
+        return ExplainGraphResponse(provider=f"ollama:{model}", data=cached)
 
     try:
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            # 1) Try /api/chat
-            r = await client.post(
-                f"{ollama_url}/api/chat",
-                json={
-                    "model": model,
-                    "messages": [
-                        {"role": "system", "content": "Tu interprètes des graphes de connaissances de façon rigoureuse."},
-                        {"role": "user", "content": prompt},
-                    ],
-                    "stream": False,
-                },
-            )
-
-            if r.status_code == 200:
-                data = r.json()
-                text = ((data.get("message") or {}).get("content") or "").strip()
-                if text:
-                    obj = parse_llm_json(text)
-                    return ExplainGraphResponse(provider=f"ollama:{model}", data=obj)
-
-            # 2) Fallback /api/generate
-            r2 = await client.post(
-                f"{ollama_url}/api/generate",
-                json={"model": model, "prompt": prompt, "stream": False},
-            )
-
-            if r2.status_code != 200:
-                raise HTTPException(status_code=502, detail=f"Ollama error: {r2.text}")
-
-            data2 = r2.json()
-            text2 = (data2.get("response") or "").strip()
-            if not text2:
-                raise HTTPException(status_code=502, detail="Empty response from Ollama")
-
-            obj2 = parse_llm_json(text2)
-            return ExplainGraphResponse(provider=f"ollama:{model}", data=obj2)
+        obj = await _flights.do(key, lambda: _generate_cached(req, summary, model, key, cache))
+        return ExplainGraphResponse(provider=f"ollama:{model}", data=obj)
 
+    except (HTTPException, LLMSaturated):
+        raise
     except httpx.RequestError as e:
         raise HTTPException(status_code=502, detail=f"Ollama not reachable: {e}")
     except Exception as e:
         # parse_llm_json / json.loads errors
         raise HTTPException(status_code=502, detail=f"LLM JSON parsing failed: {e}")
+
+
+@router.post("/explain/stream")
+async def explain_stream(req: ExplainGraphRequest):
+    """
+    Server-Sent Events version of /graph/explain. Each top-level field of the JSON
+    answer (title, summary, insights...) is sent as a `field` event as soon as the
+    model closes it, then `done` with the whole object (or `error`).
+
+    Shares the single-flight of /graph/explain: a request for an explanation that
+    is already being generated (streamed or not) waits for it instead of starting
+    another generation, and gets all its fields at once.
+    """
+    model = settings.OLLAMA_MODEL
+    provider = f"ollama:{model}"
+
+    summary = summarize_metrics(req)
+    key = explain_cache_key(summary, model)
+    cache = get_explain_cache()
+
+    async def events():
+        cached = cache.get(key)
+        if cached is not None:
+            for name, value in cached.items():
+                yield sse_event("field", {"name": name, "value": value})
+            yield sse_event("done", {"provider": provider, "data": cached, "cached": True})
+            return
+
+        if key in _flights:
+            try:
+                obj = await _flights.do(key, lambda: _generate_cached(req, summary, model, key, cache))
+            except Exception as e:
+                yield _error_event(e)
+                return
+            for name, value in obj.items():
+                yield sse_event("field", {"name": name, "value": value})
+            yield sse_event("done", {"provider": provider, "data": obj, "cached": False})
+            return
+
+        # Leader: the generation runs as a task registered in the single-flight,
+        # its fields are relayed from the queue as they complete (None: over)
+        fields: "asyncio.Queue[Optional[Tuple[str, Any]]]" = asyncio.Queue()
+
+        async def lead() -> Dict[str, Any]:
+            try:
+                return await _flights.do(key, lambda: _stream_cached(req, summary, model, key, cache, fields))
+            finally:
+                fields.put_nowait(None)
+
+        task = asyncio.ensure_future(lead())
+        sent = set()
+        try:
+            while (field := await fields.get()) is not None:
+                sent.add(field[0])
+                yield sse_event("field", {"name": field[0], "value": field[1]})
+            obj = await task
+            # Fields not streamed (parsed at the end, or another request's generation)
+            for name, value in obj.items():
+                if name not in sent:
+                    yield sse_event("field", {"name": name, "value": value})
+            yield sse_event("done", {"provider": provider, "data": obj, "cached": False})
+        except Exception as e:
+            yield _error_event(e)
+        finally:
+            # Client gone: stop the generation (waiting requests then run their own)
+            task.cancel()
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
@@ -1,21 +1,38 @@
 from __future__ import annotations
 
 from typing import Any, Dict, List, Optional
-from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi import APIRouter, Depends, Query, HTTPException, Response
 
 from api.schemas import GraphResponse, ApiMeta
 from api.config import settings
-from api.deps import get_sparql_client
+from api.deps import get_query_batcher, get_sparql_client
+from api.http_cache import not_modified, revalidated, with_cache_headers
+from api.responses import FastJSONResponse, model_response
 from services.sparql_client import SparqlClient
+from services.metrics import GRAPH_COMPUTE
 from services.normalize import sparql_json_to_rows
-import networkx as nx
+from services.profiling import span
+from services.query_batcher import BatchTemplate
 
 router = APIRouter(prefix="/graph", tags=["graph"])
 
-try:
-    import community as community_louvain  # python-louvain
-except Exception:
-    community_louvain = None
+# networkx and python-louvain (~0.25 s of imports) are loaded by the first /graph/metrics
+_louvain: Any = None
+
+
+def _graph_libs():
+    """(networkx, python-louvain module or None), imported on first use."""
+    global _louvain
+    import networkx as nx
+
+    if _louvain is None:
+        try:
+            import community  # python-louvain
+
+            _louvain = community
+        except Exception:
+            _louvain = False
+    return nx, _louvain or None
 
 
 def _validate_uri(u: str) -> str:
@@ -32,6 +49,43 @@ def _add_node(nodes_map: Dict[str, Dict[str, Any]], uri: str, label: Optional[st
         nodes_map[uri] = {"id": uri, "label": label or uri}
 
 
+def _one_hop_select(seed_uri: str, foot_filter: str, limit: int) -> str:
+    return f"""
+SELECT
+  ?s
+  (SAMPLE(?sLabel) AS ?sLabel)
+  ?p
+  (SAMPLE(?pLabel) AS ?pLabel)
+  ?o
+  (SAMPLE(?oLabel) AS ?oLabel)
+WHERE {{
+  BIND(<{seed_uri}> AS ?s)
+  ?s ?p ?o .
+  {foot_filter}
+
+  FILTER(isIRI(?o))
+
+  OPTIONAL {{ ?s rdfs:label ?sLabel . FILTER(lang(?sLabel) IN ("en","fr")) }}
+  OPTIONAL {{ ?p rdfs:label ?pLabel . FILTER(lang(?pLabel) IN ("en","fr")) }}
+  OPTIONAL {{ ?o rdfs:label ?oLabel . FILTER(lang(?oLabel) IN ("en","fr")) }}
+}}
+GROUP BY ?s ?p ?o
+LIMIT {limit}
+""".strip()
+
+
+def _one_hop_query(seeds: List[str], foot_filter: str, limit: int) -> str:
+    """
+    1-hop edges of one seed, or of several seeds as a UNION of per-seed sub-queries
+    (each keeps its own LIMIT, so merged seeds get exactly the rows they would alone).
+    """
+    prefix = "PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>\n\n"
+    if len(seeds) == 1:
+        return prefix + _one_hop_select(seeds[0], foot_filter, limit)
+    blocks = "\nUNION\n".join(f"{{ {_one_hop_select(s, foot_filter, limit)} }}" for s in seeds)
+    return prefix + f"SELECT ?s ?sLabel ?p ?pLabel ?o ?oLabel WHERE {{\n{blocks}\n}}"
+
+
 @router.get("", response_model=GraphResponse)
 async def graph(
     seed: str = Query(..., description="Seed entity URI (http(s))"),
@@ -39,7 +93,13 @@ async def graph(
     limit: int = Query(80, ge=1, le=settings.MAX_LIMIT),
     sparql: SparqlClient = Depends(get_sparql_client),
     mode: str = Query("generic", description="generic | foot"),
-):
+) -> Response:
+    with span("graph_build"):
+        g = await build_graph(seed, depth, limit, sparql, mode)
+    return revalidated(lambda: model_response(g))
+
+
+async def build_graph(seed: str, depth: int, limit: int, sparql: SparqlClient, mode: str = "generic") -> GraphResponse:
     seed_uri = _validate_uri(seed)
 
     # Foot-only filter (DBpedia predicates only)
@@ -60,34 +120,13 @@ async def graph(
     ))
     """.rstrip()
 
-    # 1-hop query
-    query_1 = f"""
-PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-
-SELECT
-  ?s
-  (SAMPLE(?sLabel) AS ?sLabel)
-  ?p
-  (SAMPLE(?pLabel) AS ?pLabel)
-  ?o
-  (SAMPLE(?oLabel) AS ?oLabel)
-WHERE {{
-  BIND(<{seed_uri}> AS ?s)
-  ?s ?p ?o .
-  {foot_filter}
-
-  FILTER(isIRI(?o))
-
-  OPTIONAL {{ ?s rdfs:label ?sLabel . FILTER(lang(?sLabel) IN ("en","fr")) }}
-  OPTIONAL {{ ?p rdfs:label ?pLabel . FILTER(lang(?pLabel) IN ("en","fr")) }}
-  OPTIONAL {{ ?o rdfs:label ?oLabel . FILTER(lang(?oLabel) IN ("en","fr")) }}
-}}
-GROUP BY ?s ?p ?o
-LIMIT {limit}
-""".strip()
-
-    data1 = await sparql.query(query=query_1, endpoint="dbpedia", limit=limit, use_cache=True)
-    rows1 = sparql_json_to_rows(data1)
+    # 1-hop query (concurrent /graph calls with the same mode/limit are merged upstream)
+    template = BatchTemplate(
+        name=f"graph-1hop::{'foot' if foot_filter else 'generic'}::{limit}",
+        build=lambda seeds: _one_hop_query(seeds, foot_filter, limit),
+        rows_per_key=limit,
+    )
+    rows1 = await get_query_batcher().fetch(template, seed_uri)
 
     nodes_map: Dict[str, Dict[str, Any]] = {}
     edges: List[Dict[str, Any]] = []
@@ -164,7 +203,8 @@ LIMIT {limit2}
     if len(edges) > 2000:
         edges = edges[:2000]
 
-    return GraphResponse(
+    # Already shaped: no need to validate thousands of node/edge dicts
+    return GraphResponse.model_construct(
         meta=ApiMeta(endpoint="dbpedia", limit=limit, cached=False),
         seed_uri=seed_uri,
         depth=depth,
@@ -181,10 +221,17 @@ async def graph_metrics(
     sparql: SparqlClient = Depends(get_sparql_client),
 ):
     # Reuse graph existing endpoint (DBpedia-only) in "foot" mode
-    g = await graph(seed=seed, depth=depth, limit=limit, sparql=sparql, mode="foot")
+    with span("graph_build"):
+        g = await build_graph(seed, depth, limit, sparql, mode="foot")
+
+    # Same cached rows as last time: skip the centrality computations
+    cached = not_modified()
+    if cached is not None:
+        return cached
 
     nodes = g.nodes
     edges = g.edges
+    nx, community_louvain = _graph_libs()
 
     # Build NetworkX graph (undirected for structural centralities)
     G = nx.Graph()
@@ -194,17 +241,20 @@ async def graph_metrics(
         G.add_edge(e["source"], e["target"], label=e.get("label") or "")
 
     if G.number_of_nodes() == 0:
-        return {"seed_uri": seed, "n_nodes": 0, "n_edges": 0}
+        return with_cache_headers(FastJSONResponse({"seed_uri": seed, "n_nodes": 0, "n_edges": 0}))
 
-    degree = dict(G.degree())
-    pagerank = nx.pagerank(G, alpha=0.85) if G.number_of_nodes() <= 500 else {}
-    betweenness = (
-        nx.betweenness_centrality(G, k=min(80, G.number_of_nodes()), seed=42) if G.number_of_nodes() > 5 else {}
-    )
+    with GRAPH_COMPUTE.time():
+        with span("centrality"):
+            degree = dict(G.degree())
+            pagerank = nx.pagerank(G, alpha=0.85) if G.number_of_nodes() <= 500 else {}
+            betweenness = (
+                nx.betweenness_centrality(G, k=min(80, G.number_of_nodes()), seed=42) if G.number_of_nodes() > 5 else {}
+            )
 
-    communities = {}
-    if community_louvain is not None and G.number_of_nodes() > 3:
-        communities = community_louvain.best_partition(G, random_state=42)
+        communities = {}
+        if community_louvain is not None and G.number_of_nodes() > 3:
+            with span("louvain"):
+                communities = community_louvain.best_partition(G, random_state=42)
 
     def top_k(d, k=10):
         items = sorted(d.items(), key=lambda x: x[1], reverse=True)[:k]
@@ -216,7 +266,7 @@ async def graph_metrics(
     comps = nx.number_connected_components(G)
     density = nx.density(G)
 
-    return {
+    return with_cache_headers(FastJSONResponse({
         "seed_uri": g.seed_uri,
         "depth": g.depth,
         "n_nodes": G.number_of_nodes(),
@@ -226,4 +276,4 @@ async def graph_metrics(
         "top_pagerank": top_k(pagerank, 10) if pagerank else [],
         "top_betweenness": top_k(betweenness, 10) if betweenness else [],
         "communities": communities,
-    }
+    }))
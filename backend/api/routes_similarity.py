@@ -1,34 +1,184 @@
 from __future__ import annotations
 
-from typing import Literal
-from fastapi import APIRouter, Query, HTTPException
+from typing import TYPE_CHECKING, Dict, List, Literal, Optional
+from fastapi import APIRouter, Depends, Query, HTTPException
 
-from api.schemas import SimilarityResponse, ApiMeta
+from api.schemas import BatchSimilarityRequest, BatchSimilarityResponse, SimilarityResponse, ApiMeta
+from api.config import settings
+from api.deps import get_query_batcher, get_similarity_index, get_sparql_client
+from services.batch import chunked, dedupe, run_chunks
+from services.normalize import sparql_json_to_rows
+from services.query_batcher import BatchTemplate, QueryBatcher
+from services.sparql_client import SparqlClient
+
+# services.similarity (numpy) is imported inside the handlers: it is only needed
+# once a similarity index is used, not to start the app
+if TYPE_CHECKING:
+    from services.similarity import SimilarityIndex
 
 router = APIRouter(prefix="/similarity", tags=["similarity"])
 
 EntityType = Literal["player", "club", "stadium"]
+Mode = Literal["exact", "approx"]
 
 
 def _validate_uri(u: str) -> str:
     u = (u or "").strip()
     if not (u.startswith("http://") or u.startswith("https://")):
         raise HTTPException(status_code=400, detail="id must be a valid http(s) URI")
+    if any(x in u for x in ["<", ">", "{", "}", '"', "'"]):
+        raise HTTPException(status_code=400, detail="id contains invalid characters")
     return u
 
 
+_NEIGHBORS_PER_ENTITY = 200
+
+
+def _neighbors_query(uris: List[str]) -> str:
+    """
+    IRI neighbours of one or several entities, as a UNION of per-entity sub-queries
+    (each keeps its own LIMIT, so one hub entity cannot starve the others).
+    """
+    from services.similarity import neighbor_filter
+
+    blocks = "\nUNION\n".join(
+        f"""{{ SELECT DISTINCT (<{u}> AS ?s) ?o WHERE {{
+  <{u}> ?p ?o .
+  {neighbor_filter()}
+  FILTER(isIRI(?o))
+}} LIMIT {_NEIGHBORS_PER_ENTITY} }}"""
+        for u in uris
+    )
+    return f"SELECT ?s ?o WHERE {{\n{blocks}\n}}"
+
+
+# Live neighbour lookups of concurrent /similarity calls share one upstream query
+_NEIGHBORS = BatchTemplate(name="similarity-neighbors", build=_neighbors_query, rows_per_key=_NEIGHBORS_PER_ENTITY)
+
+
+async def _fetch_neighbors(sparql: SparqlClient, uris: List[str]) -> Dict[str, List[str]]:
+    budget = _NEIGHBORS_PER_ENTITY * len(uris)
+    data = await sparql.query(
+        query=_neighbors_query(uris), endpoint="dbpedia", limit=budget, use_cache=True, max_limit=budget
+    )
+
+    out: Dict[str, List[str]] = {u: [] for u in uris}
+    for r in sparql_json_to_rows(data):
+        if r.get("s") in out and r.get("o"):
+            out[r["s"]].append(r["o"])
+    return out
+
+
+async def _index_or_none(entity_type: str) -> Optional[SimilarityIndex]:
+    # No index built yet (scripts/build_similarity_index.py): empty results, as before the index existed
+    index = await get_similarity_index(entity_type)
+    if index is None or len(index) == 0:
+        return None
+    return index
+
+
+def _rank(index: SimilarityIndex, uri: str, tokens, limit: int, mode: str) -> List[Dict]:
+    if mode == "approx":
+        top = index.approximate(tokens, k=limit, exclude=uri)
+    else:
+        top = index.exact(tokens, k=limit, exclude=uri)
+    return [{"uri": u, "score": round(score, 6)} for u, score in top]
+
+
 @router.get("", response_model=SimilarityResponse)
 async def similarity(
     entity_type: EntityType = Query("player"),
     id: str = Query(..., description="Entity URI (http(s))"),
     limit: int = Query(20, ge=1, le=100),
+    mode: Mode = Query("exact", description="exact (cosine over all entities) | approx (MinHash/LSH)"),
+    batcher: QueryBatcher = Depends(get_query_batcher),
 ):
-    _validate_uri(id)
+    uri = _validate_uri(id)
+
+    index = await _index_or_none(entity_type)
+    if index is None:
+        return SimilarityResponse(
+            meta=ApiMeta(endpoint="dbpedia", limit=limit, cached=False),
+            entity_type=entity_type,
+            uri=id,
+            mode=mode,
+            similar=[],
+        )
+
+    # Neighbour set: from the index if the entity is known, otherwise fetched live
+    tokens = index.tokens_of(uri)
+    if tokens is None:
+        from services.similarity import hash_tokens
+
+        rows = await batcher.fetch(_NEIGHBORS, uri)
+        tokens = hash_tokens([r["o"] for r in rows if r.get("o")])
 
-    # Placeholder: similarity module will fill this later.
     return SimilarityResponse(
         meta=ApiMeta(endpoint="dbpedia", limit=limit, cached=False),
         entity_type=entity_type,
         uri=id,
-        similar=[],
+        mode=mode,
+        similar=_rank(index, uri, tokens, limit, mode),
+    )
+
+
+@router.post("/batch", response_model=BatchSimilarityResponse)
+async def similarity_batch(
+    payload: BatchSimilarityRequest,
+    sparql: SparqlClient = Depends(get_sparql_client),
+):
+    """
+    Similar entities for up to BATCH_MAX_IDS URIs. Entities missing from the index
+    get their neighbour sets through a few chunked VALUES queries run concurrently.
+    """
+    ids = dedupe(payload.ids)
+    if len(ids) > settings.BATCH_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"at most {settings.BATCH_MAX_IDS} ids per batch")
+
+    index = await _index_or_none(payload.entity_type)
+
+    errors: Dict[str, str] = {}
+    tokens_by_uri = {}
+    missing: List[str] = []
+    for u in ids:
+        try:
+            _validate_uri(u)
+        except HTTPException as e:
+            errors[u] = str(e.detail)
+            continue
+        if index is None:
+            continue
+        tokens = index.tokens_of(u)
+        if tokens is None:
+            missing.append(u)
+        else:
+            tokens_by_uri[u] = tokens
+
+    async def run(chunk: List[str]) -> Dict[str, List[str]]:
+        return await _fetch_neighbors(sparql, chunk)
+
+    done, chunk_errors = await run_chunks(chunked(missing, settings.BATCH_CHUNK_SIZE), run)
+    errors.update(chunk_errors)
+    from services.similarity import hash_tokens
+
+    for _, neighbors in done:
+        for u, objs in neighbors.items():
+            tokens_by_uri[u] = hash_tokens(objs)
+
+    results: Dict[str, SimilarityResponse] = {}
+    for u in ids:
+        if u in errors or (index is not None and u not in tokens_by_uri):
+            continue
+        results[u] = SimilarityResponse(
+            meta=ApiMeta(endpoint="dbpedia", limit=payload.limit, cached=False),
+            entity_type=payload.entity_type,
+            uri=u,
+            mode=payload.mode,
+            similar=_rank(index, u, tokens_by_uri[u], payload.limit, payload.mode) if index is not None else [],
+        )
+
+    return BatchSimilarityResponse(
+        meta=ApiMeta(endpoint="dbpedia", limit=payload.limit, cached=False),
+        results=results,
+        errors=errors,
     )
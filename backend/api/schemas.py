@@ -41,6 +41,23 @@ class EntityResponse(BaseModel):
     label: Optional[str] = None
     facts: Dict[str, Any] = Field(default_factory=dict)
     neighbors: List[Dict[str, Any]] = Field(default_factory=list)
+    value_counts: Dict[str, int] = Field(default_factory=dict)
+    next_cursor: Optional[str] = None
+
+    model_config = {"extra": "forbid"}
+
+
+class BatchEntityRequest(BaseModel):
+    ids: List[str] = Field(..., min_length=1)
+    limit: Optional[int] = Field(None, ge=1)
+
+    model_config = {"extra": "forbid"}
+
+
+class BatchEntityResponse(BaseModel):
+    meta: ApiMeta
+    results: Dict[str, EntityResponse] = Field(default_factory=dict)
+    errors: Dict[str, str] = Field(default_factory=dict)
 
     model_config = {"extra": "forbid"}
 
@@ -59,11 +76,29 @@ class SimilarityResponse(BaseModel):
     meta: ApiMeta
     entity_type: EntityType
     uri: str
+    mode: Literal["exact", "approx"] = "exact"
     similar: List[Dict[str, Any]]
 
     model_config = {"extra": "forbid"}
 
 
+class BatchSimilarityRequest(BaseModel):
+    ids: List[str] = Field(..., min_length=1)
+    entity_type: EntityType = "player"
+    limit: int = Field(20, ge=1, le=100)
+    mode: Literal["exact", "approx"] = "exact"
+
+    model_config = {"extra": "forbid"}
+
+
+class BatchSimilarityResponse(BaseModel):
+    meta: ApiMeta
+    results: Dict[str, SimilarityResponse] = Field(default_factory=dict)
+    errors: Dict[str, str] = Field(default_factory=dict)
+
+    model_config = {"extra": "forbid"}
+
+
 class AskRequest(BaseModel):
     question: str
     # kept for backward-compat with the frontend, but only "dbpedia" is allowed now
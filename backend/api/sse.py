@@ -0,0 +1,11 @@
+from __future__ import annotations
+
+from typing import Any, Dict
+import json
+
+# Headers for text/event-stream responses (no proxy buffering, no caching)
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
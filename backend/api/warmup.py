@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+from typing import List
+import asyncio
+
+from api.config import settings
+from api.deps import get_query_recorder, get_sparql_client
+from api.routes_dbpedia_foot import home, search
+from api.routes_entity import _detail_query, entity
+from api.routes_graph import graph
+from services.warmup import WarmupJob, WarmupRunner
+
+
+def _split(csv: str) -> List[str]:
+    return [x.strip() for x in (csv or "").split(",") if x.strip()]
+
+
+def build_jobs() -> List[WarmupJob]:
+    """
+    Same calls as the frontend flows (home, search typing, detail, graph + metrics),
+    plus the most frequent queries recorded in production.
+    """
+    sparql = get_sparql_client()
+    jobs: List[WarmupJob] = []
+
+    jobs.append(("home:fr", lambda: asyncio.to_thread(home, lang="fr")))
+
+    for term in _split(settings.WARMUP_SEARCHES):
+        jobs.append((
+            f"search:{term}",
+            lambda term=term: asyncio.to_thread(search, q=term, kind="player", lang="fr", limit=20),
+        ))
+
+    for seed in _split(settings.WARMUP_SEEDS):
+        # /graph and /graph/metrics share the same queries (limit=80, mode=foot)
+        jobs.append((
+            f"graph:{seed}",
+            lambda seed=seed: graph(seed=seed, depth=1, limit=80, sparql=sparql, mode="foot"),
+        ))
+        jobs.append((
+            f"entity:{seed}",
+            lambda seed=seed: entity(
+                id=seed, limit=settings.DEFAULT_LIMIT, per_predicate=10, cursor=None, sparql=sparql
+            ),
+        ))
+        jobs.append((
+            f"detail:{seed}",
+            lambda seed=seed: sparql.query(
+                query=_detail_query(seed),
+                endpoint="dbpedia",
+                limit=settings.DETAIL_MAX_ROWS,
+                max_limit=settings.DETAIL_MAX_ROWS,
+            ),
+        ))
+
+    for limit, query in get_query_recorder().top(settings.WARMUP_TOP_N):
+        jobs.append((
+            f"recorded:{hash(query) & 0xffffffff:08x}",
+            lambda limit=limit, query=query: sparql.query(
+                query=query, endpoint="dbpedia", limit=limit, max_limit=limit
+            ),
+        ))
+
+    return jobs
+
+
+warmup_runner = WarmupRunner(
+    jobs_factory=build_jobs,
+    concurrency=settings.WARMUP_CONCURRENCY,
+    interval_s=settings.WARMUP_INTERVAL_S,
+)
@@ -0,0 +1,89 @@
+"""
+Event-loop responsiveness under /ask load.
+
+Measures /health and /graph latency on an idle server, then again while
+--ask-concurrency clients keep posting to /ask. With a non-blocking LLM
+client both series should stay flat.
+
+Usage (server running, Ollama up or down):
+    python -m bench.bench_ask_event_loop --base-url http://127.0.0.1:8000 --duration 20
+"""
+from __future__ import annotations
+
+from typing import List
+import argparse
+import asyncio
+import time
+
+import httpx
+
+QUESTIONS = [
+    "Dans quel club joue Lionel Messi ?",
+    "Quel est le stade du Real Madrid ?",
+    "Où joue Kylian Mbappé ?",
+    "Quel est le stade de Manchester City ?",
+]
+
+
+def _pct(values: List[float], q: float) -> float:
+    if not values:
+        return float("nan")
+    s = sorted(values)
+    return s[min(len(s) - 1, int(q * len(s)))]
+
+
+async def probe(client: httpx.AsyncClient, path: str, duration: float, out: List[float]) -> None:
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        t = time.perf_counter()
+        try:
+            await client.get(path)
+            out.append((time.perf_counter() - t) * 1000)
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.1)
+
+
+async def ask_load(client: httpx.AsyncClient, duration: float, counter: List[int]) -> None:
+    end = time.perf_counter() + duration
+    i = 0
+    while time.perf_counter() < end:
+        try:
+            await client.post("/ask", json={"question": QUESTIONS[i % len(QUESTIONS)]})
+            counter[0] += 1
+        except httpx.HTTPError:
+            pass
+        i += 1
+
+
+async def phase(base_url: str, duration: float, ask_concurrency: int, graph_path: str) -> None:
+    async with httpx.AsyncClient(base_url=base_url, timeout=120.0) as client:
+        await client.get(graph_path)  # warm the /graph cache so we time the server, not DBpedia
+
+        health: List[float] = []
+        graph: List[float] = []
+        asked = [0]
+        tasks = [probe(client, "/health", duration, health), probe(client, graph_path, duration, graph)]
+        tasks += [ask_load(client, duration, asked) for _ in range(ask_concurrency)]
+        await asyncio.gather(*tasks)
+
+    label = f"ask x{ask_concurrency}" if ask_concurrency else "idle"
+    print(f"[{label:>8}] /health p50={_pct(health, .5):7.1f}ms p95={_pct(health, .95):7.1f}ms | "
+          f"/graph p50={_pct(graph, .5):7.1f}ms p95={_pct(graph, .95):7.1f}ms | /ask done={asked[0]}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--ask-concurrency", type=int, default=8)
+    parser.add_argument("--seed", default="http://dbpedia.org/resource/Lionel_Messi")
+    args = parser.parse_args()
+
+    graph_path = f"/graph?seed={args.seed}&depth=1&limit=80&mode=foot"
+    asyncio.run(phase(args.base_url, args.duration, 0, graph_path))
+    asyncio.run(phase(args.base_url, args.duration, args.ask_concurrency, graph_path))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""
+Reproducible endpoint benchmark: throughput and p50/p95/p99 per route, with
+DBpedia and the LLM replaced by the recorded-response stand-in (sparql_standin).
+
+The stand-in runs in a background thread and the app is driven in-process
+(httpx ASGITransport), so the numbers include everything from routing to
+serialization plus loopback HTTP to the stand-in, and nothing from the network.
+
+Query merging (QUERY_BATCH_WINDOW_MS) is turned off: merged query text depends on
+arrival timing, so it would not match the recorded fixtures. A run in which the
+stand-in missed a fixture fails (exit 1): its numbers would measure error pages.
+
+Fixtures are recorded once against the live endpoint (network needed) and
+committed with the change that alters the queries; CI only replays them:
+
+    python -m bench.bench_endpoints --record https://dbpedia.org/sparql --requests 5
+    git add bench/fixtures/dbpedia
+
+Without a fixture set the benchmark does not run: exit 2 with the command above,
+or exit 0 with --skip-without-fixtures (CI jobs that must not depend on DBpedia).
+
+--cold bypasses the SPARQL caches on every request (upstream path every time;
+the /ask intent/answer caches still apply). --json writes the results for CI;
+--baseline compares against a previous --json file and exits 1 when a scenario's
+p95 or throughput regressed by more than --max-regression.
+
+Usage:
+    python -m bench.bench_endpoints --requests 200 --concurrency 16 --latency-ms 40
+    python -m bench.bench_endpoints --record https://dbpedia.org/sparql --requests 5   # capture fixtures
+    python -m bench.bench_endpoints --json bench.json --baseline main.json
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Tuple
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import sys
+import time
+
+import httpx
+
+from bench.sparql_standin import add_arguments, from_args, serve_in_thread
+
+RES = "http://dbpedia.org/resource/"
+SEEDS = [f"{RES}Lionel_Messi", f"{RES}Cristiano_Ronaldo", f"{RES}Kylian_Mbappé", f"{RES}Zinedine_Zidane"]
+QUESTIONS = [
+    "Dans quel club joue Lionel Messi ?",
+    "Quel est le stade du Real Madrid ?",
+    "Où joue Kylian Mbappé ?",
+    "Quel est le stade de Manchester City ?",
+]
+
+# name -> (method, path, [params or json body per request, cycled])
+SCENARIOS: Dict[str, Tuple[str, str, List[Dict[str, Any]]]] = {
+    "graph": ("GET", "/graph", [{"seed": s, "limit": 50} for s in SEEDS]),
+    "graph_metrics": ("GET", "/graph/metrics", [{"seed": s} for s in SEEDS]),
+    "entity": ("GET", "/entity", [{"id": s, "limit": 30} for s in SEEDS]),
+    "search": ("GET", "/dbpedia-foot/search", [
+        {"q": q, "kind": "player", "lang": "fr", "limit": 20} for q in ("messi", "ronaldo", "mbappe", "zidane")
+    ]),
+    "home": ("GET", "/dbpedia-foot/home", [{"lang": "fr"}, {"lang": "en"}]),
+    "ask": ("POST", "/ask", [{"question": q} for q in QUESTIONS]),
+}
+
+
+def _pct(values: List[float], q: float) -> float:
+    if not values:
+        return float("nan")
+    s = sorted(values)
+    return s[min(len(s) - 1, int(q * len(s)))]
+
+
+async def run_scenario(client: httpx.AsyncClient, name: str, args: argparse.Namespace) -> Dict[str, Any]:
+    from services.cache import cache_bypass
+
+    method, path, variants = SCENARIOS[name]
+    pending = itertools.cycle(variants)
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+
+    async def one() -> None:
+        variant = next(pending)
+        if args.cold:
+            cache_bypass.set(True)  # this task's context only
+        t = time.perf_counter()
+        if method == "GET":
+            resp = await client.get(path, params=variant)
+        else:
+            resp = await client.post(path, json=variant)
+        latencies.append((time.perf_counter() - t) * 1000)
+        statuses[str(resp.status_code)] = statuses.get(str(resp.status_code), 0) + 1
+
+    async def worker(n: int) -> None:
+        for _ in range(n):
+            await asyncio.create_task(one())
+
+    # Warm-up round: fills the caches (warm mode) and the connection pools
+    for _ in range(len(variants)):
+        await one()
+    latencies.clear()
+    statuses.clear()
+
+    per_worker = [args.requests // args.concurrency + (i < args.requests % args.concurrency) for i in range(args.concurrency)]
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker(n) for n in per_worker if n))
+    wall = time.perf_counter() - t0
+
+    errors = sum(n for code, n in statuses.items() if not code.startswith("2"))
+    return {
+        "requests": len(latencies),
+        "rps": round(len(latencies) / wall, 1) if wall else 0.0,
+        "p50_ms": round(_pct(latencies, 0.50), 2),
+        "p95_ms": round(_pct(latencies, 0.95), 2),
+        "p99_ms": round(_pct(latencies, 0.99), 2),
+        "max_ms": round(max(latencies), 2) if latencies else float("nan"),
+        "errors": errors,
+        "status": statuses,
+    }
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Any], max_regression: float) -> List[str]:
+    """Scenarios whose p95 rose or throughput fell by more than max_regression."""
+    failures = []
+    for name, cur in results.items():
+        old = baseline.get("results", {}).get(name)
+        if not old:
+            continue
+        if old["p95_ms"] > 0 and cur["p95_ms"] > old["p95_ms"] * (1 + max_regression):
+            failures.append(f"{name}: p95 {old['p95_ms']}ms -> {cur['p95_ms']}ms")
+        if old["rps"] > 0 and cur["rps"] < old["rps"] * (1 - max_regression):
+            failures.append(f"{name}: throughput {old['rps']} -> {cur['rps']} req/s")
+    return failures
+
+
+async def run(args: argparse.Namespace, names: List[str]) -> Dict[str, Dict[str, Any]]:
+    from api.app import app
+
+    transport = httpx.ASGITransport(app=app)
+    results: Dict[str, Dict[str, Any]] = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120.0) as client:
+        for name in names:
+            results[name] = await run_scenario(client, name, args)
+            r = results[name]
+            print(f"{name:<14} {r['requests']:>6} {r['rps']:>9.1f} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} "
+                  f"{r['p99_ms']:>9.2f} {r['errors']:>7}")
+    return results
+
+
+def main() -> Optional[int]:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated subset of: " + ", ".join(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=200, help="measured requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--cold", action="store_true", help="bypass the SPARQL caches on every request")
+    parser.add_argument("--json", metavar="PATH", help="write results as JSON")
+    parser.add_argument("--baseline", metavar="PATH", help="previous --json output to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.25)
+    parser.add_argument("--skip-without-fixtures", action="store_true",
+                        help="exit 0 instead of 2 when no fixture set is recorded")
+    add_arguments(parser)
+    args = parser.parse_args()
+    args.concurrency = max(1, args.concurrency)
+
+    names = [n.strip() for n in args.scenarios.split(",") if n.strip()]
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+
+    standin = from_args(args)
+    if not len(standin.store) and not args.record:
+        print(f"{'SKIP' if args.skip_without_fixtures else 'ERROR'} no recorded fixtures in {args.fixtures}: record them "
+              "with `python -m bench.bench_endpoints --record https://dbpedia.org/sparql --requests 5`")
+        return 0 if args.skip_without_fixtures else 2
+    server = serve_in_thread(standin)
+    base = f"http://127.0.0.1:{server.port}"
+    # Read by api.config at import time: the app must be imported after this
+    os.environ["DBPEDIA_ENDPOINT"] = f"{base}/sparql"
+    os.environ["LLM_BASE_URL"] = f"{base}/v1"
+    os.environ["INTENT_RULES_ENABLED"] = "0"  # every /ask intent goes through the (stub) LLM
+    os.environ["QUERY_BATCH_WINDOW_MS"] = "0"  # deterministic query text, matching the fixtures
+    os.environ.setdefault("WARMUP_ENABLED", "0")
+
+    print(f"{len(standin.store)} fixtures, latency {args.latency_ms}±{args.jitter_ms}ms, "
+          f"errors {args.error_rate:.0%}, maintenance {args.maintenance_rate:.0%}, "
+          f"{'cold' if args.cold else 'warm'} caches, concurrency {args.concurrency}")
+    print(f"{'scenario':<14} {'reqs':>6} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    loop = asyncio.new_event_loop()
+    try:
+        results = loop.run_until_complete(run(args, names))
+    finally:
+        loop.close()
+        server.should_exit = True
+    print(f"stand-in: {standin.stats}")
+    misses = 0 if args.record else standin.stats["misses"]
+    if misses:
+        print(f"ERROR {misses} queries had no fixture: record them with --record before comparing runs")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({
+                "config": {k: getattr(args, k) for k in (
+                    "requests", "concurrency", "cold", "latency_ms", "jitter_ms", "error_rate", "maintenance_rate",
+                    "llm_latency_ms", "seed",
+                )},
+                "results": results,
+                "fixture_misses": misses,
+            }, f, indent=2)
+
+    if misses:
+        return 1
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            failures = compare(results, json.load(f), args.max_regression)
+        for line in failures:
+            print(f"REGRESSION {line}")
+        return 1 if failures else 0
+    return None
+
+
+if __name__ == "__main__":
+    sys.exit(main())
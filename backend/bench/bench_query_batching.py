@@ -0,0 +1,78 @@
+"""
+Upstream request count with and without query micro-batching.
+
+Fires --requests concurrent /graph-style 1-hop lookups (spread over --seeds
+distinct seeds, in waves of --concurrency) against a fake DBpedia that answers
+after --latency-ms, once with batching disabled (max_batch=1) and once with the
+configured window. Prints upstream queries and wall time for both.
+
+Usage (no network needed):
+    python -m bench.bench_query_batching --requests 400 --seeds 200 --concurrency 50
+"""
+from __future__ import annotations
+
+from typing import Dict
+import argparse
+import asyncio
+import random
+import re
+import time
+
+from api.routes_graph import _one_hop_query
+from services.cache import TTLCache
+from services.query_batcher import BatchTemplate, QueryBatcher
+from services.sparql_client import SparqlClient
+
+
+def _fake_client(latency_s: float, counter: Dict[str, int]) -> SparqlClient:
+    client = SparqlClient(cache=TTLCache(ttl_seconds=600, max_items=100_000))
+
+    async def fake(final_query: str) -> Dict:
+        counter["upstream"] += 1
+        await asyncio.sleep(latency_s)
+        seeds = re.findall(r"BIND\(<([^>]+)>", final_query)
+        bindings = [
+            {"s": {"type": "uri", "value": s}, "p": {"type": "uri", "value": "http://p"},
+             "o": {"type": "uri", "value": f"{s}/o{i}"}}
+            for s in seeds for i in range(5)
+        ]
+        return {"head": {"vars": ["s", "p", "o"]}, "results": {"bindings": bindings}}
+
+    client._request_sparql = fake  # type: ignore[assignment]
+    return client
+
+
+async def run(args: argparse.Namespace, window_ms: int, max_batch: int) -> None:
+    counter = {"upstream": 0}
+    batcher = QueryBatcher(_fake_client(args.latency_ms / 1000, counter), window_s=window_ms / 1000, max_batch=max_batch)
+    template = BatchTemplate(name="bench", build=lambda seeds: _one_hop_query(seeds, "", 80), rows_per_key=80)
+
+    rng = random.Random(42)
+    seeds = [f"http://dbpedia.org/resource/Seed_{rng.randrange(args.seeds)}" for _ in range(args.requests)]
+
+    t0 = time.perf_counter()
+    for i in range(0, len(seeds), args.concurrency):
+        await asyncio.gather(*(batcher.fetch(template, s) for s in seeds[i:i + args.concurrency]))
+    elapsed = time.perf_counter() - t0
+
+    label = f"window={window_ms}ms batch<={max_batch}"
+    print(f"[{label:>22}] upstream={counter['upstream']:5d}  wall={elapsed * 1000:8.1f}ms  "
+          f"avg_batch={batcher.stats()['avg_batch_size']}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--seeds", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=80.0)
+    parser.add_argument("--window-ms", type=int, default=10)
+    parser.add_argument("--max-batch", type=int, default=20)
+    args = parser.parse_args()
+
+    asyncio.run(run(args, window_ms=0, max_batch=1))
+    asyncio.run(run(args, window_ms=args.window_ms, max_batch=args.max_batch))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Server-side cost of producing large JSON responses, and their size on the wire.
+
+"before" is what FastAPI did for a route returning a validated response model:
+build the model, dump it, validate it again against the route's response_model,
+encode with the stdlib JSONResponse. "after" is model_construct + model_response
+(pydantic-core JSON) and FastJSONResponse (orjson) for plain dict routes. Sizes
+are given raw, gzip and brotli (when the brotli package is installed).
+
+Usage (no network needed):
+    python -m bench.bench_responses --edges 2000 --repeat 30
+"""
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, List, Tuple
+import argparse
+import asyncio
+import gzip
+import random
+import time
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute, serialize_response
+
+from api.app import app
+from api.compression import brotli
+from api.responses import FastJSONResponse, model_response
+from api.schemas import ApiMeta, GraphResponse
+
+
+def _graph_payload(edges: int, seed: int = 42) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    res = "http://dbpedia.org/resource/"
+    nodes = [{"id": f"{res}Entity_{i}", "label": f"Entity {i}"} for i in range(edges // 2 + 1)]
+    links = [
+        {
+            "source": nodes[rng.randrange(len(nodes))]["id"],
+            "target": nodes[rng.randrange(len(nodes))]["id"],
+            "label": rng.choice(["team", "position", "birth place", "award", "league"]),
+        }
+        for _ in range(edges)
+    ]
+    return {"seed_uri": f"{res}Lionel_Messi", "depth": 1, "nodes": nodes, "edges": links}
+
+
+def _timeit(fn: Callable[[], Any], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t)
+    return best * 1000
+
+
+def _route_field(path: str):
+    route = next(r for r in app.routes if isinstance(r, APIRoute) and r.path == path)
+    return route.secure_cloned_response_field
+
+
+def _sizes(body: bytes) -> Tuple[int, int, int]:
+    br = len(brotli.compress(body, quality=5)) if brotli is not None else 0
+    return len(body), len(gzip.compress(body, compresslevel=6)), br
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--edges", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    payload = _graph_payload(args.edges)
+    field = _route_field("/graph")
+    meta = {"endpoint": "dbpedia", "limit": 80, "cached": False}
+    loop = asyncio.new_event_loop()
+
+    def graph_before() -> bytes:
+        model = GraphResponse(meta=ApiMeta(**meta), **payload)
+        content = loop.run_until_complete(serialize_response(field=field, response_content=model))
+        return JSONResponse(content).body
+
+    def graph_after() -> bytes:
+        return model_response(GraphResponse.model_construct(meta=ApiMeta(**meta), **payload)).body
+
+    # players-clubs-graph style: plain dict route (jsonable_encoder + stdlib json before)
+    plain = {"lang": "fr", **payload}
+
+    def dict_before() -> bytes:
+        return JSONResponse(loop.run_until_complete(serialize_response(response_content=plain))).body
+
+    def dict_after() -> bytes:
+        return FastJSONResponse(plain).body
+
+    rows: List[Tuple[str, Callable[[], bytes], Callable[[], bytes]]] = [
+        ("graph (response_model)", graph_before, graph_after),
+        ("players-clubs-graph (dict)", dict_before, dict_after),
+    ]
+
+    print(f"{args.edges} edges, brotli: {'yes' if brotli is not None else 'no (pip install brotli)'}")
+    print(f"{'payload':<28} {'before':>9} {'after':>9} {'speedup':>8} | {'raw KB':>7} {'gzip KB':>8} {'br KB':>6}")
+    for name, before, after in rows:
+        t_before = _timeit(before, args.repeat)
+        t_after = _timeit(after, args.repeat)
+        raw, gz, br = _sizes(after())
+        print(f"{name:<28} {t_before:>7.2f}ms {t_after:>7.2f}ms {t_before / t_after:>7.1f}x "
+              f"| {raw / 1024:>7.0f} {gz / 1024:>8.0f} {br / 1024 if br else float('nan'):>6.0f}")
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
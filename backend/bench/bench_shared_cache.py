@@ -0,0 +1,89 @@
+"""
+Upstream SPARQL requests as uvicorn workers are added, with per-process caches
+and with the shared SQLite cache (SHARED_CACHE_PATH).
+
+For each worker count, starts the app against the stand-in (sparql_standin) and
+sends --waves waves of requests. Each wave asks for --keys distinct entities,
+--copies times each, all at once, over fresh connections so they spread across
+workers. Per-process caches pay one upstream query per worker that sees a key.
+The shared cache stays close to one per key, whatever the worker count.
+
+Usage:
+    python -m bench.bench_shared_cache --workers 1,2,4 --keys 20 --copies 8 --latency-ms 100
+"""
+from __future__ import annotations
+
+from typing import Dict, List
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import httpx
+
+from bench.loadtest import start_server
+from bench.sparql_standin import add_arguments, from_args, serve_in_thread
+
+RES = "http://dbpedia.org/resource/"
+
+
+def _upstream(stats: Dict[str, int]) -> int:
+    return stats["hits"] + stats["misses"]
+
+
+async def waves(base: str, args: argparse.Namespace) -> float:
+    # No keep-alive: every request opens a connection, so the kernel spreads them over the workers
+    limits = httpx.Limits(max_keepalive_connections=0)
+    keys = [f"{RES}Bench_Entity_{i}" for i in range(args.keys)]
+    t0 = time.perf_counter()
+    async with httpx.AsyncClient(base_url=base, timeout=120.0, limits=limits) as client:
+        for _ in range(args.waves):
+            requests: List = []
+            for uri in keys:
+                for _ in range(args.copies):
+                    requests.append(client.get("/entity/detail", params={"id": uri}))
+                    requests.append(client.get("/graph", params={"seed": uri, "limit": 50}))
+            await asyncio.gather(*requests)
+    return time.perf_counter() - t0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--keys", type=int, default=20)
+    parser.add_argument("--copies", type=int, default=8)
+    parser.add_argument("--waves", type=int, default=3)
+    add_arguments(parser)
+    # Synthetic entities have no fixtures: only the number of upstream requests matters here
+    parser.set_defaults(latency_ms=100.0, on_miss="empty")
+    args = parser.parse_args()
+    worker_counts = [max(1, int(w)) for w in args.workers.split(",") if w.strip()]
+
+    standin = from_args(args)
+    server = serve_in_thread(standin)
+    standin_base = f"http://127.0.0.1:{server.port}"
+    tmpdir = tempfile.mkdtemp(prefix="shared-cache-")
+
+    print(f"{args.waves} waves x {args.keys} keys x {args.copies} copies x 2 routes, upstream latency {args.latency_ms}ms")
+    print(f"{'workers':>7} {'cache':>8} {'upstream':>9} {'per key':>8} {'wall s':>7}")
+    try:
+        for workers in worker_counts:
+            for mode in ("process", "shared"):
+                path = os.path.join(tmpdir, f"cache-{workers}.db") if mode == "shared" else ""
+                proc, base = start_server(standin_base, workers, [f"SHARED_CACHE_PATH={path}"])
+                try:
+                    time.sleep(1.0)  # /health answered by one worker: give the others time to boot
+                    before = _upstream(standin.stats)
+                    wall = asyncio.run(waves(base, args))
+                    upstream = _upstream(standin.stats) - before
+                finally:
+                    proc.terminate()
+                    proc.wait(timeout=30)
+                print(f"{workers:>7} {mode:>8} {upstream:>9} {upstream / args.keys:>8.2f} {wall:>7.2f}")
+    finally:
+        server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Recall/latency benchmark for /similarity exact vs approx modes.
+
+Runs on a persisted index (--index data/similarity/player.npz) or, by default,
+on a synthetic population shaped like DBpedia players (a few clubs, one
+position, one nationality, one birth place each).
+
+Usage (from backend/):
+    python -m bench.bench_similarity --entities 200000 --queries 200
+"""
+from __future__ import annotations
+
+from typing import Dict, List, Set
+import argparse
+import random
+import statistics
+import time
+
+import numpy as np
+
+from services.similarity import SimilarityIndex
+
+
+def synthetic_population(n: int, seed: int = 7) -> Dict[str, Set[str]]:
+    rng = random.Random(seed)
+    n_clubs = max(50, n // 25)
+    out: Dict[str, Set[str]] = {}
+    for i in range(n):
+        home = rng.randrange(n_clubs)
+        # careers are local: most clubs sit close to the first one
+        clubs = {f"club:{(home + rng.randint(-20, 20)) % n_clubs}" for _ in range(rng.randint(2, 8))}
+        clubs.add(f"club:{home}")
+        out[f"player:{i}"] = clubs | {
+            f"position:{rng.randrange(12)}",
+            f"nation:{rng.randrange(120)}",
+            f"city:{rng.randrange(max(100, n // 50))}",
+        }
+    return out
+
+
+def _pct(values: List[float], q: float) -> float:
+    s = sorted(values)
+    return s[min(len(s) - 1, int(q * len(s)))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--index", default=None, help="persisted .npz index (default: synthetic)")
+    parser.add_argument("--entities", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--num-perm", type=int, default=128)
+    parser.add_argument("--bands", type=int, default=64)
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    if args.index:
+        index = SimilarityIndex.load(args.index)
+    else:
+        index = SimilarityIndex.build(
+            synthetic_population(args.entities), num_perm=args.num_perm, bands=args.bands
+        )
+    print(f"index: {len(index)} entities, num_perm={index.num_perm}, bands={index.bands} "
+          f"({time.perf_counter() - t0:.1f}s to load/build)")
+
+    rng = random.Random(11)
+    sample = rng.sample(index.uris, min(args.queries, len(index)))
+
+    lat = {"exact": [], "approx": []}
+    recalls: List[float] = []
+    for uri in sample:
+        tokens = index.tokens_of(uri)
+
+        t = time.perf_counter()
+        exact = index.exact(tokens, k=args.k, exclude=uri)
+        lat["exact"].append((time.perf_counter() - t) * 1000)
+
+        t = time.perf_counter()
+        approx = index.approximate(tokens, k=args.k, exclude=uri)
+        lat["approx"].append((time.perf_counter() - t) * 1000)
+
+        # tie-aware recall: an approx hit counts if it scores at least the k-th exact score
+        if exact:
+            kth = exact[-1][1]
+            recalls.append(sum(1 for _, score in approx if score >= kth - 1e-9) / len(exact))
+
+    for mode, values in lat.items():
+        print(f"{mode:>6}: p50={_pct(values, 0.5):.2f}ms p95={_pct(values, 0.95):.2f}ms "
+              f"mean={statistics.fmean(values):.2f}ms")
+    print(f"recall@{args.k} (approx vs exact): {float(np.mean(recalls)) if recalls else 0.0:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+SPARQL JSON decode time and cached-result memory: stdlib json + raw bindings
+(the old path) vs orjson + columnar SparqlResult. "miss" = decode a response
+and read its rows, "hit" = read the rows of an already cached result.
+
+Give it recorded DBpedia responses (SPARQL JSON files); without --input it
+builds synthetic ones shaped like /graph and /entity results.
+
+Usage:
+    python -m bench.bench_sparql_decode --input data/recorded/*.json
+    python -m bench.bench_sparql_decode --rows 2000 --repeat 50
+"""
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, List, Tuple
+import argparse
+import gc
+import glob
+import json
+import random
+import time
+import tracemalloc
+
+from services.normalize import to_row
+from services.sparql_results import SparqlResult, loads, orjson
+
+
+def _synthetic(rows: int, seed: int = 42) -> List[Tuple[str, bytes]]:
+    rng = random.Random(seed)
+    res = "http://dbpedia.org/resource/"
+    onto = "http://dbpedia.org/ontology/"
+    preds = [onto + p for p in ("team", "position", "birthPlace", "award", "league", "wikiPageWikiLink")]
+    objects = [f"{res}Entity_{i}" for i in range(rows // 4 + 1)]
+
+    graph = [
+        {
+            "s": {"type": "uri", "value": res + "Lionel_Messi"},
+            "sLabel": {"type": "literal", "xml:lang": "en", "value": "Lionel Messi"},
+            "p": {"type": "uri", "value": rng.choice(preds)},
+            "o": {"type": "uri", "value": rng.choice(objects)},
+            "oLabel": {"type": "literal", "xml:lang": rng.choice(["en", "fr"]), "value": f"Label {rng.randrange(rows)}"},
+        }
+        for _ in range(rows)
+    ]
+    facts = [
+        {
+            "p": {"type": "uri", "value": rng.choice(preds)},
+            "o": (
+                {"type": "typed-literal", "datatype": "http://www.w3.org/2001/XMLSchema#integer", "value": str(rng.randrange(1000))}
+                if rng.random() < 0.3 else {"type": "uri", "value": rng.choice(objects)}
+            ),
+        }
+        for _ in range(rows)
+    ]
+    return [
+        ("synthetic-graph", json.dumps({"head": {"vars": ["s", "sLabel", "p", "o", "oLabel"]}, "results": {"bindings": graph}}).encode()),
+        ("synthetic-facts", json.dumps({"head": {"vars": ["p", "o"]}, "results": {"bindings": facts}}).encode()),
+    ]
+
+
+def _timeit(fn: Callable[[], Any], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t)
+    return best * 1000
+
+
+def _retained_bytes(build: Callable[[], Any]) -> int:
+    gc.collect()
+    tracemalloc.start()
+    obj = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del obj
+    return current
+
+
+def bench(name: str, content: bytes, repeat: int) -> Dict[str, Any]:
+    data = json.loads(content)
+    first = (data.get("head") or {}).get("vars", [None])[0]
+    raw_cached = json.loads(content)
+    col_cached = SparqlResult.from_json(loads(content))
+
+    # cache miss: decode the body, build rows, read one column
+    def old_miss():
+        rows = [to_row(b) for b in json.loads(content)["results"]["bindings"]]
+        return [r.get(first) for r in rows]
+
+    def new_miss():
+        return [r.get(first) for r in SparqlResult.from_json(loads(content)).rows()]
+
+    # cache hit: rows from the cached object (the raw form was re-flattened on every hit)
+    def old_hit():
+        return [to_row(b).get(first) for b in raw_cached["results"]["bindings"]]
+
+    def new_hit():
+        return [r.get(first) for r in col_cached.rows()]
+
+    return {
+        "name": name,
+        "rows": len(data["results"]["bindings"]),
+        "old_ms": _timeit(old_miss, repeat),
+        "new_ms": _timeit(new_miss, repeat),
+        "old_hit_ms": _timeit(old_hit, repeat),
+        "new_hit_ms": _timeit(new_hit, repeat),
+        # what the cache holds: the raw decoded JSON before, the columnar result now
+        "old_bytes": _retained_bytes(lambda: json.loads(content)),
+        "new_bytes": _retained_bytes(lambda: SparqlResult.from_json(loads(content))),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--input", nargs="*", default=[], help="recorded SPARQL JSON responses (globs allowed)")
+    parser.add_argument("--rows", type=int, default=2000, help="rows per synthetic response")
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    files = sorted({p for pattern in args.input for p in glob.glob(pattern)})
+    if files:
+        samples = []
+        for path in files:
+            with open(path, "rb") as f:
+                samples.append((path, f.read()))
+    else:
+        samples = _synthetic(args.rows)
+
+    print(f"orjson: {'yes' if orjson is not None else 'no (stdlib fallback)'}")
+    print(f"{'response':<32} {'rows':>6} | {'miss old':>9} {'miss new':>9} | {'hit old':>9} {'hit new':>9} "
+          f"| {'raw KB':>7} {'col KB':>7} {'ratio':>6}")
+    for name, content in samples:
+        r = bench(name, content, args.repeat)
+        print(f"{r['name'][-32:]:<32} {r['rows']:>6} | {r['old_ms']:>7.2f}ms {r['new_ms']:>7.2f}ms "
+              f"| {r['old_hit_ms']:>7.2f}ms {r['new_hit_ms']:>7.2f}ms "
+              f"| {r['old_bytes'] / 1024:>7.0f} {r['new_bytes'] / 1024:>7.0f} {r['old_bytes'] / max(1, r['new_bytes']):>5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Application startup cost: `import api.app` in a fresh interpreter, the modules
+that weigh the most (python -X importtime), and the time for a uvicorn worker to
+answer /health after being spawned.
+
+Usage:
+    python -m bench.bench_startup --repeat 5 --top 15
+    python -m bench.bench_startup --no-server   # import time only
+"""
+from __future__ import annotations
+
+from typing import Dict, List, Tuple
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_SNIPPET = "import time; t = time.perf_counter(); import api.app; print(time.perf_counter() - t)"
+
+
+def import_once() -> Tuple[float, str]:
+    """(seconds to import api.app, -X importtime report)"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _SNIPPET],
+        cwd=BACKEND, capture_output=True, text=True, check=True,
+    )
+    return float(proc.stdout.strip().splitlines()[-1]), proc.stderr
+
+
+def heaviest(report: str, top: int) -> List[Tuple[str, float]]:
+    """
+    Cumulative ms of top-level packages and of the app's own modules (api.*,
+    services.*), from an importtime report.
+    """
+    out: Dict[str, float] = {}
+    for line in report.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        name = name.strip()
+        if "." not in name or name.startswith(("api.", "services.")):
+            out[name] = max(out.get(name, 0.0), int(cumulative) / 1000)
+    out.pop("api.app", None)
+    return sorted(out.items(), key=lambda kv: kv[1], reverse=True)[:top]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def spawn_once(timeout_s: float = 60.0) -> float:
+    """Seconds from starting uvicorn to the first 200 on /health."""
+    port = _free_port()
+    env = {**os.environ, "WARMUP_ENABLED": "0"}
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.app:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=BACKEND, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - t0 < timeout_s:
+            if proc.poll() is not None:
+                raise SystemExit(f"uvicorn exited with {proc.returncode}")
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/health", timeout=0.5).status_code == 200:
+                    return time.perf_counter() - t0
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.01)
+        raise SystemExit(f"uvicorn did not answer within {timeout_s}s")
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--no-server", action="store_true", help="skip the uvicorn spawn measurement")
+    args = parser.parse_args()
+
+    runs = [import_once() for _ in range(max(1, args.repeat))]
+    times = [t for t, _ in runs]
+    print(f"import api.app: median {statistics.median(times) * 1000:.0f}ms, min {min(times) * 1000:.0f}ms "
+          f"({len(times)} runs)")
+
+    # Report of the fastest run (least disturbed by the rest of the machine)
+    report = min(runs, key=lambda r: r[0])[1]
+    print("\nheaviest imports (cumulative ms):")
+    for name, ms in heaviest(report, args.top):
+        print(f"  {ms:>8.1f}  {name}")
+
+    if not args.no_server:
+        spawns = [spawn_once() for _ in range(max(1, args.repeat))]
+        print(f"\nuvicorn spawn -> /health: median {statistics.median(spawns) * 1000:.0f}ms, "
+              f"min {min(spawns) * 1000:.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
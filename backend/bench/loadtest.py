@@ -0,0 +1,328 @@
+"""
+Load test: how many concurrent users a uvicorn deployment serves, with a weighted
+mix of frontend flows and DBpedia/LLM replaced by the stand-in (sparql_standin).
+
+Each virtual user loops: pick a flow by weight, run its requests in order (with
+the frontend's pauses, e.g. between keystrokes), think, repeat. Flows:
+home page, search typing (one request per keystroke), detail view (entity +
+detail), graph + metrics, ask. The sweep runs each --users level for --duration
+seconds and reports throughput, p50/p95/p99 and errors per level, the saturation
+point (first level within 5% of peak throughput) and the largest level meeting
+--slo-p95-ms. Requests carry X-Profile so the server's Server-Timing gives a
+per-stage breakdown (sparql, normalize, graph_build, centrality, llm...).
+
+By default the harness starts the stand-in and `uvicorn api.app:app` itself
+(--workers, --env KEY=VALUE for cache settings); --base-url targets a server
+that is already running instead (stage breakdown then needs PROFILE_TOKEN=<--token>).
+
+Usage:
+    python -m bench.loadtest --users 1,4,16,64 --duration 20 --latency-ms 60 --jitter-ms 30
+    python -m bench.loadtest --workers 2 --env CACHE_TTL_S=60 --json w2.json
+"""
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+from bench.sparql_standin import add_arguments, from_args, serve_in_thread
+
+RES = "http://dbpedia.org/resource/"
+PLAYERS = ["Lionel_Messi", "Cristiano_Ronaldo", "Kylian_Mbappé", "Zinedine_Zidane", "Karim_Benzema", "Neymar"]
+CLUBS = ["Paris_Saint-Germain_F.C.", "FC_Barcelona", "Real_Madrid_CF", "Olympique_Lyonnais"]
+TYPED = ["messi", "ronaldo", "mbappe", "zidane", "benzema", "neymar"]
+QUESTIONS = [
+    "Dans quel club joue Lionel Messi ?",
+    "Quel est le stade du Real Madrid ?",
+    "Où joue Kylian Mbappé ?",
+    "Quel est le stade de Manchester City ?",
+]
+
+# One step: (name, method, path, params or json body, pause after in seconds)
+Step = Tuple[str, str, str, Dict[str, Any], float]
+
+
+def _home(rng: random.Random) -> List[Step]:
+    return [("home", "GET", "/dbpedia-foot/home", {"lang": "fr"}, 0.0)]
+
+
+def _search_typing(rng: random.Random) -> List[Step]:
+    word = rng.choice(TYPED)
+    # one request per keystroke from 2 characters on (min_length of /search)
+    return [
+        ("search", "GET", "/dbpedia-foot/search", {"q": word[:n], "kind": "player", "lang": "fr", "limit": 20}, 0.15)
+        for n in range(2, len(word) + 1)
+    ]
+
+
+def _detail(rng: random.Random) -> List[Step]:
+    uri = RES + rng.choice(PLAYERS + CLUBS)
+    return [
+        ("entity", "GET", "/entity", {"id": uri, "limit": 30}, 0.3),
+        ("entity_detail", "GET", "/entity/detail", {"id": uri}, 0.0),
+    ]
+
+
+def _graph(rng: random.Random) -> List[Step]:
+    seed = RES + rng.choice(PLAYERS)
+    return [
+        ("graph", "GET", "/graph", {"seed": seed, "limit": 50}, 0.2),
+        ("graph_metrics", "GET", "/graph/metrics", {"seed": seed}, 0.0),
+    ]
+
+
+def _ask(rng: random.Random) -> List[Step]:
+    return [("ask", "POST", "/ask", {"question": rng.choice(QUESTIONS)}, 0.0)]
+
+
+# name -> (weight, steps builder)
+FLOWS: Dict[str, Tuple[float, Callable[[random.Random], List[Step]]]] = {
+    "home": (30, _home),
+    "search_typing": (25, _search_typing),
+    "detail": (20, _detail),
+    "graph": (15, _graph),
+    "ask": (10, _ask),
+}
+
+
+def _pct(values: List[float], q: float) -> float:
+    if not values:
+        return float("nan")
+    s = sorted(values)
+    return s[min(len(s) - 1, int(q * len(s)))]
+
+
+def _server_timing(header: Optional[str]) -> Dict[str, float]:
+    """`sparql;dur=12.3;desc="2 calls", total;dur=15` -> {"sparql": 12.3, "total": 15.0}"""
+    out: Dict[str, float] = {}
+    for entry in (header or "").split(","):
+        name, *params = [p.strip() for p in entry.split(";")]
+        for p in params:
+            if p.startswith("dur="):
+                try:
+                    out[name] = float(p[4:])
+                except ValueError:
+                    pass
+    return out
+
+
+class Sample:
+    __slots__ = ("step", "ms", "status", "stages")
+
+    def __init__(self, step: str, ms: float, status: int, stages: Dict[str, float]):
+        self.step = step
+        self.ms = ms
+        self.status = status
+        self.stages = stages
+
+
+async def virtual_user(
+    client: httpx.AsyncClient, rng: random.Random, end: float, think_s: float, headers: Dict[str, str], out: List[Sample]
+) -> None:
+    names = list(FLOWS)
+    weights = [FLOWS[n][0] for n in names]
+    while time.perf_counter() < end:
+        for step, method, path, payload, pause in FLOWS[rng.choices(names, weights)[0]][1](rng):
+            if time.perf_counter() >= end:
+                return
+            t = time.perf_counter()
+            try:
+                if method == "GET":
+                    resp = await client.get(path, params=payload, headers=headers)
+                else:
+                    resp = await client.post(path, json=payload, headers=headers)
+                status, stages = resp.status_code, _server_timing(resp.headers.get("server-timing"))
+            except httpx.HTTPError:
+                status, stages = 0, {}
+            out.append(Sample(step, (time.perf_counter() - t) * 1000, status, stages))
+            if pause:
+                await asyncio.sleep(pause)
+        # think time between flows, exponential around --think-ms
+        await asyncio.sleep(rng.expovariate(1 / think_s) if think_s > 0 else 0)
+
+
+def summarize(samples: List[Sample], wall: float) -> Dict[str, Any]:
+    ms = [s.ms for s in samples]
+    errors = sum(1 for s in samples if not 200 <= s.status < 400)
+    steps: Dict[str, Dict[str, Any]] = {}
+    for name in sorted({s.step for s in samples}):
+        mine = [s for s in samples if s.step == name]
+        stage_totals: Dict[str, float] = {}
+        for s in mine:
+            for stage, dur in s.stages.items():
+                stage_totals[stage] = stage_totals.get(stage, 0.0) + dur
+        steps[name] = {
+            "requests": len(mine),
+            "p50_ms": round(_pct([s.ms for s in mine], 0.50), 2),
+            "p95_ms": round(_pct([s.ms for s in mine], 0.95), 2),
+            # mean server-side ms per request and stage (stages overlap, see Server-Timing)
+            "stages_ms": {k: round(v / len(mine), 2) for k, v in sorted(stage_totals.items())},
+        }
+    return {
+        "requests": len(samples),
+        "rps": round(len(samples) / wall, 1) if wall else 0.0,
+        "p50_ms": round(_pct(ms, 0.50), 2),
+        "p95_ms": round(_pct(ms, 0.95), 2),
+        "p99_ms": round(_pct(ms, 0.99), 2),
+        "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+        "steps": steps,
+    }
+
+
+async def run_level(base_url: str, users: int, args: argparse.Namespace) -> Dict[str, Any]:
+    samples: List[Sample] = []
+    headers = {"X-Profile": args.token} if args.token else {}
+    limits = httpx.Limits(max_connections=users, max_keepalive_connections=users)
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        end = time.perf_counter() + args.duration
+        t0 = time.perf_counter()
+        await asyncio.gather(*(
+            virtual_user(client, random.Random(args.seed * 1000 + i), end, args.think_ms / 1000, headers, samples)
+            for i in range(users)
+        ))
+        wall = time.perf_counter() - t0
+    return summarize(samples, wall)
+
+
+def capacity(levels: Dict[int, Dict[str, Any]], slo_p95_ms: float, max_error_rate: float) -> Dict[str, Optional[int]]:
+    peak = max((r["rps"] for r in levels.values()), default=0.0)
+    saturation = next((u for u, r in sorted(levels.items()) if r["rps"] >= 0.95 * peak), None)
+    within_slo = [
+        u for u, r in sorted(levels.items()) if r["p95_ms"] <= slo_p95_ms and r["error_rate"] <= max_error_rate
+    ]
+    return {"saturation_users": saturation, "slo_users": within_slo[-1] if within_slo else None}
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(
+    standin_base: str, workers: int = 1, env_items: Sequence[str] = (), token: str = "", server_log: str = os.devnull
+) -> Tuple[subprocess.Popen, str]:
+    """uvicorn api.app:app in a subprocess, wired to the stand-in; returns (process, base URL)."""
+    port = _free_port()
+    env = dict(os.environ)
+    env.update({
+        "DBPEDIA_ENDPOINT": f"{standin_base}/sparql",
+        "LLM_BASE_URL": f"{standin_base}/v1",
+        "INTENT_RULES_ENABLED": "0",
+        "WARMUP_ENABLED": "0",
+        "PROFILE_TOKEN": token,
+        "QUERY_BATCH_WINDOW_MS": "0",  # merged query text depends on timing and would miss the fixtures
+    })
+    for item in env_items:
+        key, _, value = item.partition("=")
+        env[key] = value
+    log = open(server_log, "ab")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.app:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        env=env,
+        stdout=log,
+        stderr=subprocess.STDOUT,
+    )
+    log.close()  # the child keeps its own handle
+    base = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"uvicorn exited with {proc.returncode}")
+        try:
+            if httpx.get(f"{base}/health", timeout=1.0).status_code == 200:
+                return proc, base
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    proc.terminate()
+    raise SystemExit("uvicorn did not start within 60s")
+
+
+def report(levels: Dict[int, Dict[str, Any]], cap: Dict[str, Optional[int]], slo_p95_ms: float) -> None:
+    print(f"\n{'users':>6} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for users, r in sorted(levels.items()):
+        print(f"{users:>6} {r['rps']:>8.1f} {r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f} {r['p99_ms']:>9.1f} "
+              f"{r['error_rate']:>7.1%}")
+    print(f"\nsaturation: {cap['saturation_users']} users (>= 95% of peak throughput)")
+    print(f"p95 <= {slo_p95_ms:.0f}ms: up to {cap['slo_users']} users")
+
+    at = cap["saturation_users"] or max(levels)
+    print(f"\nper step at {at} users (p50/p95, then mean server-side ms per stage)")
+    for step, r in levels[at]["steps"].items():
+        stages = ", ".join(f"{k}={v}" for k, v in r["stages_ms"].items()) or "-"
+        print(f"  {step:<14} {r['requests']:>6} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f}  {stages}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", default="1,2,4,8,16,32,64", help="concurrency levels (virtual users)")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds per level")
+    parser.add_argument("--think-ms", type=float, default=500.0, help="mean pause between flows")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--slo-p95-ms", type=float, default=500.0)
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--base-url", help="target a running server instead of starting one")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--server-log", default=os.devnull, metavar="PATH", help="uvicorn output (default: discarded)")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="server setting (repeatable)")
+    parser.add_argument("--token", default="loadtest", help="PROFILE_TOKEN sent as X-Profile ('' = no breakdown)")
+    parser.add_argument("--json", metavar="PATH", help="write every level as JSON")
+    add_arguments(parser)
+    args = parser.parse_args()
+    users_levels = sorted({max(1, int(u)) for u in args.users.split(",") if u.strip()})
+
+    server = proc = None
+    if args.base_url:
+        base = args.base_url.rstrip("/")
+    else:
+        standin = from_args(args)
+        server = serve_in_thread(standin)
+        proc, base = start_server(
+            f"http://127.0.0.1:{server.port}", args.workers, args.env, args.token, args.server_log
+        )
+        print(f"uvicorn x{args.workers} on {base}, stand-in with {len(standin.store)} fixtures, "
+              f"latency {args.latency_ms}±{args.jitter_ms}ms")
+
+    levels: Dict[int, Dict[str, Any]] = {}
+    try:
+        for users in users_levels:
+            levels[users] = asyncio.run(run_level(base, users, args))
+            r = levels[users]
+            print(f"{users:>4} users: {r['rps']:.1f} req/s, p95 {r['p95_ms']:.1f}ms, errors {r['error_rate']:.1%}")
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=30)
+        if server is not None:
+            server.should_exit = True
+
+    cap = capacity(levels, args.slo_p95_ms, args.max_error_rate)
+    report(levels, cap, args.slo_p95_ms)
+    if server is not None and standin.stats["misses"] and not args.record:
+        print(f"WARNING {standin.stats['misses']} queries had no fixture (answered 404, counted as errors)")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({
+                "config": {"workers": args.workers, "env": args.env, "duration": args.duration,
+                           "think_ms": args.think_ms, "latency_ms": args.latency_ms, "jitter_ms": args.jitter_ms,
+                           "error_rate": args.error_rate, "base_url": args.base_url},
+                "capacity": cap,
+                "levels": {str(u): r for u, r in sorted(levels.items())},
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""
+Local stand-in for dbpedia.org/sparql (and for the LLM) that replays recorded
+responses, so benchmarks run without the live endpoint.
+
+Fixtures are one JSON file per query ({query, status, content_type, body}), named
+after the query hash, so they can be committed and diffed. No fixture set ships
+with the repo: recording needs the live endpoint, so it is a manual step (see
+bench_endpoints) whose output is committed under fixtures/dbpedia. In --record mode,
+queries without a fixture are forwarded to the real endpoint and the answer saved:
+point DBPEDIA_ENDPOINT at the stand-in and use the app (or run bench_endpoints
+with --record) to capture both SparqlClient and DBpediaService traffic.
+
+A query without fixture gets a 404 (--on-miss empty: an empty result set), and
+is counted in the `misses` stat that the benchmarks check.
+
+Fault injection applies to every SPARQL request: --latency-ms/--jitter-ms delay,
+--error-rate answers 503, --maintenance-rate answers DBpedia's HTML maintenance
+page with a 200. /v1/chat/completions is a stub OpenAI-compatible LLM (intent JSON
+after --llm-latency-ms), for LLM_BASE_URL.
+
+Usage:
+    python -m bench.sparql_standin --port 8890 --latency-ms 80 --jitter-ms 40
+    python -m bench.sparql_standin --port 8890 --record https://dbpedia.org/sparql
+    DBPEDIA_ENDPOINT=http://127.0.0.1:8890/sparql LLM_BASE_URL=http://127.0.0.1:8890/v1 uvicorn api.app:app
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, Optional
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from urllib.parse import parse_qsl
+
+import httpx
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+DEFAULT_FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "dbpedia")
+DEFAULT_ON_MISS = "404"
+
+_EMPTY = json.dumps({"head": {"vars": []}, "results": {"bindings": []}})
+_MAINTENANCE = "<html><body><h1>Web Site Under Maintenance</h1></body></html>"
+
+
+async def _form(request: Request) -> Dict[str, str]:
+    # urlencoded POST body (request.form() would need python-multipart)
+    return dict(parse_qsl((await request.body()).decode("utf-8"), keep_blank_values=True))
+
+
+class FixtureStore:
+    """Recorded responses keyed by the query text (whitespace at the ends ignored)."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self._items: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        if os.path.isdir(root):
+            for name in os.listdir(root):
+                if name.endswith(".json"):
+                    with open(os.path.join(root, name), encoding="utf-8") as f:
+                        item = json.load(f)
+                    self._items[self.key(item["query"])] = item
+
+    @staticmethod
+    def key(query: str) -> str:
+        return hashlib.sha256(query.strip().encode("utf-8")).hexdigest()[:32]
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, query: str) -> Optional[Dict[str, Any]]:
+        return self._items.get(self.key(query))
+
+    def put(self, query: str, status: int, content_type: str, body: str) -> None:
+        key = self.key(query)
+        item = {"query": query.strip(), "status": status, "content_type": content_type, "body": body}
+        with self._lock:
+            self._items[key] = item
+            os.makedirs(self.root, exist_ok=True)
+            with open(os.path.join(self.root, f"{key}.json"), "w", encoding="utf-8") as f:
+                json.dump(item, f, ensure_ascii=False, indent=1)
+
+
+class StandIn:
+    def __init__(
+        self,
+        store: FixtureStore,
+        record_url: Optional[str] = None,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        maintenance_rate: float = 0.0,
+        llm_latency_ms: float = 0.0,
+        on_miss: str = DEFAULT_ON_MISS,
+        seed: int = 42,
+    ):
+        self.store = store
+        self.record_url = record_url
+        self.latency_s = latency_ms / 1000
+        self.jitter_s = jitter_ms / 1000
+        self.error_rate = error_rate
+        self.maintenance_rate = maintenance_rate
+        self.llm_latency_s = llm_latency_ms / 1000
+        self.on_miss = on_miss
+        self.rng = random.Random(seed)
+        self.stats = {"hits": 0, "misses": 0, "recorded": 0, "errors_injected": 0, "maintenance_injected": 0, "llm": 0}
+        self._upstream: Optional[httpx.AsyncClient] = None
+
+    async def _delay(self, base_s: float) -> None:
+        delay = base_s + (self.rng.uniform(-self.jitter_s, self.jitter_s) if self.jitter_s else 0.0)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def _record(self, request: Request, query: str) -> Response:
+        if self._upstream is None:
+            self._upstream = httpx.AsyncClient(timeout=60.0, follow_redirects=True)
+        headers = {"Accept": request.headers.get("accept", "application/sparql-results+json")}
+        if request.method == "POST":
+            # Long queries: forwarded the same way, a GET URL would be too long upstream
+            resp = await self._upstream.post(self.record_url, data=await _form(request), headers=headers)
+        else:
+            resp = await self._upstream.get(
+                self.record_url,
+                params=list(request.query_params.multi_items()) or {"query": query},
+                headers=headers,
+            )
+        ctype = resp.headers.get("content-type", "")
+        if resp.status_code == 200 and "json" in ctype:
+            self.store.put(query, resp.status_code, ctype, resp.text)
+            self.stats["recorded"] += 1
+        return Response(resp.content, status_code=resp.status_code, media_type=ctype or None)
+
+    async def sparql(self, request: Request) -> Response:
+        params = await _form(request) if request.method == "POST" else request.query_params
+        query = params.get("query") or ""
+
+        await self._delay(self.latency_s)
+        roll = self.rng.random()
+        if roll < self.error_rate:
+            self.stats["errors_injected"] += 1
+            return Response("Service Unavailable", status_code=503, headers={"Retry-After": "0"})
+        if roll < self.error_rate + self.maintenance_rate:
+            self.stats["maintenance_injected"] += 1
+            return Response(_MAINTENANCE, media_type="text/html")
+
+        item = self.store.get(query)
+        if item is not None:
+            self.stats["hits"] += 1
+            return Response(item["body"], status_code=item["status"], media_type=item["content_type"])
+
+        self.stats["misses"] += 1
+        if self.record_url:
+            return await self._record(request, query)
+        if self.on_miss == "404":
+            return Response("no fixture for this query", status_code=404)
+        return Response(_EMPTY, media_type="application/sparql-results+json")
+
+    async def chat_completions(self, request: Request) -> Response:
+        """OpenAI chat completion with the intent JSON the /ask prompt asks for."""
+        body = await request.json()
+        prompt = " ".join(str(m.get("content", "")) for m in body.get("messages", []))
+        self.stats["llm"] += 1
+        await self._delay(self.llm_latency_s)
+
+        m = re.search(r'question : "([^"]*)"', prompt)
+        question = m.group(1) if m else prompt
+        intent = "club_stadium" if re.search(r"stade|stadium", question, re.I) else "player_club"
+        names = re.findall(r"[A-ZÀ-Ý][\w'-]+(?:\s+[A-ZÀ-Ý][\w'-]+)*", question[1:])
+        content = json.dumps({"intent": intent, "entity": names[-1] if names else question})
+        return JSONResponse({
+            "id": "standin",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "standin"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        })
+
+    async def status(self, request: Request) -> Response:
+        return JSONResponse({"fixtures": len(self.store), **self.stats})
+
+    def app(self) -> Starlette:
+        return Starlette(routes=[
+            Route("/sparql", self.sparql, methods=["GET", "POST"]),
+            Route("/v1/chat/completions", self.chat_completions, methods=["POST"]),
+            Route("/_standin", self.status),
+        ])
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES, help="fixture directory")
+    parser.add_argument("--record", metavar="URL", help="forward misses to this endpoint and save them")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of 503 answers")
+    parser.add_argument("--maintenance-rate", type=float, default=0.0, help="share of HTML maintenance pages")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0)
+    parser.add_argument("--on-miss", choices=("404", "empty"), default=DEFAULT_ON_MISS,
+                        help="answer to a query without fixture (empty: an empty result set)")
+    parser.add_argument("--seed", type=int, default=42)
+
+
+def from_args(args: argparse.Namespace) -> StandIn:
+    return StandIn(
+        FixtureStore(args.fixtures),
+        record_url=args.record,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        maintenance_rate=args.maintenance_rate,
+        llm_latency_ms=args.llm_latency_ms,
+        on_miss=args.on_miss,
+        seed=args.seed,
+    )
+
+
+def serve_in_thread(standin: StandIn, host: str = "127.0.0.1", port: int = 0) -> uvicorn.Server:
+    """Start the stand-in in a background thread; the bound port is server.port."""
+    server = uvicorn.Server(uvicorn.Config(standin.app(), host=host, port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, name="sparql-standin", daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    server.port = server.servers[0].sockets[0].getsockname()[1]  # type: ignore[attr-defined]
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8890)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    standin = from_args(args)
+    print(f"{len(standin.store)} fixtures from {args.fixtures}"
+          + (f", recording misses from {args.record}" if args.record else ""))
+    uvicorn.run(standin.app(), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Harvest player/club labels from DBpedia into the /ask gazetteer.
+
+Usage (from backend/):
+    python -m scripts.build_gazetteer --max-rows 200000
+"""
+from __future__ import annotations
+
+from typing import Dict, List
+import argparse
+import asyncio
+import json
+import logging
+import os
+
+from fastapi import HTTPException
+
+from api.config import settings
+from services.cache import TTLCache
+from services.intent_rules import normalize_text
+from services.sparql_client import SparqlClient
+from services.sparql_paging import paginate
+
+logger = logging.getLogger(__name__)
+
+KINDS = {
+    "player": "http://dbpedia.org/ontology/SoccerPlayer",
+    "club": "http://dbpedia.org/ontology/SoccerClub",
+}
+
+
+async def harvest(sparql: SparqlClient, kind: str, page_size: int, max_rows: int) -> List[str]:
+    """
+    Labels of every entity of `kind`, paged through sparql_paging.paginate (deep
+    sorted offsets fail on Virtuoso otherwise). An upstream error aborts the run:
+    a partial harvest would be saved as if it were the whole gazetteer.
+    """
+    query = f"""
+PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+SELECT DISTINCT ?label WHERE {{
+  ?s a <{KINDS[kind]}> ; rdfs:label ?label .
+  FILTER(lang(?label) IN ("fr","en"))
+}}
+ORDER BY ?label
+""".strip()
+
+    labels: List[str] = []
+    try:
+        async for page in paginate(sparql, query, page_size=page_size, max_rows=max_rows,
+                                   concurrency=settings.PAGE_CONCURRENCY, use_cache=False):
+            labels.extend(r["label"] for r in page if r.get("label"))
+            logger.info("%s: rows=%d", kind, len(labels))
+    except HTTPException as e:
+        raise SystemExit(f"DBpedia failed on {kind} after {len(labels)} labels ({e.status_code}: {e.detail}), "
+                         "gazetteer not written")
+    return labels
+
+
+async def harvest_all(page_size: int, max_rows: int) -> Dict[str, List[str]]:
+    sparql = SparqlClient(cache=TTLCache(ttl_seconds=1, max_items=1))
+    return {kind: await harvest(sparql, kind, page_size, max_rows) for kind in KINDS}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page-size", type=int, default=10000)
+    parser.add_argument("--max-rows", type=int, default=200000)
+    parser.add_argument("--out", default=settings.GAZETTEER_PATH)
+    args = parser.parse_args()
+
+    entries: Dict[str, Dict[str, str]] = {}
+    for kind, labels in asyncio.run(harvest_all(args.page_size, args.max_rows)).items():
+        for label in labels:
+            # Drop the "(footballer, born 1987)" style disambiguation suffix
+            clean = label.split(" (")[0].strip()
+            key = normalize_text(clean)
+            if key and key not in entries:
+                entries[key] = {"label": clean, "kind": kind}
+
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(list(entries.values()), f, ensure_ascii=False)
+    print(f"{len(entries)} labels -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Harvest neighbour sets from DBpedia and build the MinHash/LSH similarity index.
+
+Usage (from backend/):
+    python -m scripts.build_similarity_index --kind player --max-rows 500000
+"""
+from __future__ import annotations
+
+from typing import Dict, Set
+import argparse
+import asyncio
+import logging
+import time
+
+from fastapi import HTTPException
+
+from api.config import settings
+from services.cache import TTLCache
+from services.similarity import SimilarityIndex, index_path, neighbor_filter, type_for_kind
+from services.sparql_client import SparqlClient
+from services.sparql_paging import paginate
+
+logger = logging.getLogger(__name__)
+
+
+async def harvest(kind: str, page_size: int, max_rows: int) -> Dict[str, Set[str]]:
+    """
+    Neighbour sets of every entity of `kind`, paged through sparql_paging.paginate
+    (deep sorted offsets fail on Virtuoso otherwise). An upstream error aborts the
+    run: a partial harvest would be saved as if it were the whole index.
+    """
+    rdf_type = type_for_kind(kind)
+    if not rdf_type:
+        raise SystemExit(f"Unknown kind: {kind}")
+
+    query = f"""
+SELECT ?s ?o WHERE {{
+  ?s a <{rdf_type}> .
+  ?s ?p ?o .
+  {neighbor_filter()}
+  FILTER(isIRI(?o))
+}}
+ORDER BY ?s ?o
+""".strip()
+
+    sparql = SparqlClient(cache=TTLCache(ttl_seconds=1, max_items=1))
+    neighbor_sets: Dict[str, Set[str]] = {}
+    rows = 0
+    try:
+        async for page in paginate(sparql, query, page_size=page_size, max_rows=max_rows,
+                                   concurrency=settings.PAGE_CONCURRENCY, use_cache=False):
+            for r in page:
+                s, o = r.get("s"), r.get("o")
+                if s and o:
+                    neighbor_sets.setdefault(s, set()).add(o)
+            rows += len(page)
+            logger.info("rows=%d entities=%d", rows, len(neighbor_sets))
+    except HTTPException as e:
+        raise SystemExit(f"DBpedia failed after {rows} rows ({e.status_code}: {e.detail}), index not written")
+
+    return neighbor_sets
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--kind", default="player", choices=["player", "club", "stadium"])
+    parser.add_argument("--page-size", type=int, default=10000)
+    parser.add_argument("--max-rows", type=int, default=500000)
+    parser.add_argument("--out-dir", default=settings.SIMILARITY_INDEX_DIR)
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    neighbor_sets = asyncio.run(harvest(args.kind, page_size=args.page_size, max_rows=args.max_rows))
+    t1 = time.perf_counter()
+
+    index = SimilarityIndex.build(
+        neighbor_sets,
+        num_perm=settings.SIMILARITY_NUM_PERM,
+        bands=settings.SIMILARITY_BANDS,
+    )
+    path = index_path(args.out_dir, args.kind)
+    index.save(path)
+    t2 = time.perf_counter()
+
+    print(f"harvest: {t1 - t0:.1f}s, build+save: {t2 - t1:.1f}s, entities: {len(index)} -> {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Tuple, TypeVar
+import asyncio
+
+from fastapi import HTTPException
+
+T = TypeVar("T")
+
+
+def chunked(items: List[T], size: int) -> List[List[T]]:
+    size = max(1, int(size))
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def dedupe(items: Iterable[str]) -> List[str]:
+    """
+    Strip and de-duplicate while keeping the caller's order.
+    """
+    seen = set()
+    out: List[str] = []
+    for x in items:
+        x = (x or "").strip()
+        if x and x not in seen:
+            seen.add(x)
+            out.append(x)
+    return out
+
+
+def error_detail(e: BaseException) -> str:
+    if isinstance(e, HTTPException):
+        return str(e.detail)
+    return f"{type(e).__name__}: {e}"
+
+
+async def run_chunks(
+    chunks: List[List[str]],
+    fn: Callable[[List[str]], Awaitable[Any]],
+) -> Tuple[List[Tuple[List[str], Any]], Dict[str, str]]:
+    """
+    Run fn(chunk) concurrently for every chunk.
+
+    Returns (successful (chunk, result) pairs, {uri: error} for every URI of a failed chunk).
+    """
+    outcomes = await asyncio.gather(*(fn(c) for c in chunks), return_exceptions=True)
+
+    ok: List[Tuple[List[str], Any]] = []
+    errors: Dict[str, str] = {}
+    for chunk, outcome in zip(chunks, outcomes):
+        if isinstance(outcome, BaseException):
+            if isinstance(outcome, asyncio.CancelledError):
+                raise outcome
+            for uri in chunk:
+                errors[uri] = error_detail(outcome)
+        else:
+            ok.append((chunk, outcome))
+    return ok, errors
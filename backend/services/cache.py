@@ -1,16 +1,28 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Any, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import asyncio
 import time
 from collections import OrderedDict
+from contextvars import ContextVar
 from threading import RLock
 
+# When set, readers skip cache lookups but still store fresh results (used by warm-up refreshes)
+cache_bypass: ContextVar[bool] = ContextVar("cache_bypass", default=False)
+
+# Cache entries a response is built from, as (key, version, expires_at); version None means
+# the data did not come from (or did not make it into) the cache. Set per request by
+# api.http_cache to derive ETags.
+Validator = Tuple[str, Optional[int], float]
+cache_validators: ContextVar[Optional[List[Validator]]] = ContextVar("cache_validators", default=None)
+
 
 @dataclass
 class CacheItem:
     value: Any
     expires_at: float
+    version: int = 0  # time.time_ns() of the set: changes whenever the entry is replaced
 
 
 class TTLCache:
@@ -19,22 +31,42 @@ class TTLCache:
         self.max_items = max(1, int(max_items))
         self._store: "OrderedDict[str, CacheItem]" = OrderedDict()
         self._lock = RLock()
+        self.hits = 0
+        self.misses = 0
 
     def get(self, key: str) -> Optional[Any]:
         now = time.time()
         with self._lock:
             item = self._store.get(key)
             if not item:
+                self.misses += 1
                 return None
 
             if now > item.expires_at:
-                self._store.pop(key, None)
+                # Expired items stay (until LRU eviction) so get_stale can still serve them
+                self.misses += 1
                 return None
 
             # LRU touch
             self._store.move_to_end(key)
+            self.hits += 1
             return item.value
 
+    def get_stale(self, key: str) -> Optional[Any]:
+        """
+        Value even if expired (used when the upstream is failing). Not counted in hits/misses.
+        """
+        with self._lock:
+            item = self._store.get(key)
+            return item.value if item else None
+
+    def peek(self, key: str) -> Optional[CacheItem]:
+        """
+        Entry (even expired) without touching LRU order or stats.
+        """
+        with self._lock:
+            return self._store.get(key)
+
     def set(self, key: str, value: Any) -> None:
         now = time.time()
         expires_at = now + self.ttl
@@ -43,7 +75,7 @@ class TTLCache:
             if key in self._store:
                 self._store.move_to_end(key)
 
-            self._store[key] = CacheItem(value=value, expires_at=expires_at)
+            self._store[key] = CacheItem(value=value, expires_at=expires_at, version=time.time_ns())
 
             # Evict LRU if needed
             while len(self._store) > self.max_items:
@@ -53,10 +85,79 @@ class TTLCache:
         with self._lock:
             self._store.clear()
 
+    async def coalesce(self, key: str, fn: Callable[[], Awaitable[Any]], lease_s: float = 60.0) -> Any:
+        """
+        Run fn(), which fills `key`. A process-local cache has no other process to
+        coordinate with; SharedTTLCache makes the workers take turns.
+        """
+        return await fn()
+
     def stats(self) -> dict:
         with self._lock:
+            lookups = self.hits + self.misses
             return {
                 "ttl_seconds": self.ttl,
                 "max_items": self.max_items,
                 "current_items": len(self._store),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
             }
+
+
+def note_validator(cache: Optional[TTLCache], key: str) -> None:
+    """
+    Record the entry `key` currently holds as one the response depends on
+    (no-op outside a request that collects validators).
+    """
+    collector = cache_validators.get()
+    if collector is None:
+        return
+    item = cache.peek(key) if cache is not None else None
+    collector.append((key, item.version, item.expires_at) if item else (key, None, 0.0))
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls sharing a key: the first caller runs fn(),
+    the others await its result (or exception).
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, "asyncio.Future[Any]"] = {}
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._inflight
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        while True:
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                break
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                # The leading call was cancelled (client went away): run it ourselves
+                if inflight.cancelled():
+                    continue
+                raise
+
+        fut: "asyncio.Future[Any]" = asyncio.get_running_loop().create_future()
+        self._inflight[key] = fut
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        except BaseException as e:
+            fut.set_exception(e)
+            fut.exception()  # mark retrieved when nobody else was waiting
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+        fut.set_result(result)
+        return result
@@ -1,12 +1,21 @@
 from __future__ import annotations
 
 from typing import Any, Dict, List, Optional
+import hashlib
+import threading
 import time
 import logging
 
 from SPARQLWrapper import SPARQLWrapper, JSON
 from SPARQLWrapper.SPARQLExceptions import EndPointInternalError, SPARQLWrapperException
 
+from api.config import settings
+from services.cache import TTLCache, cache_bypass, note_validator
+from services.metrics import DBPEDIA_WRAPPER_LATENCY
+from services.normalize import intern_bindings, typed_value
+from services.profiling import span
+from services.shared_cache import make_cache
+
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -17,9 +26,43 @@ def _normalize_lang(lang: str) -> str:
     return lang if lang in ("fr", "en") else "fr"
 
 
+def players_clubs_edges_query(lang: str, ordered: bool = False) -> str:
+    """
+    player -> club (dbo:team) edges with labels, without LIMIT.
+    `ordered` adds a total ORDER BY so the result can be fetched in stable pages.
+    """
+    lang = _normalize_lang(lang)
+    query = f"""
+PREFIX dbo: <http://dbpedia.org/ontology/>
+PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+
+SELECT ?player ?playerLabel ?club ?clubLabel WHERE {{
+  ?player a dbo:SoccerPlayer ;
+          dbo:team ?club .
+
+  OPTIONAL {{ ?player rdfs:label ?playerLabel . FILTER(lang(?playerLabel) = '{lang}' || lang(?playerLabel) = 'en' || lang(?playerLabel) = 'fr') }}
+  OPTIONAL {{ ?club rdfs:label ?clubLabel . FILTER(lang(?clubLabel) = '{lang}' || lang(?clubLabel) = 'en' || lang(?clubLabel) = 'fr') }}
+}}
+""".strip()
+    if ordered:
+        query += "\nORDER BY ?player ?club ?playerLabel ?clubLabel"
+    return query
+
+
+def _as_int(v: Any) -> int:
+    # COUNT is an xsd:integer; anything else (malformed) counts as 0
+    return v if isinstance(v, int) else int(v) if isinstance(v, float) else 0
+
+
 class DBpediaService:
-    def __init__(self, endpoint: str = "https://dbpedia.org/sparql", timeout_s: int = 60):
+    def __init__(
+        self,
+        endpoint: str = "https://dbpedia.org/sparql",
+        timeout_s: int = 60,
+        cache: Optional[TTLCache] = None,
+    ):
         self.endpoint = endpoint
+        self.cache = cache
         self.sparql = SPARQLWrapper(endpoint)
 
         # IMPORTANT: DBpedia needs explicit JSON accept + format
@@ -56,9 +99,18 @@ class DBpediaService:
         - retries + backoff
         - logs errors (doesn't silently swallow)
         - ensures JSON output
+        - non-empty results are cached (failures return [] and are never cached)
         """
+        cache_key = "dbpedia-wrapper::" + hashlib.sha256(query.encode("utf-8")).hexdigest()
+        if self.cache is not None and not cache_bypass.get():
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                note_validator(self.cache, cache_key)
+                return cached
+
         attempt = 0
         last_err: Optional[str] = None
+        t0 = time.perf_counter()
 
         while attempt < retries:
             try:
@@ -71,10 +123,16 @@ class DBpediaService:
                 except Exception:
                     pass
 
-                results = self.sparql.query().convert()
-                bindings = self._extract_bindings(results)
+                with span("dbpedia"):
+                    results = self.sparql.query().convert()
+                bindings = intern_bindings(self._extract_bindings(results))
 
                 logger.info("DBpedia _run OK: %d bindings", len(bindings))
+                DBPEDIA_WRAPPER_LATENCY.observe(time.perf_counter() - t0, outcome="ok" if bindings else "empty")
+                if self.cache is not None and bindings:
+                    self.cache.set(cache_key, bindings)
+                # Empty results are not cached: nothing to validate a response against
+                note_validator(self.cache if bindings else None, cache_key)
                 return bindings
 
             except EndPointInternalError as e:
@@ -98,6 +156,8 @@ class DBpediaService:
                 time.sleep(0.6 * attempt)
 
         logger.error("DBpedia _run FAILED after %d retries. Last error: %s", retries, last_err)
+        DBPEDIA_WRAPPER_LATENCY.observe(time.perf_counter() - t0, outcome="failed")
+        note_validator(None, cache_key)
         return []
 
     # ---------------------------
@@ -200,7 +260,7 @@ GROUP BY ?uri ?nom
             clubs.append({
                 "nom": item.get("nom", {}).get("value"),
                 "stade": item.get("stade", {}).get("value", "Stade inconnu"),
-                "capacite": item.get("cap", {}).get("value", "N/A"),
+                "capacite": typed_value(item.get("cap"), "N/A"),
                 "image": item.get("image", {}).get("value", "https://via.placeholder.com/150"),
             })
         return clubs
@@ -280,7 +340,7 @@ LIMIT {int(limit)}
             out.append({
                 "club_uri": b.get("club", {}).get("value"),
                 "club": b.get("clubLabel", {}).get("value") or b.get("club", {}).get("value"),
-                "nbPlayers": int(float(b.get("nbPlayers", {}).get("value", "0"))),
+                "nbPlayers": _as_int(typed_value(b.get("nbPlayers"), 0)),
                 "image": b.get("image", {}).get("value", None),
             })
         return out
@@ -313,7 +373,7 @@ LIMIT {int(limit)}
             out.append({
                 "player_uri": b.get("player", {}).get("value"),
                 "player": b.get("playerLabel", {}).get("value") or b.get("player", {}).get("value"),
-                "nbClubs": int(float(b.get("nbClubs", {}).get("value", "0"))),
+                "nbClubs": _as_int(typed_value(b.get("nbClubs"), 0)),
                 "image": b.get("image", {}).get("value", None),
             })
         return out
@@ -321,19 +381,7 @@ LIMIT {int(limit)}
     def analytics_players_clubs_edges(self, lang: str = "fr", limit_edges: int = 500) -> Dict[str, Any]:
         lang = _normalize_lang(lang)
 
-        query = f"""
-PREFIX dbo: <http://dbpedia.org/ontology/>
-PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-
-SELECT ?player ?playerLabel ?club ?clubLabel WHERE {{
-  ?player a dbo:SoccerPlayer ;
-          dbo:team ?club .
-
-  OPTIONAL {{ ?player rdfs:label ?playerLabel . FILTER(lang(?playerLabel) = '{lang}' || lang(?playerLabel) = 'en' || lang(?playerLabel) = 'fr') }}
-  OPTIONAL {{ ?club rdfs:label ?clubLabel . FILTER(lang(?clubLabel) = '{lang}' || lang(?clubLabel) = 'en' || lang(?clubLabel) = 'fr') }}
-}}
-LIMIT {int(limit_edges)}
-""".strip()
+        query = players_clubs_edges_query(lang) + f"\nLIMIT {int(limit_edges)}"
 
         rows = self._run(query)
 
@@ -361,4 +409,32 @@ LIMIT {int(limit_edges)}
         return {"nodes": list(nodes.values()), "edges": edges}
 
 
-dbpedia_service = DBpediaService()
+# Shared instance, built on first use rather than at import (sync routes call this
+# from several threadpool threads at once)
+_dbpedia_service: Optional[DBpediaService] = None
+_dbpedia_lock = threading.Lock()
+
+
+def get_dbpedia_service() -> DBpediaService:
+    global _dbpedia_service
+    if _dbpedia_service is not None:
+        return _dbpedia_service
+    with _dbpedia_lock:
+        if _dbpedia_service is None:
+            _dbpedia_service = DBpediaService(
+                endpoint=settings.DBPEDIA_ENDPOINT,
+                cache=make_cache(
+                    settings.SHARED_CACHE_PATH,
+                    "dbpedia_wrapper",
+                    ttl_seconds=settings.CACHE_TTL_S,
+                    max_items=settings.CACHE_MAX_ITEMS,
+                ),
+            )
+    return _dbpedia_service
+
+
+def __getattr__(name: str) -> Any:
+    # `from services.get_dbpedia import dbpedia_service` still works (and builds it then)
+    if name == "dbpedia_service":
+        return get_dbpedia_service()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -211,4 +211,19 @@ LIMIT {limit}
         return edges
 
 
-hal_service = HALService()
+# Shared instance, built on first use rather than at import
+_hal_service: Optional[HALService] = None
+
+
+def get_hal_service() -> HALService:
+    global _hal_service
+    if _hal_service is None:
+        _hal_service = HALService()
+    return _hal_service
+
+
+def __getattr__(name: str) -> Any:
+    # `from services.get_hal import hal_service` still works (and builds it then)
+    if name == "hal_service":
+        return get_hal_service()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+import json
+import logging
+import os
+import re
+import unicodedata
+
+logger = logging.getLogger(__name__)
+
+# Built-in gazetteer: curated entities of the home page + common aliases.
+# A larger one can be harvested with scripts/build_gazetteer.py (GAZETTEER_PATH).
+_BUILTIN: Dict[str, Tuple[str, str]] = {
+    "lionel messi": ("Lionel Messi", "player"),
+    "messi": ("Lionel Messi", "player"),
+    "cristiano ronaldo": ("Cristiano Ronaldo", "player"),
+    "ronaldo": ("Cristiano Ronaldo", "player"),
+    "neymar": ("Neymar", "player"),
+    "lamine yamal": ("Lamine Yamal", "player"),
+    "zinedine zidane": ("Zinedine Zidane", "player"),
+    "zidane": ("Zinedine Zidane", "player"),
+    "kylian mbappe": ("Kylian Mbappé", "player"),
+    "mbappe": ("Kylian Mbappé", "player"),
+    "fc barcelona": ("FC Barcelona", "club"),
+    "barcelona": ("FC Barcelona", "club"),
+    "barca": ("FC Barcelona", "club"),
+    "real madrid": ("Real Madrid", "club"),
+    "paris saint-germain": ("Paris Saint-Germain", "club"),
+    "paris saint germain": ("Paris Saint-Germain", "club"),
+    "psg": ("Paris Saint-Germain", "club"),
+    "manchester city": ("Manchester City", "club"),
+    "man city": ("Manchester City", "club"),
+    "bayern munich": ("Bayern Munich", "club"),
+    "bayern": ("Bayern Munich", "club"),
+}
+
+_MAX_NGRAM = 5
+
+
+def normalize_text(text: str) -> str:
+    """
+    Lowercase, strip accents and punctuation (keeps '-' inside names), collapse spaces.
+    """
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    text = re.sub(r"[^\w\s'-]", " ", text).replace("'", " ")
+    return " ".join(text.split())
+
+
+_KEEP = re.compile(r"[\w-]")
+
+
+def _normalize_with_offsets(text: str) -> Tuple[str, List[int]]:
+    """
+    normalize_text(text), plus for each output character the index of the input
+    character it came from (to cut spans out of the original question).
+    """
+    out: List[str] = []
+    offsets: List[int] = []
+    for i, ch in enumerate(text or ""):
+        for c in unicodedata.normalize("NFKD", ch):
+            if unicodedata.combining(c):
+                continue
+            for lc in c.lower():
+                if not _KEEP.match(lc):
+                    lc = " "
+                if lc == " " and (not out or out[-1] == " "):
+                    continue
+                out.append(lc)
+                offsets.append(i)
+    if out and out[-1] == " ":
+        out.pop()
+        offsets.pop()
+    return "".join(out), offsets
+
+
+# Question shapes (matched on normalize_text output)
+_STADIUM_PATTERNS = [
+    re.compile(r"\b(?:quel est |c est quoi )?(?:le )?(?:stade|enceinte|terrain)\s+(?:de |du |des |d )?(?:l )?(?P<entity>.+)$"),
+    re.compile(r"\bou joue(?:nt)?\s+(?:a domicile\s+)?(?:le |la |les )?(?P<entity>.+?)\s+a domicile$"),
+    re.compile(r"\b(?:what is |what s )?(?:the )?(?:stadium|ground|home ground)\s+of\s+(?:the )?(?P<entity>.+)$"),
+    re.compile(r"\bwhere do(?:es)?\s+(?P<entity>.+?)\s+play\s+(?:their )?home (?:games|matches)$"),
+]
+_PLAYER_PATTERNS = [
+    re.compile(r"\b(?:dans|pour) quel(?:le)? (?:club|equipe)s? (?:joue|jouait|evolue|a joue)(?: t il| t elle)?\s+(?P<entity>.+)$"),
+    re.compile(r"\b(?:ou|pour qui) (?:joue|jouait|evolue)(?: t il| t elle)?\s+(?P<entity>.+)$"),
+    re.compile(r"\b(?:quel(?:s)? (?:est|sont) )?(?:le |les )?clubs? (?:de|du|d)\s+(?P<entity>.+)$"),
+    re.compile(r"^(?P<entity>.+?)\s+(?:joue|jouait|evolue)\s+(?:dans|pour|ou|a)\b.*$"),
+    re.compile(r"\bwhich (?:club|team)s? (?:does|did|has)\s+(?P<entity>.+?)\s+play(?:ed)?(?: for| in)?$"),
+    re.compile(r"\bwhere (?:does|did)\s+(?P<entity>.+?)\s+play$"),
+]
+
+
+@dataclass
+class RuleResult:
+    intent: str
+    entity: str
+    confidence: float
+    source: str  # pattern+gazetteer | pattern | gazetteer
+
+
+class Gazetteer:
+    """
+    Normalized label -> (canonical label, kind), looked up by longest n-gram.
+    """
+
+    def __init__(self, entries: Optional[Dict[str, Tuple[str, str]]] = None):
+        self._entries: Dict[str, Tuple[str, str]] = dict(entries or {})
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, label: str, kind: str, canonical: Optional[str] = None) -> None:
+        key = normalize_text(label)
+        if key:
+            self._entries.setdefault(key, (canonical or label, kind))
+
+    def load(self, path: str) -> int:
+        """
+        JSON list of {"label": ..., "kind": "player"|"club"}.
+        """
+        if not path or not os.path.exists(path):
+            return 0
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                items = json.load(f)
+            for it in items:
+                self.add(str(it["label"]), str(it.get("kind", "player")))
+            return len(items)
+        except Exception as e:
+            logger.warning("Could not load gazetteer %s: %s", path, e)
+            return 0
+
+    def get(self, normalized: str) -> Optional[Tuple[str, str]]:
+        """Exact lookup of a whole normalized label."""
+        return self._entries.get(normalized)
+
+    def find(self, normalized: str) -> Optional[Tuple[str, str]]:
+        tokens = normalized.split()
+        for n in range(min(_MAX_NGRAM, len(tokens)), 0, -1):
+            for i in range(len(tokens) - n + 1):
+                hit = self._entries.get(" ".join(tokens[i:i + n]))
+                if hit is not None:
+                    return hit
+        return None
+
+
+# Leading articles / "club de", trailing time qualifiers around the entity
+_ENTITY_HEAD = re.compile(r"[\s-]*(?:(?:le|la|les|l|the) )?(?:(?:club|equipe|team) (?:de |du |d |of )?(?:l |the )?)?[\s-]*")
+_ENTITY_TAIL = re.compile(
+    r"(?:\s+(?:actuellement|maintenant|aujourd hui|cette saison|now|currently|this season"
+    r"|en \d{4}|in \d{4}|depuis \d{4}|since \d{4}))*[\s-]*$"
+)
+
+
+def _entity_span(text: str, start: int, end: int) -> Tuple[int, int]:
+    """Span of the entity inside text[start:end] once articles and time qualifiers are cut."""
+    start += _ENTITY_HEAD.match(text, start, end).end() - start
+    tail = _ENTITY_TAIL.search(text, start, end)
+    return start, tail.start() if tail else end
+
+
+# Entity kind each intent expects ("Où joue le PSG ?" is not a player question)
+_EXPECTED_KIND = {"club_stadium": "club", "player_club": "player"}
+
+
+class IntentClassifier:
+    """
+    Deterministic pre-classifier for /ask: compiled question patterns + gazetteer.
+    Returns None when it cannot decide, so the caller falls back to the LLM.
+
+    Only a question shape whose whole entity span is a gazetteer label of the
+    expected kind scores above the default threshold. A label found inside the
+    span ("Ronaldo Nazario", "le fils de Zidane") is only a hint: like a shape
+    alone, it keeps the entity as written in the question and is left to the LLM.
+    """
+
+    def __init__(self, gazetteer: Gazetteer, min_confidence: float = 0.7):
+        self.gazetteer = gazetteer
+        self.min_confidence = min_confidence
+
+    def classify(self, question: str) -> Optional[RuleResult]:
+        text, offsets = _normalize_with_offsets(question)
+        if not text:
+            return None
+
+        for intent, patterns in (("club_stadium", _STADIUM_PATTERNS), ("player_club", _PLAYER_PATTERNS)):
+            for pat in patterns:
+                m = pat.search(text)
+                if not m:
+                    continue
+                start, end = _entity_span(text, m.start("entity"), m.end("entity"))
+                if start >= end:
+                    continue
+                span = text[start:end].strip(" -")
+                kind = _EXPECTED_KIND[intent]
+                hit = self.gazetteer.get(span)
+                if hit is not None and hit[1] == kind:
+                    return RuleResult(intent, hit[0], 1.0, "pattern+gazetteer")
+                # Entity as written in the question (accents and case matter to the SPARQL CONTAINS)
+                entity = question[offsets[start]:offsets[end - 1] + 1].strip()
+                partial = self.gazetteer.find(span)
+                if partial is not None and partial[1] == kind:
+                    return RuleResult(intent, entity, 0.6, "pattern")
+                return RuleResult(intent, entity, 0.5, "pattern")
+
+        # No known question shape: a gazetteer hit alone is a weak signal
+        hit = self.gazetteer.find(text)
+        if hit is not None:
+            is_stadium = any(w in text.split() for w in ("stade", "stadium", "ground"))
+            intent = "club_stadium" if is_stadium or hit[1] == "club" else "player_club"
+            return RuleResult(intent, hit[0], 0.6, "gazetteer")
+
+        return None
+
+    def confident(self, question: str) -> Optional[RuleResult]:
+        res = self.classify(question)
+        if res is not None and res.confidence >= self.min_confidence:
+            return res
+        return None
+
+
+def build_classifier(gazetteer_path: str, min_confidence: float) -> IntentClassifier:
+    gaz = Gazetteer(_BUILTIN)
+    n = gaz.load(gazetteer_path)
+    if n:
+        logger.info("Gazetteer loaded: %d labels from %s", n, gazetteer_path)
+    return IntentClassifier(gaz, min_confidence=min_confidence)
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+from typing import Any, List, Optional, Tuple
+import json
+
+
+class JsonFieldStream:
+    """
+    Incremental parser for one JSON object arriving in fragments (LLM token stream).
+
+    `feed(text)` returns the top-level (key, value) pairs whose value closed in this
+    fragment, so a field can be forwarded as soon as it is complete. Text before the
+    first '{' (```json fences, chatter) is skipped. Each character is scanned once.
+    """
+
+    def __init__(self) -> None:
+        self._buf = ""
+        self._pos = 0
+        self._started = False
+        self._closed = False
+        self._depth = 0  # nesting depth, 1 = inside the top-level object
+        self._in_string = False
+        self._escape = False
+        self._key: Optional[str] = None
+        self._key_start = -1
+        self._value_start = -1  # index of the first char of the current value, -1 if none
+        self._scalar = False  # current value is a bare number/true/false/null
+        self.fields: dict = {}
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def _emit(self, end: int, out: List[Tuple[str, Any]]) -> None:
+        raw = self._buf[self._value_start:end].strip()
+        self._value_start = -1
+        self._scalar = False
+        key, self._key = self._key, None
+        if key is None:
+            return
+        try:
+            value = json.loads(raw)
+        except ValueError:
+            return
+        self.fields[key] = value
+        out.append((key, value))
+
+    def feed(self, text: str) -> List[Tuple[str, Any]]:
+        out: List[Tuple[str, Any]] = []
+        if self._closed or not text:
+            return out
+        self._buf += text
+        buf = self._buf
+        i = self._pos
+
+        while i < len(buf):
+            c = buf[i]
+
+            if not self._started:
+                if c == "{":
+                    self._started = True
+                    self._depth = 1
+                i += 1
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        if self._key is None and self._value_start < 0:
+                            self._key = json.loads(buf[self._key_start:i + 1])
+                        elif self._value_start >= 0:
+                            self._emit(i + 1, out)
+                i += 1
+                continue
+
+            if c == '"':
+                self._in_string = True
+                if self._depth == 1 and self._key is None:
+                    self._key_start = i
+                elif self._depth == 1 and self._value_start < 0:
+                    self._value_start = i
+            elif c in "{[":
+                if self._depth == 1 and self._value_start < 0:
+                    self._value_start = i
+                self._depth += 1
+            elif c in "}]":
+                self._depth -= 1
+                if self._depth == 1 and self._value_start >= 0:
+                    self._emit(i + 1, out)
+                elif self._depth == 0:
+                    if self._scalar:
+                        self._emit(i, out)
+                    self._closed = True
+                    i += 1
+                    break
+            elif self._depth == 1:
+                if c == ",":
+                    if self._scalar:
+                        self._emit(i, out)
+                elif c not in " \t\r\n:" and self._key is not None and self._value_start < 0:
+                    self._value_start = i
+                    self._scalar = True
+            i += 1
+
+        self._pos = i
+        return out
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, List
+import asyncio
+import heapq
+import itertools
+import math
+import time
+
+from services.metrics import LLM_QUEUE_WAIT, LLM_SERVICE
+
+# Lower value = served first
+PRIORITY_INTERACTIVE = 0  # /ask
+PRIORITY_BACKGROUND = 1  # /graph/explain
+
+_PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_BACKGROUND: "background"}
+
+
+class LLMSaturated(Exception):
+    """
+    Raised when a generation cannot be admitted (queue full or queue deadline reached).
+    """
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+@dataclass
+class _ClassStats:
+    admitted: int = 0
+    rejected_full: int = 0
+    rejected_deadline: int = 0
+    wait_s_total: float = 0.0
+    wait_s_max: float = 0.0
+    service_s_total: float = 0.0
+    completed: int = 0
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            "admitted": self.admitted,
+            "rejected_full": self.rejected_full,
+            "rejected_deadline": self.rejected_deadline,
+            "avg_queue_wait_ms": round(self.wait_s_total / self.admitted * 1000, 2) if self.admitted else 0.0,
+            "max_queue_wait_ms": round(self.wait_s_max * 1000, 2),
+            "avg_service_ms": round(self.service_s_total / self.completed * 1000, 2) if self.completed else 0.0,
+        }
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: int
+    seq: int
+    future: "asyncio.Future[None]" = field(compare=False)
+
+
+class LLMScheduler:
+    """
+    Admission control for the local LLM: at most `max_concurrent` generations,
+    the rest wait in a priority queue bounded by `max_queue` and `queue_timeout_s`.
+    A freed slot is handed directly to the best waiter (priority, then FIFO).
+    """
+
+    def __init__(self, max_concurrent: int, max_queue: int, queue_timeout_s: float):
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.max_queue = max(0, int(max_queue))
+        self.queue_timeout_s = max(0.0, float(queue_timeout_s))
+        self._active = 0
+        self._queue: List[_Waiter] = []
+        self._seq = itertools.count()
+        self._stats: Dict[int, _ClassStats] = {p: _ClassStats() for p in _PRIORITY_NAMES}
+
+    def _queued(self) -> int:
+        return sum(1 for w in self._queue if not w.future.done())
+
+    def _retry_after(self) -> int:
+        done = sum(s.completed for s in self._stats.values())
+        busy = sum(s.service_s_total for s in self._stats.values())
+        avg_service = busy / done if done else 5.0
+        backlog = self._queued() + self._active
+        return max(1, math.ceil(avg_service * backlog / self.max_concurrent))
+
+    def _release(self) -> None:
+        while self._queue:
+            w = heapq.heappop(self._queue)
+            if not w.future.done():
+                w.future.set_result(None)  # the slot moves to the waiter
+                return
+        self._active -= 1
+
+    def _abandon(self, w: _Waiter) -> None:
+        if not w.future.done():
+            w.future.cancel()
+        elif not w.future.cancelled() and w.future.exception() is None:
+            # Slot handed over just as the waiter gave up: pass it on
+            self._release()
+
+    def _shed(self, priority: int) -> bool:
+        """
+        Queue full: drop the newest waiter of a lower priority class to make room.
+        """
+        pending = [w for w in self._queue if not w.future.done()]
+        victim = max(pending, key=lambda w: (w.priority, w.seq), default=None)
+        if victim is None or victim.priority <= priority:
+            return False
+        self._stats[victim.priority].rejected_full += 1
+        victim.future.set_exception(LLMSaturated("LLM queue is full", self._retry_after()))
+        return True
+
+    async def _acquire(self, priority: int) -> float:
+        st = self._stats[priority]
+        t0 = time.perf_counter()
+
+        if self._active < self.max_concurrent and self._queued() == 0:
+            self._active += 1
+            st.admitted += 1
+            LLM_QUEUE_WAIT.observe(0.0, priority=_PRIORITY_NAMES[priority])
+            return 0.0
+
+        if self._queued() >= self.max_queue and not self._shed(priority):
+            st.rejected_full += 1
+            raise LLMSaturated("LLM queue is full", self._retry_after())
+
+        w = _Waiter(priority, next(self._seq), asyncio.get_running_loop().create_future())
+        heapq.heappush(self._queue, w)
+        try:
+            await asyncio.wait_for(asyncio.shield(w.future), timeout=self.queue_timeout_s)
+        except asyncio.TimeoutError:
+            self._abandon(w)
+            st.rejected_deadline += 1
+            raise LLMSaturated("LLM queue deadline exceeded", self._retry_after())
+        except asyncio.CancelledError:
+            self._abandon(w)
+            raise
+
+        waited = time.perf_counter() - t0
+        st.admitted += 1
+        st.wait_s_total += waited
+        st.wait_s_max = max(st.wait_s_max, waited)
+        LLM_QUEUE_WAIT.observe(waited, priority=_PRIORITY_NAMES[priority])
+        return waited
+
+    @asynccontextmanager
+    async def slot(self, priority: int = PRIORITY_INTERACTIVE) -> AsyncIterator[None]:
+        await self._acquire(priority)
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            served = time.perf_counter() - t0
+            st = self._stats[priority]
+            st.completed += 1
+            st.service_s_total += served
+            LLM_SERVICE.observe(served, priority=_PRIORITY_NAMES[priority])
+            self._release()
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "queue_timeout_s": self.queue_timeout_s,
+            "active": self._active,
+            "queued": self._queued(),
+            "by_priority": {_PRIORITY_NAMES[p]: s.as_dict() for p, s in self._stats.items()},
+        }
@@ -1,17 +1,148 @@
 import json
-from openai import OpenAI
+import logging
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Awaitable, Callable, Optional
+
+import httpx
 from api.config import settings
+from services.intent_rules import IntentClassifier, build_classifier
+from services.llm_scheduler import LLMSaturated, LLMScheduler, PRIORITY_INTERACTIVE
+from services.metrics import LLM_LATENCY
+from services.profiling import span
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+logger = logging.getLogger(__name__)
+
+# Client async partagé (pool de connexions httpx), créé au premier appel
+# (le SDK openai n'est importé qu'à ce moment : ~0,4 s de démarrage en moins)
+_client: Optional["AsyncOpenAI"] = None
+
+# Client httpx partagé pour l'API native d'Ollama (/api/chat, /api/generate)
+_ollama_http: Optional[httpx.AsyncClient] = None
 
-# On configure le client pour taper sur Ollama en local
-client = OpenAI(
-    base_url="http://localhost:11434/v1",
-    api_key="ollama",  # Requis par la librairie mais ignoré par Ollama
+# Ordonnanceur partagé par /ask et /graph/explain : générations simultanées bornées,
+# file d'attente prioritaire (/ask d'abord), 503 + Retry-After quand c'est saturé
+scheduler = LLMScheduler(
+    max_concurrent=settings.LLM_MAX_CONCURRENCY,
+    max_queue=settings.LLM_MAX_QUEUE,
+    queue_timeout_s=settings.LLM_QUEUE_TIMEOUT_S,
 )
 
-def analyze_football_intent(question: str) -> dict:
+
+_classifier: Optional[IntentClassifier] = None
+
+
+@dataclass
+class IntentStats:
+    total: int = 0
+    bypassed: int = 0
+    llm_calls: int = 0
+    llm_failures: int = 0
+    llm_time_s: float = 0.0
+    rules_time_s: float = 0.0
+
+    def as_dict(self) -> dict:
+        avg_llm = self.llm_time_s / self.llm_calls if self.llm_calls else 0.0
+        return {
+            "total": self.total,
+            "bypassed": self.bypassed,
+            "bypass_rate": round(self.bypassed / self.total, 4) if self.total else 0.0,
+            "llm_calls": self.llm_calls,
+            "llm_failures": self.llm_failures,
+            "avg_llm_ms": round(avg_llm * 1000, 2),
+            "avg_rules_us": round(self.rules_time_s / self.total * 1e6, 2) if self.total else 0.0,
+            # estimation: chaque question court-circuitée aurait coûté un appel LLM moyen
+            "estimated_time_saved_s": round(self.bypassed * avg_llm, 3),
+        }
+
+
+intent_stats = IntentStats()
+
+
+def get_classifier() -> IntentClassifier:
+    global _classifier
+    if _classifier is None:
+        _classifier = build_classifier(settings.GAZETTEER_PATH, settings.INTENT_MIN_CONFIDENCE)
+    return _classifier
+
+
+def get_client() -> "AsyncOpenAI":
+    global _client
+    if _client is None:
+        from openai import AsyncOpenAI
+
+        _client = AsyncOpenAI(
+            base_url=settings.LLM_BASE_URL,  # Ollama en local par défaut
+            api_key=settings.OPENAI_API_KEY,  # Requis par la librairie mais ignoré par Ollama
+            max_retries=1,
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=settings.LLM_MAX_CONCURRENCY * 2,
+                    max_keepalive_connections=settings.LLM_MAX_CONCURRENCY,
+                ),
+                timeout=httpx.Timeout(settings.LLM_TIMEOUT_S, connect=5.0),
+            ),
+        )
+    return _client
+
+
+def get_ollama_http() -> httpx.AsyncClient:
+    global _ollama_http
+    if _ollama_http is None:
+        _ollama_http = httpx.AsyncClient(
+            base_url=settings.OLLAMA_URL,
+            timeout=httpx.Timeout(settings.EXPLAIN_TIMEOUT_S, connect=5.0),
+            limits=httpx.Limits(max_connections=10, max_keepalive_connections=5),
+        )
+    return _ollama_http
+
+
+async def aclose() -> None:
     """
-    Analyse la question via Ollama (Mistral/Llama3).
+    Ferme les clients partagés (appelé à l'arrêt de l'application).
     """
+    global _client, _ollama_http
+    if _client is not None:
+        await _client.close()
+        _client = None
+    if _ollama_http is not None:
+        await _ollama_http.aclose()
+        _ollama_http = None
+
+
+def _keyword_fallback(question: str) -> dict:
+    is_stadium = any(w in question.lower() for w in ["stade", "stadium", "ground"])
+    return {
+        "intent": "club_stadium" if is_stadium else "player_club",
+        "entity": question,
+        "source": "fallback",
+    }
+
+
+async def analyze_football_intent(
+    question: str,
+    on_token: Optional[Callable[[str], Awaitable[None]]] = None,
+) -> dict:
+    """
+    Analyse la question : règles + gazetteer d'abord, Ollama (Mistral/Llama3) seulement
+    si la confiance est trop faible. Ne bloque pas la boucle asyncio.
+
+    Si `on_token` est fourni, la génération est streamée et chaque fragment lui est transmis.
+    """
+    intent_stats.total += 1
+
+    if settings.INTENT_RULES_ENABLED:
+        classifier = get_classifier()
+        t0 = time.perf_counter()
+        fast = classifier.confident(question)
+        intent_stats.rules_time_s += time.perf_counter() - t0
+        if fast is not None:
+            intent_stats.bypassed += 1
+            return {"intent": fast.intent, "entity": fast.entity, "source": fast.source}
+
     prompt = f"""
     Tu es un expert en football. Analyse cette question : "{question}"
     Réponds uniquement au format JSON strict :
@@ -21,17 +152,34 @@ def analyze_football_intent(question: str) -> dict:
     }}
     """
     try:
-        response = client.chat.completions.create(
-            model="mistral", # Assure-toi d'avoir fait 'ollama run mistral'
-            messages=[{"role": "user", "content": prompt}],
-            response_format={ "type": "json_object" }
-        )
-        return json.loads(response.choices[0].message.content)
+        async with scheduler.slot(PRIORITY_INTERACTIVE):
+            t0 = time.perf_counter()
+            with LLM_LATENCY.time(call="ask_intent"), span("llm"):
+                response = await get_client().chat.completions.create(
+                    model=settings.LLM_MODEL,  # Assure-toi d'avoir fait 'ollama run mistral'
+                    messages=[{"role": "user", "content": prompt}],
+                    response_format={ "type": "json_object" },
+                    timeout=settings.LLM_TIMEOUT_S,
+                    stream=on_token is not None,
+                )
+                if on_token is None:
+                    content = response.choices[0].message.content
+                else:
+                    parts = []
+                    async for chunk in response:
+                        delta = chunk.choices[0].delta.content if chunk.choices else None
+                        if delta:
+                            parts.append(delta)
+                            await on_token(delta)
+                    content = "".join(parts)
+        intent_stats.llm_calls += 1
+        intent_stats.llm_time_s += time.perf_counter() - t0
+        return {**json.loads(content), "source": "llm"}
+    except LLMSaturated:
+        # Surcharge : on refuse vite plutôt que d'empiler les requêtes
+        raise
     except Exception as e:
-        print(f"Erreur Ollama : {e}")
+        intent_stats.llm_failures += 1
+        logger.warning("Erreur Ollama : %s", e)
         # Fallback si Ollama n'est pas lancé
-        is_stadium = any(w in question.lower() for w in ["stade", "stadium", "ground"])
-        return {
-            "intent": "club_stadium" if is_stadium else "player_club",
-            "entity": question
-        }
\ No newline at end of file
+        return _keyword_fallback(question)
@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextlib import contextmanager
+from threading import Lock
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple
+import math
+import os
+import time
+
+# Latency buckets (seconds): from a cache hit to a slow DBpedia/LLM call
+DEFAULT_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelValues = Tuple[str, ...]
+# Scrape-time samples: (metric name, type, help, [(labels, value)])
+Sample = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _num(v: float) -> str:
+    if v == math.inf:
+        return "+Inf"
+    return repr(float(v)) if not float(v).is_integer() else str(int(v))
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._lock = Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(n, "")) for n in self.label_names)
+
+    @abstractmethod
+    def render(self) -> List[str]:
+        """Exposition lines of every label set (HELP/TYPE are added by the registry)."""
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.label_names, k)} {_num(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: [count per bucket (+Inf last)], sum
+        self._series: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = ([0] * (len(self.buckets) + 1), [0.0])
+                self._series[key] = series
+            series[0][i] += 1
+            series[1][0] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[Dict[str, str]]:
+        """
+        Observe the block's duration. The yielded dict can update labels (e.g. outcome)
+        before the block ends; otherwise outcome is "ok", or "error" on an exception.
+        """
+        labels = dict(labels)
+        t0 = time.perf_counter()
+        try:
+            yield labels
+        except BaseException:
+            labels.setdefault("outcome", "error")
+            raise
+        finally:
+            labels.setdefault("outcome", "ok")
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, (list(c), s[0])) for k, (c, s) in self._series.items())
+        lines: List[str] = []
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (math.inf,), counts):
+                cumulative += n
+                le = 'le="' + _num(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {_num(total)}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """
+    Process-local metrics in the Prometheus text format (version 0.0.4).
+    Collectors add values read at scrape time (cache stats, limiter state...).
+
+    With several uvicorn workers each process has its own registry and a scrape
+    reaches whichever worker accepts it: counters then seem to jump back and forth.
+    Run one port per worker (or one worker per container) to scrape them all and
+    sum in the query; process_start_time_seconds and its pid label tell workers
+    and restarts apart.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], List[Sample]]] = []
+
+    def _add(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, help, labels))  # type: ignore[return-value]
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help, labels, buckets))  # type: ignore[return-value]
+
+    def add_collector(self, fn: Callable[[], List[Sample]]) -> None:
+        self._collectors.append(fn)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        for collect in self._collectors:
+            for name, kind, help, samples in collect():
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_labels(tuple(labels), tuple(labels.values()))} {_num(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+_STARTED_AT = time.time()
+REGISTRY.add_collector(lambda: [
+    ("process_start_time_seconds", "gauge", "Start time of this worker process (Unix time).",
+     [({"pid": str(os.getpid())}, _STARTED_AT)]),
+])
+
+# --- HTTP (RequestMetricsMiddleware) ---
+HTTP_REQUESTS = REGISTRY.counter(
+    "http_requests_total", "HTTP requests by route template and status.", ("method", "route", "status")
+)
+HTTP_LATENCY = REGISTRY.histogram(
+    "http_request_duration_seconds", "Time to the end of the response body, by route template.", ("method", "route")
+)
+
+# --- DBpedia ---
+SPARQL_LATENCY = REGISTRY.histogram(
+    "sparql_request_duration_seconds", "One HTTP attempt against the SPARQL endpoint, by outcome.", ("outcome",)
+)
+SPARQL_RETRIES = REGISTRY.counter("sparql_retries_total", "SPARQL attempts retried, by reason.", ("reason",))
+SPARQL_MAINTENANCE = REGISTRY.counter(
+    "sparql_maintenance_pages_total", "200 responses that were DBpedia's HTML maintenance page."
+)
+DBPEDIA_WRAPPER_LATENCY = REGISTRY.histogram(
+    "dbpedia_wrapper_query_duration_seconds", "DBpediaService (SPARQLWrapper) queries, retries included.", ("outcome",)
+)
+
+# --- LLM / compute ---
+LLM_LATENCY = REGISTRY.histogram(
+    "llm_request_duration_seconds", "LLM calls (scheduler wait excluded), by call site and outcome.", ("call", "outcome")
+)
+LLM_QUEUE_WAIT = REGISTRY.histogram(
+    "llm_queue_wait_seconds", "Time admitted generations waited for an LLM slot, by priority class.", ("priority",)
+)
+LLM_SERVICE = REGISTRY.histogram(
+    "llm_service_seconds", "Time generations held an LLM slot, by priority class.", ("priority",)
+)
+GRAPH_COMPUTE = REGISTRY.histogram(
+    "graph_metrics_compute_seconds", "networkx centralities and communities for /graph/metrics.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
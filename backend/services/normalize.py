@@ -1,10 +1,80 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence
 import logging
+import sys
+
+from services.profiling import span
+from services.sparql_results import SparqlResult
 
 logger = logging.getLogger(__name__)
 
+XSD = "http://www.w3.org/2001/XMLSchema#"
+
+
+def _to_bool(v: str) -> Any:
+    if v in ("true", "1"):
+        return True
+    if v in ("false", "0"):
+        return False
+    return v
+
+
+def _to_datetime(v: str) -> datetime:
+    # fromisoformat ne connaît pas le suffixe "Z" avant 3.11
+    return datetime.fromisoformat(v[:-1] + "+00:00" if v.endswith("Z") else v)
+
+
+_CONVERTERS: Dict[str, Callable[[str], Any]] = {
+    **{XSD + t: int for t in (
+        "integer", "int", "long", "short", "byte", "nonNegativeInteger", "positiveInteger",
+        "nonPositiveInteger", "negativeInteger", "unsignedLong", "unsignedInt", "unsignedShort",
+        "unsignedByte",
+    )},
+    **{XSD + t: float for t in ("decimal", "double", "float")},
+    XSD + "boolean": _to_bool,
+    XSD + "date": date.fromisoformat,
+    XSD + "dateTime": _to_datetime,
+}
+
+
+def convert_literal(value: Any, datatype: Optional[str]) -> Any:
+    """
+    Python value of an xsd numeric / boolean / date literal. Anything else, or a
+    malformed lexical form (DBpedia has "1987-6-24" dates), stays a string.
+    """
+    conv = _CONVERTERS.get(datatype) if datatype else None
+    if conv is None or not isinstance(value, str):
+        return value
+    try:
+        return conv(value)
+    except (ValueError, OverflowError):
+        return value
+
+
+def typed_value(cell: Any, default: Any = None) -> Any:
+    """
+    Converted value of one raw binding cell ({"type", "value", "datatype"?}).
+    """
+    if not isinstance(cell, dict) or "value" not in cell:
+        return default
+    return convert_literal(cell["value"], cell.get("datatype"))
+
+
+def intern_bindings(bindings: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Intern IRI values of raw bindings in place (one copy of each IRI across cached results).
+    """
+    intern = sys.intern
+    for b in bindings:
+        if not isinstance(b, dict):
+            continue
+        for cell in b.values():
+            if isinstance(cell, dict) and cell.get("type") == "uri" and isinstance(cell.get("value"), str):
+                cell["value"] = intern(cell["value"])
+    return bindings
+
 
 def pick_label(binding: Dict[str, Any], fallback_key: str = "uri") -> str:
     """
@@ -24,9 +94,10 @@ def pick_label(binding: Dict[str, Any], fallback_key: str = "uri") -> str:
     return ""
 
 
-def to_row(binding: Dict[str, Any]) -> Dict[str, Any]:
+def to_row(binding: Dict[str, Any], typed: bool = False) -> Dict[str, Any]:
     """
     Convert a SPARQL binding object into a flat dict { var: value }.
+    typed=True converts xsd literals (see convert_literal) and interns IRIs.
     """
     row: Dict[str, Any] = {}
 
@@ -34,7 +105,12 @@ def to_row(binding: Dict[str, Any]) -> Dict[str, Any]:
         if isinstance(value, dict):
             # Standard SPARQL JSON format
             if "value" in value:
-                row[key] = value["value"]
+                if not typed:
+                    row[key] = value["value"]
+                elif value.get("type") == "uri" and isinstance(value["value"], str):
+                    row[key] = sys.intern(value["value"])
+                else:
+                    row[key] = convert_literal(value["value"], value.get("datatype"))
             else:
                 # Unexpected structure → keep raw
                 row[key] = value
@@ -44,11 +120,39 @@ def to_row(binding: Dict[str, Any]) -> Dict[str, Any]:
     return row
 
 
-def sparql_json_to_rows(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+def typed_columns(res: SparqlResult) -> Dict[str, List[Any]]:
+    """
+    Columns of `res` with typed literals converted. Computed once and kept on the
+    result, so a cached result is converted once, not on every hit.
+    """
+    if res.typed is not None:
+        return res.typed
+
+    typed: Dict[str, List[Any]] = {}
+    with span("normalize"):
+        for var in res.vars:
+            values = res.columns[var]
+            dt = res.datatypes.get(var)
+            if dt is None:
+                typed[var] = values  # IRIs and plain/lang literals: shared, nothing to convert
+            elif isinstance(dt, str):
+                typed[var] = [convert_literal(v, dt) for v in values]
+            else:
+                typed[var] = [convert_literal(v, d) for v, d in zip(values, dt)]
+    res.typed = typed
+    return typed
+
+
+def sparql_json_to_rows(data: Any, typed: bool = False) -> Sequence[Dict[str, Any]]:
     """
     Convert a SPARQL JSON response to a list of flat rows.
+    A columnar SparqlResult (what SparqlClient returns) gives lazy read-only row views.
+    typed=True gives ints/floats/bools/dates for xsd literals instead of their lexical form.
     Returns [] if the response is invalid or not SPARQL JSON.
     """
+    if isinstance(data, SparqlResult):
+        return data.rows(typed_columns(data) if typed else None)
+
     if not isinstance(data, dict):
         logger.warning("Invalid SPARQL response type: %s", type(data))
         return []
@@ -63,4 +167,5 @@ def sparql_json_to_rows(data: Dict[str, Any]) -> List[Dict[str, Any]]:
         logger.warning("Missing 'bindings' in SPARQL response")
         return []
 
-    return [to_row(b) for b in bindings if isinstance(b, dict)]
+    with span("normalize"):
+        return [to_row(b, typed) for b in bindings if isinstance(b, dict)]
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+from collections import Counter as _Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Event, Lock, Thread
+from typing import Dict, Iterator, List, Optional, Tuple
+import cProfile
+import os
+import sys
+import threading
+import time
+
+# Stage durations of the current request (None = request not profiled: span() is a no-op)
+_trace: ContextVar[Optional["Trace"]] = ContextVar("request_trace", default=None)
+
+
+class Trace:
+    """
+    Stage spans of one request, summed per stage name. Stages can overlap (graph
+    build includes its SPARQL queries, concurrent queries each count their time),
+    so the durations are not meant to add up to the total.
+    """
+
+    __slots__ = ("started", "_spans", "_lock")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        # name -> (total seconds, calls)
+        self._spans: Dict[str, Tuple[float, int]] = {}
+        self._lock = Lock()  # spans also close in worker threads (DBpediaService)
+
+    def add(self, name: str, seconds: float) -> None:
+        with self._lock:
+            total, calls = self._spans.get(name, (0.0, 0))
+            self._spans[name] = (total + seconds, calls + 1)
+
+    def spans(self) -> List[Tuple[str, float, int]]:
+        with self._lock:
+            return [(name, total, calls) for name, (total, calls) in self._spans.items()]
+
+    def server_timing(self) -> str:
+        """Server-Timing header value (durations in ms), `total` = time to the response headers."""
+        parts = []
+        for name, total, calls in self.spans():
+            entry = f"{name};dur={total * 1000:.1f}"
+            if calls > 1:
+                entry += f';desc="{calls} calls"'
+            parts.append(entry)
+        parts.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.1f}")
+        return ", ".join(parts)
+
+
+def start_trace() -> Tuple[Trace, object]:
+    trace = Trace()
+    return trace, _trace.set(trace)
+
+
+def end_trace(token) -> None:
+    _trace.reset(token)
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """
+    Time a stage of the current request if it is profiled; costs one ContextVar
+    lookup otherwise.
+    """
+    trace = _trace.get()
+    if trace is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(name, time.perf_counter() - t0)
+
+
+class StackSampler:
+    """
+    Samples the stack of one thread (the event loop) every `interval_s` and counts
+    folded stacks ("mod:func;mod:func;... count"), the input format of flamegraph.pl
+    and speedscope. Other requests running on the loop meanwhile show up too.
+    """
+
+    def __init__(self, thread_id: int, interval_s: float = 0.005):
+        self.thread_id = thread_id
+        self.interval_s = interval_s
+        self.stacks: _Counter = _Counter()
+        self._stop = Event()
+        self._thread = Thread(target=self._loop, name="stack-sampler", daemon=True)
+
+    @staticmethod
+    def _fold(frame) -> str:
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval_s):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[self._fold(frame)] += 1
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def dump(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class Profiler:
+    """
+    cProfile (.pstats) or stack sampling (.collapsed) around one request.
+    Both see the whole event loop, so only one request is profiled at a time.
+    """
+
+    _busy = Lock()
+
+    def __init__(self, fmt: str, interval_s: float):
+        self.fmt = fmt
+        self._profile: Optional[cProfile.Profile] = None
+        self._sampler: Optional[StackSampler] = None
+        if fmt == "pstats":
+            self._profile = cProfile.Profile()
+        else:
+            self._sampler = StackSampler(threading.get_ident(), interval_s)
+
+    @classmethod
+    def acquire(cls, fmt: str, interval_s: float) -> Optional["Profiler"]:
+        """A started profiler, or None if another request is being profiled."""
+        if not cls._busy.acquire(blocking=False):
+            return None
+        try:
+            profiler = cls(fmt, interval_s)
+            if profiler._profile is not None:
+                profiler._profile.enable()
+            else:
+                profiler._sampler.start()
+        except Exception:
+            cls._busy.release()
+            raise
+        return profiler
+
+    def stop(self) -> None:
+        try:
+            if self._profile is not None:
+                self._profile.disable()
+            else:
+                self._sampler.stop()
+        finally:
+            Profiler._busy.release()
+
+    @property
+    def extension(self) -> str:
+        return "pstats" if self._profile is not None else "collapsed"
+
+    def dump(self, path: str) -> None:
+        if self._profile is not None:
+            self._profile.dump_stats(path)
+        else:
+            self._sampler.dump(path)
@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Set
+import asyncio
+
+from services.cache import cache_bypass, cache_validators, note_validator
+from services.normalize import sparql_json_to_rows
+from services.sparql_client import SparqlClient
+
+
+@dataclass(frozen=True)
+class BatchTemplate:
+    """
+    A single-entity query shape that can be answered for several entities at once.
+
+    `name` identifies compatible requests, so it must encode every parameter other
+    than the key (mode, limit...). `build(keys)` returns one query covering all keys
+    (VALUES block, or a UNION of per-key sub-queries when each key needs its own
+    LIMIT), whose rows carry the key in `key_var`.
+    """
+
+    name: str
+    build: Callable[[List[str]], str]
+    rows_per_key: int
+    key_var: str = "s"
+
+
+@dataclass
+class _Batch:
+    template: BatchTemplate
+    futures: Dict[str, "asyncio.Future[List[Dict[str, Any]]]"] = field(default_factory=dict)
+    timer: Any = None
+
+
+class QueryBatcher:
+    """
+    Micro-batching in front of SparqlClient: requests for the same template arriving
+    within `window_s` are merged into one upstream query (at most `max_batch` keys),
+    and the rows are split back per key. Per-key results are cached.
+
+    The window is only waited while a query of the same template is already upstream
+    (requests are queueing anyway); otherwise the batch leaves on the next loop
+    iteration, with whatever arrived in the same tick. `window_s=0` disables merging.
+    """
+
+    def __init__(self, sparql: SparqlClient, window_s: float = 0.01, max_batch: int = 20):
+        self.sparql = sparql
+        self.window_s = max(0.0, window_s)
+        self.max_batch = max(1, int(max_batch))
+        self._pending: Dict[str, _Batch] = {}
+        self._inflight: Dict[str, int] = {}  # template name -> batches upstream
+        self._tasks: Set["asyncio.Task[None]"] = set()
+        self.requests = 0
+        self.cache_hits = 0
+        self.batches = 0
+        self.batched_keys = 0
+
+    @staticmethod
+    def _cache_key(template: BatchTemplate, key: str) -> str:
+        return f"batch::{template.name}::{key}"
+
+    async def fetch(self, template: BatchTemplate, key: str) -> List[Dict[str, Any]]:
+        self.requests += 1
+        cache_key = self._cache_key(template, key)
+        if not cache_bypass.get():
+            cached = self.sparql.cache.get(cache_key)
+            if cached is not None:
+                self.cache_hits += 1
+                note_validator(self.sparql.cache, cache_key)
+                return cached
+
+        batch = self._pending.get(template.name)
+        if batch is None:
+            batch = _Batch(template)
+            self._pending[template.name] = batch
+            delay = self.window_s if self._inflight.get(template.name) else 0.0
+            batch.timer = asyncio.get_running_loop().call_later(delay, self._flush, template.name)
+
+        fut = batch.futures.get(key)
+        if fut is None:
+            fut = asyncio.get_running_loop().create_future()
+            batch.futures[key] = fut
+            if len(batch.futures) >= self.max_batch or self.window_s == 0:
+                self._flush(template.name)
+
+        # The batch keeps running for the other waiters if this caller goes away
+        rows = await asyncio.shield(fut)
+        note_validator(self.sparql.cache, cache_key)
+        return rows
+
+    def _flush(self, name: str) -> None:
+        batch = self._pending.pop(name, None)
+        if batch is None:
+            return
+        batch.timer.cancel()
+        self._inflight[name] = self._inflight.get(name, 0) + 1
+        task = asyncio.ensure_future(self._execute(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _execute(self, batch: _Batch) -> None:
+        # The task inherited the context of whichever request opened the batch: the shared
+        # query is not one of that request's validators (its per-key entry is)
+        cache_validators.set(None)
+
+        template = batch.template
+        keys = list(batch.futures)
+        budget = template.rows_per_key * len(keys)
+        self.batches += 1
+        self.batched_keys += len(keys)
+
+        try:
+            data = await self.sparql.query(
+                query=template.build(keys),
+                endpoint="dbpedia",
+                limit=budget,
+                use_cache=True,
+                max_limit=budget,
+            )
+            rows = sparql_json_to_rows(data)
+        except BaseException as e:
+            for fut in batch.futures.values():
+                if not fut.done():
+                    fut.set_exception(e)
+                    fut.exception()  # mark retrieved when every waiter left
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            return
+        finally:
+            self._inflight[template.name] -= 1
+            if not self._inflight[template.name]:
+                del self._inflight[template.name]
+
+        by_key: Dict[str, List[Dict[str, Any]]] = {k: [] for k in keys}
+        for r in rows:
+            k = r.get(template.key_var)
+            if k in by_key:
+                by_key[k].append(r)
+
+        for k, fut in batch.futures.items():
+            self.sparql.cache.set(self._cache_key(template, k), by_key[k])
+            if not fut.done():
+                fut.set_result(by_key[k])
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "window_ms": round(self.window_s * 1000, 1),
+            "max_batch": self.max_batch,
+            "requests": self.requests,
+            "cache_hits": self.cache_hits,
+            "upstream_queries": self.batches,
+            "avg_batch_size": round(self.batched_keys / self.batches, 2) if self.batches else 0.0,
+            "upstream_queries_saved": self.batched_keys - self.batches,
+        }
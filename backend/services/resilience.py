@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, List, Optional, Tuple
+import asyncio
+import time
+
+
+class LimiterTimeout(Exception):
+    """
+    No upstream slot freed up within the limiter's wait deadline.
+    """
+
+
+class AIMDLimiter:
+    """
+    Adaptive cap on outstanding upstream requests (TCP-style AIMD).
+
+    Each success grows the limit by 1/limit (about +1 per "round" of requests);
+    an overload signal (429/503, timeout, maintenance page) multiplies it by
+    `backoff`, at most once per `cooldown_s` so a burst of failures from the same
+    round only counts once.
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        min_limit: int = 1,
+        max_limit: int = 32,
+        backoff: float = 0.5,
+        cooldown_s: float = 1.0,
+        wait_timeout_s: float = 15.0,
+    ):
+        self.min_limit = max(1, int(min_limit))
+        self.max_limit = max(self.min_limit, int(max_limit))
+        self.limit = float(min(max(int(initial), self.min_limit), self.max_limit))
+        self.backoff = min(max(backoff, 0.1), 0.9)
+        self.cooldown_s = max(0.0, cooldown_s)
+        self.wait_timeout_s = max(0.0, wait_timeout_s)
+        self.inflight = 0
+        self._waiters: Deque["asyncio.Future[None]"] = deque()
+        self._last_decrease = 0.0
+        self.successes = 0
+        self.overloads = 0
+        self.decreases = 0
+        self.timeouts = 0
+
+    def _wake(self) -> None:
+        while self._waiters and self.inflight < int(self.limit):
+            fut = self._waiters.popleft()
+            if not fut.done():
+                self.inflight += 1
+                fut.set_result(None)
+
+    async def acquire(self) -> None:
+        if self.inflight < int(self.limit) and not self._waiters:
+            self.inflight += 1
+            return
+        fut: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        try:
+            await asyncio.wait_for(asyncio.shield(fut), timeout=self.wait_timeout_s)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if fut.done() and not fut.cancelled():
+                self.release()  # got the slot just as we gave up
+            else:
+                fut.cancel()
+            if isinstance(e, asyncio.TimeoutError):
+                self.timeouts += 1
+                raise LimiterTimeout("DBpedia concurrency limit reached") from None
+            raise
+
+    def release(self) -> None:
+        self.inflight -= 1
+        self._wake()
+
+    def on_success(self) -> None:
+        self.successes += 1
+        self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+        self._wake()
+
+    def on_overload(self) -> None:
+        self.overloads += 1
+        now = time.monotonic()
+        if now - self._last_decrease < self.cooldown_s:
+            return
+        self._last_decrease = now
+        self.decreases += 1
+        self.limit = max(float(self.min_limit), self.limit * self.backoff)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "limit": round(self.limit, 2),
+            "min_limit": self.min_limit,
+            "max_limit": self.max_limit,
+            "inflight": self.inflight,
+            "waiting": sum(1 for f in self._waiters if not f.done()),
+            "successes": self.successes,
+            "overloads": self.overloads,
+            "decreases": self.decreases,
+            "wait_timeouts": self.timeouts,
+        }
+
+
+class CircuitBreaker:
+    """
+    closed -> open when, over the last `window_s`, at least `min_requests` calls
+    were made and the failure ratio reached `error_rate`. After `open_s` one probe
+    is let through (half_open): success closes the circuit, failure re-opens it.
+    """
+
+    def __init__(self, window_s: float = 30.0, min_requests: int = 10, error_rate: float = 0.5, open_s: float = 30.0):
+        self.window_s = max(1.0, window_s)
+        self.min_requests = max(1, int(min_requests))
+        self.error_rate = min(max(error_rate, 0.01), 1.0)
+        self.open_s = max(1.0, open_s)
+        self.state = "closed"  # closed | open | half_open
+        self._events: Deque[Tuple[float, bool]] = deque()
+        self._opened_at = 0.0
+        self._probe_at: Optional[float] = None  # start time of the half_open probe in flight
+        self.opened = 0
+        self.rejected = 0
+        self.transitions: List[Tuple[float, str]] = []
+
+    def _set_state(self, state: str) -> None:
+        if state != self.state:
+            self.state = state
+            self.transitions.append((time.time(), state))
+            del self.transitions[:-20]
+
+    def _trim(self, now: float) -> None:
+        while self._events and now - self._events[0][0] > self.window_s:
+            self._events.popleft()
+
+    def retry_after(self) -> int:
+        if self.state != "open":
+            return 1
+        return max(1, int(self.open_s - (time.monotonic() - self._opened_at)) + 1)
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open":
+            if time.monotonic() - self._opened_at < self.open_s:
+                self.rejected += 1
+                return False
+            self._set_state("half_open")
+            self._probe_at = None
+        # half_open: a single probe at a time (a probe that never reported is replaced after open_s)
+        now = time.monotonic()
+        if self._probe_at is not None and now - self._probe_at < self.open_s:
+            self.rejected += 1
+            return False
+        self._probe_at = now
+        return True
+
+    def record(self, ok: bool) -> None:
+        now = time.monotonic()
+        if self.state == "half_open":
+            self._probe_at = None
+            if ok:
+                self._events.clear()
+                self._set_state("closed")
+            else:
+                self._open(now)
+            return
+
+        self._events.append((now, ok))
+        self._trim(now)
+        if ok or self.state != "closed":
+            return
+        total = len(self._events)
+        failures = sum(1 for _, good in self._events if not good)
+        if total >= self.min_requests and failures / total >= self.error_rate:
+            self._open(now)
+
+    def cancel(self) -> None:
+        """
+        A call let through by allow() ended without reaching the endpoint (e.g. a
+        local limiter timeout): nothing to record, but the half_open probe is freed.
+        """
+        if self.state == "half_open":
+            self._probe_at = None
+
+    def _open(self, now: float) -> None:
+        self._opened_at = now
+        self.opened += 1
+        self._set_state("open")
+
+    def stats(self) -> Dict[str, object]:
+        self._trim(time.monotonic())
+        total = len(self._events)
+        failures = sum(1 for _, good in self._events if not good)
+        return {
+            "state": self.state,
+            "window_requests": total,
+            "window_error_rate": round(failures / total, 4) if total else 0.0,
+            "error_rate_threshold": self.error_rate,
+            "min_requests": self.min_requests,
+            "open_s": self.open_s,
+            "retry_after_s": self.retry_after() if self.state == "open" else None,
+            "times_opened": self.opened,
+            "rejected": self.rejected,
+            "transitions": [{"at": round(t, 3), "state": s} for t, s in self.transitions],
+        }
@@ -0,0 +1,414 @@
+from __future__ import annotations
+
+from collections.abc import Mapping
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+import asyncio
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+
+from services.cache import CacheItem, TTLCache, cache_bypass
+from services.sparql_results import SparqlResult, loads
+
+try:
+    import orjson
+except Exception:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    ns TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value BLOB NOT NULL,
+    expires_at REAL NOT NULL,
+    version INTEGER NOT NULL,
+    PRIMARY KEY (ns, key)
+);
+CREATE INDEX IF NOT EXISTS entries_expires ON entries (ns, expires_at);
+CREATE TABLE IF NOT EXISTS leases (
+    ns TEXT NOT NULL,
+    key TEXT NOT NULL,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (ns, key)
+);
+"""
+
+# Value tags: SparqlResult is stored as SPARQL JSON and rebuilt, anything else as JSON
+_SPARQL, _JSON = b"S", b"J"
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, Mapping):
+        return dict(obj)  # RowView (per-key batcher rows)
+    return str(obj)
+
+
+def _dumps(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default)
+    return json.dumps(obj, default=_default, ensure_ascii=False).encode("utf-8")
+
+
+def encode(value: Any) -> bytes:
+    if isinstance(value, SparqlResult):
+        return _SPARQL + _dumps(value.to_json())
+    return _JSON + _dumps(value)
+
+
+def decode(blob: bytes) -> Any:
+    tag, body = blob[:1], blob[1:]
+    data = loads(body)
+    return SparqlResult.from_json(data) if tag == _SPARQL else data
+
+
+# The event loop only reads, and gives up quickly: in WAL mode readers almost never
+# wait, and a miss is cheaper than a stalled loop. Writes go through a background thread.
+_READ_TIMEOUT_S = 0.05
+_WRITE_TIMEOUT_S = 5.0
+# A local copy whose version SQLite confirmed this recently is trusted by peek()
+_CONFIRM_S = 1.0
+
+
+@dataclass
+class _LocalItem(CacheItem):
+    checked_at: float = 0.0  # time.monotonic() of the last version check against SQLite
+
+
+class _Writer:
+    """
+    One background thread applying a cache's SQLite writes in submission order
+    (entries, then the lease release that lets other workers read them).
+    """
+
+    def __init__(self, name: str, on_error: Callable[[Exception], None]):
+        self.name = name
+        self.on_error = on_error
+        self._queue: "queue.Queue[Callable[[], None]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._pid = 0
+        self._start_lock = threading.Lock()
+
+    def submit(self, job: Callable[[], None]) -> None:
+        if self._thread is None or self._pid != os.getpid():
+            with self._start_lock:
+                if self._thread is None or self._pid != os.getpid():
+                    self._queue = queue.Queue()
+                    self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                    self._pid = os.getpid()
+                    self._thread.start()
+        self._queue.put(job)
+
+    def join(self) -> None:
+        """Wait until every submitted write is applied."""
+        if self._thread is not None:
+            self._queue.join()
+
+    def _run(self) -> None:
+        q = self._queue
+        while True:
+            job = q.get()
+            try:
+                job()
+            except Exception as e:
+                self.on_error(e)
+            finally:
+                q.task_done()
+
+
+class SharedTTLCache(TTLCache):
+    """
+    TTLCache whose entries live in a SQLite file (WAL mode) shared by every worker
+    process on the host; several caches share one file under their own namespace.
+
+    Each lookup reads the entry's version from SQLite; the decoded value is kept in
+    process (the inherited LRU) and reused while the version is unchanged, so a hit
+    costs one indexed read, not a decode. Versions are shared too, so every worker
+    derives the same ETag for the same entries.
+
+    Writes (entries, pruning, leases) never run on the event loop: set() updates the
+    local copy and queues the SQLite write on a background thread. When SQLite fails
+    (locked, disk error), lookups fall back to the local copy: a miss at worst.
+
+    `coalesce()` extends single-flight across processes with a lease row: one worker
+    fetches a missing key, the others wait for its entry.
+    """
+
+    def __init__(self, path: str, namespace: str, ttl_seconds: int, max_items: int, stale_grace_s: int = 3600):
+        super().__init__(ttl_seconds=ttl_seconds, max_items=max_items)
+        self.path = path
+        self.namespace = namespace
+        # Expired rows are kept this long for get_stale (served while DBpedia is failing)
+        self.stale_grace_s = stale_grace_s
+        self.owner = f"{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._local = threading.local()
+        self._writer = _Writer(f"shared-cache-{namespace}", self._degraded)
+        self._pending: Dict[str, int] = {}  # key -> version queued but not yet in SQLite
+        self._sets = 0
+        self.coalesced = 0
+        self.sqlite_errors = 0
+        self._last_error_log = 0.0
+        try:
+            self._conn(write=True)  # creates the file and the schema at startup
+        except sqlite3.Error as e:
+            self._degraded(e)
+
+    # --- SQLite plumbing -------------------------------------------------
+    def _conn(self, write: bool = False) -> sqlite3.Connection:
+        # One read and one write connection per thread, reopened after a fork
+        attr = "write" if write else "read"
+        if getattr(self._local, "pid", None) != os.getpid():
+            self._local.__dict__.clear()
+            self._local.pid = os.getpid()
+        conn = getattr(self._local, attr, None)
+        if conn is None:
+            dirname = os.path.dirname(self.path)
+            if write and dirname:
+                os.makedirs(dirname, exist_ok=True)
+            timeout = _WRITE_TIMEOUT_S if write else _READ_TIMEOUT_S
+            conn = sqlite3.connect(self.path, timeout=timeout, isolation_level=None, check_same_thread=False)
+            if write:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.executescript(_SCHEMA)
+            setattr(self._local, attr, conn)
+        return conn
+
+    def _degraded(self, e: Exception) -> None:
+        with self._lock:
+            self.sqlite_errors += 1
+            now = time.monotonic()
+            if now - self._last_error_log < 60:
+                return
+            self._last_error_log = now
+        logger.warning("Shared cache %s (%s) unavailable, using the local copy: %s", self.path, self.namespace, e)
+
+    def _row(self, key: str) -> Optional[Tuple[int, float]]:
+        return self._conn().execute(
+            "SELECT version, expires_at FROM entries WHERE ns = ? AND key = ?", (self.namespace, key)
+        ).fetchone()
+
+    def _local_item(self, key: str) -> Optional[_LocalItem]:
+        with self._lock:
+            return self._store.get(key)  # type: ignore[return-value]
+
+    def _load(self, key: str, version: int, expires_at: float) -> Any:
+        """Value for (key, version): from the local copy when current, else decoded from SQLite."""
+        with self._lock:
+            local = self._store.get(key)
+            if local is not None and local.version == version:
+                self._store.move_to_end(key)
+                local.checked_at = time.monotonic()  # type: ignore[attr-defined]
+                return local.value
+        row = self._conn().execute(
+            "SELECT value FROM entries WHERE ns = ? AND key = ?", (self.namespace, key)
+        ).fetchone()
+        if row is None:
+            return None
+        value = decode(row[0])
+        self._keep(key, _LocalItem(value=value, expires_at=expires_at, version=version, checked_at=time.monotonic()))
+        return value
+
+    def _keep(self, key: str, item: CacheItem) -> None:
+        with self._lock:
+            self._store[key] = item
+            self._store.move_to_end(key)
+            while len(self._store) > self.max_items:
+                self._store.popitem(last=False)
+
+    def _local_only(self, key: str) -> bool:
+        # A write of ours is still queued, or SQLite lost it: the local copy is the latest
+        with self._lock:
+            return key in self._pending
+
+    # --- TTLCache interface ----------------------------------------------
+    def get(self, key: str) -> Optional[Any]:
+        if self._local_only(key):
+            return super().get(key)
+        try:
+            row = self._row(key)
+            if row is None:
+                # Not shared (yet, or our write failed): the local copy if it is fresh
+                return super().get(key)
+            if time.time() > row[1]:
+                with self._lock:
+                    self.misses += 1
+                return None
+            value = self._load(key, row[0], row[1])
+        except sqlite3.Error as e:
+            self._degraded(e)
+            return super().get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def get_stale(self, key: str) -> Optional[Any]:
+        if self._local_only(key):
+            return super().get_stale(key)
+        try:
+            row = self._row(key)
+            if row is not None:
+                return self._load(key, row[0], row[1])
+        except sqlite3.Error as e:
+            self._degraded(e)
+        return super().get_stale(key)
+
+    def peek(self, key: str) -> Optional[CacheItem]:
+        # Right after get() (note_validator on a hit), the version it just checked is reused
+        local = self._local_item(key)
+        if local is not None and (
+            self._local_only(key) or time.monotonic() - getattr(local, "checked_at", 0.0) < _CONFIRM_S
+        ):
+            return local
+        try:
+            row = self._row(key)
+        except sqlite3.Error as e:
+            self._degraded(e)
+            return local
+        if row is None:
+            return local
+        value = local.value if local is not None and local.version == row[0] else None
+        return CacheItem(value=value, expires_at=row[1], version=row[0])
+
+    def set(self, key: str, value: Any) -> None:
+        item = _LocalItem(value=value, expires_at=time.time() + self.ttl, version=time.time_ns(),
+                          checked_at=time.monotonic())
+        blob = encode(value)
+        self._keep(key, item)
+        with self._lock:
+            self._pending[key] = item.version
+            self._sets += 1
+            prune = self._sets % 100 == 0
+        self._writer.submit(lambda: self._write(key, blob, item))
+        if prune:
+            self._writer.submit(self._prune)
+
+    def _write(self, key: str, blob: bytes, item: CacheItem) -> None:
+        try:
+            self._conn(write=True).execute(
+                "INSERT OR REPLACE INTO entries (ns, key, value, expires_at, version) VALUES (?, ?, ?, ?, ?)",
+                (self.namespace, key, blob, item.expires_at, item.version),
+            )
+        finally:
+            # Written or lost, SQLite is the reference again (get() falls back to the local copy if absent)
+            with self._lock:
+                if self._pending.get(key) == item.version:
+                    del self._pending[key]
+
+    def _prune(self) -> None:
+        conn = self._conn(write=True)
+        conn.execute(
+            "DELETE FROM entries WHERE ns = ? AND expires_at < ?", (self.namespace, time.time() - self.stale_grace_s)
+        )
+        # Over capacity: drop the entries closest to expiry
+        conn.execute(
+            "DELETE FROM entries WHERE ns = ? AND key IN (SELECT key FROM entries WHERE ns = ? "
+            "ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.namespace, self.namespace, self.max_items),
+        )
+
+    def clear(self) -> None:
+        super().clear()
+        self._writer.submit(
+            lambda: self._conn(write=True).execute("DELETE FROM entries WHERE ns = ?", (self.namespace,))
+        )
+
+    def flush(self) -> None:
+        """Block until queued writes reached SQLite (tests, benchmarks, shutdown)."""
+        self._writer.join()
+
+    def stats(self) -> dict:
+        try:
+            shared = self._conn().execute(
+                "SELECT COUNT(*) FROM entries WHERE ns = ?", (self.namespace,)
+            ).fetchone()[0]
+        except sqlite3.Error as e:
+            self._degraded(e)
+            shared = None
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            **super().stats(),
+            "shared_path": self.path,
+            "shared_items": shared,
+            "pending_writes": pending,
+            "coalesced": self.coalesced,
+            "sqlite_errors": self.sqlite_errors,
+        }
+
+    # --- cross-process single-flight -------------------------------------
+    # Lease rows are written from worker threads (asyncio.to_thread), never on the loop
+    def _acquire(self, key: str, lease_s: float) -> bool:
+        now = time.time()
+        conn = self._conn(write=True)
+        conn.execute("DELETE FROM leases WHERE ns = ? AND key = ? AND expires_at < ?", (self.namespace, key, now))
+        cur = conn.execute(
+            "INSERT OR IGNORE INTO leases (ns, key, owner, expires_at) VALUES (?, ?, ?, ?)",
+            (self.namespace, key, self.owner, now + lease_s),
+        )
+        return cur.rowcount == 1
+
+    def _release(self, key: str) -> None:
+        self._conn(write=True).execute(
+            "DELETE FROM leases WHERE ns = ? AND key = ? AND owner = ?", (self.namespace, key, self.owner)
+        )
+
+    def _leased(self, key: str) -> bool:
+        return self._conn().execute(
+            "SELECT 1 FROM leases WHERE ns = ? AND key = ? AND expires_at >= ?", (self.namespace, key, time.time())
+        ).fetchone() is not None
+
+    async def coalesce(self, key: str, fn: Callable[[], Awaitable[Any]], lease_s: float = 60.0) -> Any:
+        """
+        fn() (which stores its result under `key`) in at most one process at a time:
+        while another worker holds the lease, wait for the entry it writes. If that
+        worker fails (no entry once the lease is gone), the next waiter takes over.
+        Without SQLite, fn() just runs here.
+        """
+        delay = 0.01
+        while True:
+            try:
+                acquired = await asyncio.to_thread(self._acquire, key, lease_s)
+            except sqlite3.Error as e:
+                self._degraded(e)
+                return await fn()
+            if acquired:
+                try:
+                    # Another worker may have written it between our miss and the lease
+                    value = None if cache_bypass.get() else self.get(key)
+                    if value is not None:
+                        self.coalesced += 1
+                        return value
+                    return await fn()
+                finally:
+                    # Queued behind fn()'s entry write: waiters find the entry once the lease is gone
+                    self._writer.submit(lambda: self._release(key))
+            try:
+                while await asyncio.to_thread(self._leased, key):
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, 0.2)
+            except sqlite3.Error as e:
+                self._degraded(e)
+                return await fn()
+            value = self.get(key)
+            if value is not None:
+                self.coalesced += 1
+                return value
+
+
+def make_cache(path: str, namespace: str, ttl_seconds: int, max_items: int) -> TTLCache:
+    """In-process TTLCache, or a SharedTTLCache when a shared cache path is configured."""
+    if path:
+        return SharedTTLCache(path, namespace, ttl_seconds=ttl_seconds, max_items=max_items)
+    return TTLCache(ttl_seconds=ttl_seconds, max_items=max_items)
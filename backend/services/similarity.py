@@ -0,0 +1,285 @@
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import hashlib
+import logging
+import os
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Predicates used to build an entity's neighbour set (same family as /graph?mode=foot)
+NEIGHBOR_PREDICATES: Tuple[str, ...] = (
+    "http://dbpedia.org/ontology/team",
+    "http://dbpedia.org/ontology/club",
+    "http://dbpedia.org/ontology/currentTeam",
+    "http://dbpedia.org/ontology/nationalteam",
+    "http://dbpedia.org/ontology/position",
+    "http://dbpedia.org/ontology/league",
+    "http://dbpedia.org/ontology/ground",
+    "http://dbpedia.org/ontology/manager",
+    "http://dbpedia.org/ontology/award",
+    "http://dbpedia.org/ontology/birthPlace",
+)
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_BAND_MULT = np.uint64(1099511628211)  # FNV-1a 64-bit prime
+
+
+def type_for_kind(kind: str) -> str:
+    if kind == "player":
+        return "http://dbpedia.org/ontology/SoccerPlayer"
+    if kind == "club":
+        return "http://dbpedia.org/ontology/SoccerClub"
+    if kind == "stadium":
+        return "http://dbpedia.org/ontology/Stadium"
+    return ""
+
+
+def neighbor_filter() -> str:
+    """
+    SPARQL FILTER restricting ?p to NEIGHBOR_PREDICATES.
+    """
+    preds = ",\n        ".join(f"<{p}>" for p in NEIGHBOR_PREDICATES)
+    return f"FILTER (?p IN (\n        {preds}\n    ))"
+
+
+def hash_tokens(tokens: Iterable[str]) -> np.ndarray:
+    """
+    Hash neighbour IRIs to sorted, unique uint32 values (stable across processes).
+    """
+    values = {
+        int.from_bytes(hashlib.blake2b(t.encode("utf-8"), digest_size=4).digest(), "little")
+        for t in tokens
+        if t
+    }
+    return np.array(sorted(values), dtype=np.uint32)
+
+
+class MinHasher:
+    """
+    MinHash over uint32 token hashes with a fixed family of (a*x + b) mod p permutations.
+    """
+
+    def __init__(self, num_perm: int = 128, seed: int = 1):
+        self.num_perm = int(num_perm)
+        self.seed = int(seed)
+        rng = np.random.RandomState(self.seed)
+        self._a = rng.randint(1, np.iinfo(np.int64).max, size=self.num_perm, dtype=np.int64).astype(np.uint64) % _MERSENNE_PRIME
+        self._b = rng.randint(0, np.iinfo(np.int64).max, size=self.num_perm, dtype=np.int64).astype(np.uint64) % _MERSENNE_PRIME
+
+    def signature(self, token_hashes: np.ndarray) -> np.ndarray:
+        if token_hashes.size == 0:
+            return np.full(self.num_perm, np.iinfo(np.uint32).max, dtype=np.uint32)
+        hv = token_hashes.astype(np.uint64)[:, None]
+        with np.errstate(over="ignore"):
+            phv = ((hv * self._a[None, :] + self._b[None, :]) % _MERSENNE_PRIME) & _MAX_HASH
+        return phv.min(axis=0).astype(np.uint32)
+
+
+class SimilarityIndex:
+    """
+    Neighbour-set similarity index for one entity kind.
+
+    - Exact mode: cosine |A∩B| / sqrt(|A|.|B|) over every indexed entity (vectorized on CSR arrays).
+    - Approximate mode: MinHash signatures + LSH banding; candidates from matching
+      band buckets are re-ranked with the exact cosine.
+
+    Everything is stored in flat NumPy arrays so the index can be saved with np.savez.
+    """
+
+    def __init__(
+        self,
+        uris: Sequence[str],
+        indptr: np.ndarray,
+        tokens: np.ndarray,
+        signatures: np.ndarray,
+        num_perm: int,
+        bands: int,
+        seed: int = 1,
+    ):
+        if num_perm % bands != 0:
+            raise ValueError("num_perm must be a multiple of bands")
+
+        self.uris: List[str] = list(uris)
+        self.indptr = indptr.astype(np.int64)
+        self.tokens = tokens.astype(np.uint32)
+        self.signatures = signatures.astype(np.uint32)
+        self.num_perm = int(num_perm)
+        self.bands = int(bands)
+        self.rows = self.num_perm // self.bands
+        self.hasher = MinHasher(num_perm=self.num_perm, seed=seed)
+
+        self._pos: Dict[str, int] = {u: i for i, u in enumerate(self.uris)}
+        self._sizes = np.diff(self.indptr)
+        self._row_ids = np.repeat(np.arange(len(self.uris), dtype=np.int64), self._sizes)
+
+        # LSH buckets: one sorted key array per band + the permutation back to entity ids
+        keys = self._band_keys(self.signatures)  # (bands, n)
+        self._bucket_order = np.argsort(keys, axis=1, kind="stable").astype(np.int64)
+        self._bucket_keys = np.take_along_axis(keys, self._bucket_order, axis=1)
+
+    def __len__(self) -> int:
+        return len(self.uris)
+
+    # ---------------------------
+    # Construction / persistence
+    # ---------------------------
+
+    @classmethod
+    def build(
+        cls,
+        neighbor_sets: Dict[str, Iterable[str]],
+        num_perm: int = 128,
+        bands: int = 64,
+        seed: int = 1,
+    ) -> "SimilarityIndex":
+        hasher = MinHasher(num_perm=num_perm, seed=seed)
+
+        uris: List[str] = []
+        chunks: List[np.ndarray] = []
+        sigs: List[np.ndarray] = []
+        indptr = [0]
+        for uri, neighbors in neighbor_sets.items():
+            th = hash_tokens(neighbors)
+            uris.append(uri)
+            chunks.append(th)
+            sigs.append(hasher.signature(th))
+            indptr.append(indptr[-1] + th.size)
+
+        tokens = np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.uint32)
+        signatures = np.vstack(sigs) if sigs else np.zeros((0, num_perm), dtype=np.uint32)
+        return cls(
+            uris=uris,
+            indptr=np.array(indptr, dtype=np.int64),
+            tokens=tokens,
+            signatures=signatures,
+            num_perm=num_perm,
+            bands=bands,
+            seed=seed,
+        )
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez_compressed(
+            path,
+            uris=np.array(self.uris, dtype=np.str_),
+            indptr=self.indptr,
+            tokens=self.tokens,
+            signatures=self.signatures,
+            params=np.array([self.num_perm, self.bands, self.hasher.seed], dtype=np.int64),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "SimilarityIndex":
+        with np.load(path, allow_pickle=False) as data:
+            num_perm, bands, seed = (int(x) for x in data["params"])
+            return cls(
+                uris=data["uris"].tolist(),
+                indptr=data["indptr"],
+                tokens=data["tokens"],
+                signatures=data["signatures"],
+                num_perm=num_perm,
+                bands=bands,
+                seed=seed,
+            )
+
+    # ---------------------------
+    # Queries
+    # ---------------------------
+
+    def _band_keys(self, signatures: np.ndarray) -> np.ndarray:
+        sig = np.atleast_2d(signatures).astype(np.uint64)
+        n = sig.shape[0]
+        banded = sig.reshape(n, self.bands, self.rows)
+        keys = np.zeros((n, self.bands), dtype=np.uint64)
+        with np.errstate(over="ignore"):
+            for r in range(self.rows):
+                keys = (keys ^ banded[:, :, r]) * _BAND_MULT
+        return keys.T  # (bands, n)
+
+    def tokens_of(self, uri: str) -> Optional[np.ndarray]:
+        i = self._pos.get(uri)
+        if i is None:
+            return None
+        return self.tokens[self.indptr[i]: self.indptr[i + 1]]
+
+    def _cosine(self, query_tokens: np.ndarray, candidates: Optional[np.ndarray] = None) -> np.ndarray:
+        if query_tokens.size == 0:
+            n = len(self.uris) if candidates is None else candidates.size
+            return np.zeros(n, dtype=np.float64)
+
+        if candidates is None:
+            mask = np.isin(self.tokens, query_tokens, assume_unique=False)
+            inter = np.bincount(self._row_ids, weights=mask, minlength=len(self.uris))
+            sizes = self._sizes
+        else:
+            # Gather the candidates' CSR slices in one shot
+            sizes = self._sizes[candidates]
+            starts = self.indptr[candidates]
+            offsets = np.repeat(starts - np.cumsum(sizes) + sizes, sizes)
+            gathered = self.tokens[offsets + np.arange(int(sizes.sum()), dtype=np.int64)]
+            owner = np.repeat(np.arange(candidates.size, dtype=np.int64), sizes)
+            mask = np.isin(gathered, query_tokens, assume_unique=False)
+            inter = np.bincount(owner, weights=mask, minlength=candidates.size)
+
+        denom = np.sqrt(sizes.astype(np.float64) * float(query_tokens.size))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            scores = np.where(denom > 0, inter / denom, 0.0)
+        return scores
+
+    def candidates(self, signature: np.ndarray) -> np.ndarray:
+        qkeys = self._band_keys(signature)[:, 0]
+        found: List[np.ndarray] = []
+        for b in range(self.bands):
+            row = self._bucket_keys[b]
+            lo = np.searchsorted(row, qkeys[b], side="left")
+            hi = np.searchsorted(row, qkeys[b], side="right")
+            if hi > lo:
+                found.append(self._bucket_order[b, lo:hi])
+        if not found:
+            return np.zeros(0, dtype=np.int64)
+        return np.unique(np.concatenate(found))
+
+    def _top_k(self, ids: np.ndarray, scores: np.ndarray, k: int, exclude: Optional[str]) -> List[Tuple[str, float]]:
+        keep = scores > 0
+        if exclude is not None and exclude in self._pos:
+            keep &= ids != self._pos[exclude]
+        ids, scores = ids[keep], scores[keep]
+        if ids.size == 0:
+            return []
+
+        k = min(k, ids.size)
+        part = np.argpartition(-scores, k - 1)[:k]
+        order = part[np.lexsort((ids[part], -scores[part]))]
+        return [(self.uris[int(ids[i])], float(scores[i])) for i in order]
+
+    def exact(self, query_tokens: np.ndarray, k: int = 20, exclude: Optional[str] = None) -> List[Tuple[str, float]]:
+        scores = self._cosine(query_tokens)
+        return self._top_k(np.arange(len(self.uris), dtype=np.int64), scores, k, exclude)
+
+    def approximate(self, query_tokens: np.ndarray, k: int = 20, exclude: Optional[str] = None) -> List[Tuple[str, float]]:
+        cand = self.candidates(self.hasher.signature(query_tokens))
+        if cand.size == 0:
+            return []
+        scores = self._cosine(query_tokens, candidates=cand)
+        return self._top_k(cand, scores, k, exclude)
+
+
+def index_path(directory: str, kind: str) -> str:
+    return os.path.join(directory, f"{kind}.npz")
+
+
+def load_index(directory: str, kind: str) -> Optional[SimilarityIndex]:
+    path = index_path(directory, kind)
+    if not os.path.exists(path):
+        return None
+    try:
+        idx = SimilarityIndex.load(path)
+        logger.info("Similarity index loaded: %s (%d entities)", path, len(idx))
+        return idx
+    except Exception as e:
+        logger.warning("Similarity index %s could not be loaded: %s", path, e)
+        return None
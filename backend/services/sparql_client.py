@@ -1,14 +1,22 @@
 from __future__ import annotations
 
-from typing import Dict, Literal, Optional
+from typing import Dict, Literal, Optional, Tuple
+from urllib.parse import urlencode
 import asyncio
 import hashlib
+import time
 
 import httpx
 from fastapi import HTTPException
 
 from api.config import settings
-from services.cache import TTLCache
+from services.cache import SingleFlight, TTLCache, cache_bypass, note_validator
+from services.metrics import SPARQL_LATENCY, SPARQL_MAINTENANCE, SPARQL_RETRIES
+from services.profiling import span
+from services.resilience import AIMDLimiter, CircuitBreaker, LimiterTimeout
+from services.sparql_paging import split_limit_offset
+from services.sparql_results import SparqlResult, loads
+from services.warmup import QueryRecorder
 
 # DBpedia-only project
 EndpointName = Literal["dbpedia"]
@@ -18,13 +26,42 @@ class SparqlClient:
     """
     Robust SPARQL client for DBpedia.
 
-    - Uses GET with explicit 'format=application/sparql-results+json'
+    - Uses GET with explicit 'format=application/sparql-results+json'; long queries
+      (per-key UNIONs, merged batches) go as a POST form body instead, since request
+      lines over ~8 KB are rejected by proxies and servers
     - Guardrails: LIMIT cap, timeouts, retries, cache.
     - DBpedia can sometimes return an HTML "maintenance" page with HTTP 200.
+    - Responses decoded with orjson into a columnar SparqlResult (also the cached form).
+    - Shared protection: AIMD limit on outstanding requests, circuit breaker
+      (stale cache entries are served, or 503 is returned, while DBpedia is failing).
+    - With a shared cache (SHARED_CACHE_PATH), identical queries are also coalesced
+      across uvicorn workers.
     """
 
-    def __init__(self, cache: TTLCache):
+    def __init__(
+        self,
+        cache: TTLCache,
+        recorder: Optional["QueryRecorder"] = None,
+        limiter: Optional[AIMDLimiter] = None,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
         self.cache = cache
+        self.recorder = recorder
+        # Single-flight: identical queries in progress share one upstream request
+        self._flights = SingleFlight()
+        self.limiter = limiter or AIMDLimiter(
+            initial=settings.DBPEDIA_CONCURRENCY,
+            min_limit=settings.DBPEDIA_CONCURRENCY_MIN,
+            max_limit=settings.DBPEDIA_CONCURRENCY_MAX,
+            wait_timeout_s=settings.HTTP_TIMEOUT_S,
+        )
+        self.breaker = breaker or CircuitBreaker(
+            window_s=settings.BREAKER_WINDOW_S,
+            min_requests=settings.BREAKER_MIN_REQUESTS,
+            error_rate=settings.BREAKER_ERROR_RATE,
+            open_s=settings.BREAKER_OPEN_S,
+        )
+        self.stale_served = 0
 
     @staticmethod
     def _endpoint_url() -> str:
@@ -32,11 +69,17 @@ class SparqlClient:
 
     @staticmethod
     def _enforce_limit(query: str, limit: int) -> str:
-        # If query already has LIMIT, keep it as-is. Otherwise append LIMIT.
-        q_upper = query.upper()
-        if "LIMIT" in q_upper:
+        # Outer LIMIT kept if within the cap, lowered otherwise, appended if missing
+        # (sub-query LIMITs and "LIMIT" inside IRIs/literals don't count).
+        body, own_limit, offset = split_limit_offset(query)
+        if own_limit is None and offset is None:
+            return query.strip() + f"\nLIMIT {limit}\n"
+        if own_limit is not None and own_limit <= limit:
             return query.strip()
-        return query.strip() + f"\nLIMIT {limit}\n"
+        final = body + f"\nLIMIT {limit}"
+        if offset is not None:
+            final += f"\nOFFSET {offset}"
+        return final
 
     @staticmethod
     def _cache_key(limit: int, final_query: str) -> str:
@@ -65,7 +108,7 @@ class SparqlClient:
         except Exception:
             return default_s
 
-    async def _request_sparql(self, final_query: str) -> Dict:
+    async def _request_sparql(self, final_query: str) -> SparqlResult:
         url = self._endpoint_url()
 
         headers = {
@@ -79,6 +122,7 @@ class SparqlClient:
             "query": final_query,
             "format": "application/sparql-results+json",
         }
+        use_post = len(urlencode(params)) > settings.SPARQL_GET_MAX_BYTES
 
         async with httpx.AsyncClient(
             timeout=timeout,
@@ -88,70 +132,173 @@ class SparqlClient:
             last_status: Optional[int] = None
 
             for attempt in range(1, 4):  # 3 attempts
+                # Circuit opened meanwhile: retrying would only add load
+                if attempt > 1 and self.breaker.state == "open":
+                    break
+
                 try:
-                    resp = await client.get(url, params=params, headers=headers)
+                    async with self.limiter.slot():
+                        t0 = time.perf_counter()
+                        if use_post:
+                            resp = await client.post(url, data=params, headers=headers)
+                        else:
+                            resp = await client.get(url, params=params, headers=headers)
+                        elapsed = time.perf_counter() - t0
+
+                except LimiterTimeout:
+                    SPARQL_LATENCY.observe(0.0, outcome="limiter_timeout")
+                    # A retry that could not get a slot: report the upstream failure that caused it
+                    if last_status is not None:
+                        raise HTTPException(status_code=502, detail=f"dbpedia request failed ({last_status})")
+                    raise
 
                 except httpx.TimeoutException:
+                    SPARQL_LATENCY.observe(time.perf_counter() - t0, outcome="timeout")
+                    last_status = 504
+                    self.limiter.on_overload()
                     if attempt == 3:
                         raise HTTPException(status_code=504, detail="SPARQL endpoint timeout (dbpedia)")
+                    SPARQL_RETRIES.inc(reason="timeout")
                     await asyncio.sleep(0.4 * attempt)
                     continue
 
                 except httpx.RequestError as e:
+                    SPARQL_LATENCY.observe(time.perf_counter() - t0, outcome="network_error")
                     raise HTTPException(status_code=502, detail=f"SPARQL endpoint error (dbpedia): {str(e)}")
 
                 # DBpedia may return 200 with HTML maintenance page
                 if resp.status_code == 200 and self._is_maintenance_html(resp):
+                    SPARQL_LATENCY.observe(elapsed, outcome="maintenance")
+                    SPARQL_MAINTENANCE.inc()
                     last_status = 503
+                    self.limiter.on_overload()
                     if attempt == 3:
                         raise HTTPException(status_code=503, detail="DBpedia under maintenance")
+                    SPARQL_RETRIES.inc(reason="maintenance")
                     await asyncio.sleep(0.7 * attempt)
                     continue
 
                 # Retryable HTTP codes
                 if self._should_retry(resp.status_code):
+                    SPARQL_LATENCY.observe(elapsed, outcome=f"http_{resp.status_code}")
                     last_status = resp.status_code
+                    self.limiter.on_overload()
                     if attempt == 3:
                         raise HTTPException(status_code=resp.status_code, detail=f"dbpedia returned {resp.status_code}")
+                    SPARQL_RETRIES.inc(reason=f"http_{resp.status_code}")
                     wait_s = self._retry_after_seconds(resp, default_s=0.6 * (2 ** (attempt - 1)))
                     await asyncio.sleep(min(wait_s, 5.0))
                     continue
 
                 if resp.status_code != 200:
+                    SPARQL_LATENCY.observe(elapsed, outcome=f"http_{resp.status_code}")
                     raise HTTPException(status_code=resp.status_code, detail=f"dbpedia returned {resp.status_code}")
 
                 try:
-                    return resp.json()
+                    with span("decode"):
+                        data = SparqlResult.from_json(loads(resp.content))
                 except Exception:
+                    SPARQL_LATENCY.observe(elapsed, outcome="non_json")
                     ct = resp.headers.get("content-type", "")
                     raise HTTPException(
                         status_code=502,
                         detail=f"dbpedia returned non-JSON response (Content-Type: {ct})",
                     )
+                SPARQL_LATENCY.observe(elapsed, outcome="ok")
+                self.limiter.on_success()
+                return data
 
             raise HTTPException(status_code=502, detail=f"dbpedia request failed ({last_status})")
 
-    async def query(self, query: str, endpoint: EndpointName, limit: int, use_cache: bool = True) -> Dict:
+    async def _guarded_request(self, final_query: str, cache_key: str) -> Tuple[SparqlResult, bool]:
+        """
+        Circuit breaker around _request_sparql. Returns (data, fresh): while DBpedia is
+        failing, a stale cache entry is served when one exists, otherwise 503 right away.
+        Only upstream outcomes are recorded; a limiter timeout is a plain 503.
+        """
+        if not self.breaker.allow():
+            stale = self.cache.get_stale(cache_key)
+            if stale is not None:
+                self.stale_served += 1
+                return stale, False
+            raise HTTPException(
+                status_code=503,
+                detail="DBpedia is failing, circuit open",
+                headers={"Retry-After": str(self.breaker.retry_after())},
+            )
+
+        try:
+            data = SparqlResult.from_json(await self._request_sparql(final_query=final_query))
+        except LimiterTimeout as e:
+            # Local queueing, DBpedia never saw the request: not a breaker failure
+            self.breaker.cancel()
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+        except HTTPException as e:
+            # 4xx = our query was rejected, the endpoint itself is fine
+            failed = e.status_code >= 500 or e.status_code == 429
+            self.breaker.record(not failed)
+            stale = self.cache.get_stale(cache_key) if failed else None
+            if stale is not None:
+                self.stale_served += 1
+                return stale, False
+            raise
+        self.breaker.record(True)
+        return data, True
+
+    def diagnostics(self) -> Dict:
+        return {
+            "limiter": self.limiter.stats(),
+            "breaker": self.breaker.stats(),
+            "stale_served": self.stale_served,
+            "inflight_queries": len(self._flights),
+        }
+
+    async def query(
+        self,
+        query: str,
+        endpoint: EndpointName,
+        limit: int,
+        use_cache: bool = True,
+        max_limit: Optional[int] = None,
+    ) -> SparqlResult:
         # Keep signature compatible with the rest of the codebase (endpoint is always 'dbpedia')
         if endpoint != "dbpedia":
             raise HTTPException(status_code=400, detail="Only DBpedia endpoint is supported")
 
+        # Batched callers (several entities per query) may raise the cap explicitly
+        cap = max_limit if max_limit is not None else settings.MAX_LIMIT
+
         if limit <= 0:
             raise HTTPException(status_code=400, detail="limit must be > 0")
-        if limit > settings.MAX_LIMIT:
-            limit = settings.MAX_LIMIT
+        if limit > cap:
+            limit = cap
 
         final_query = self._enforce_limit(query, limit)
 
         cache_key = self._cache_key(limit, final_query)
-        if use_cache:
-            cached = self.cache.get(cache_key)
-            if cached is not None:
-                return cached
-
-        data = await self._request_sparql(final_query=final_query)
-
-        if use_cache:
-            self.cache.set(cache_key, data)
-
+        if not use_cache:
+            with span("sparql"):
+                data, _ = await self._guarded_request(final_query, cache_key)
+            note_validator(None, cache_key)
+            return data
+
+        if self.recorder is not None:
+            self.recorder.record(limit, final_query)
+
+        cached = None if cache_bypass.get() else self.cache.get(cache_key)
+        if cached is not None:
+            note_validator(self.cache, cache_key)
+            return cached
+
+        async def fetch() -> SparqlResult:
+            data, fresh = await self._guarded_request(final_query, cache_key)
+            if fresh:
+                self.cache.set(cache_key, data)
+            return data
+
+        # In-process single-flight, then across workers when the cache is shared
+        lease_s = settings.HTTP_TIMEOUT_S * 4  # three attempts plus backoff
+        with span("sparql"):
+            data = await self._flights.do(cache_key, lambda: self.cache.coalesce(cache_key, fetch, lease_s))
+        note_validator(self.cache, cache_key)
         return data
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+from collections import deque
+from typing import TYPE_CHECKING, Any, AsyncIterator, Deque, Dict, List, Optional, Tuple
+import asyncio
+import re
+
+from services.normalize import sparql_json_to_rows
+
+if TYPE_CHECKING:
+    from services.sparql_client import SparqlClient
+
+# IRIs, string literals (short and long forms) and comments: their content is never SPARQL syntax
+_OPAQUE = re.compile(
+    r'"""[\s\S]*?"""'
+    r"|'''[\s\S]*?'''"
+    r'|"(?:[^"\\\n]|\\.)*"'
+    r"|'(?:[^'\\\n]|\\.)*'"
+    r"|<[^<>\"{}|^`\\\s]*>"
+    r"|#[^\n]*"
+)
+
+# Trailing LIMIT / OFFSET of the outer query, in either order
+_TRAILING = re.compile(r"(?:\s+(LIMIT|OFFSET)\s+(\d+))+\s*$", re.IGNORECASE)
+_MODIFIER = re.compile(r"(LIMIT|OFFSET)\s+(\d+)", re.IGNORECASE)
+_ORDER_BY = re.compile(r"\bORDER\s+BY\b", re.IGNORECASE)
+# PREFIX / BASE declarations (matched on the masked query: their IRIs are blanks)
+_PROLOGUE = re.compile(r"(?:\s*(?:PREFIX\s+[\w.-]*:|BASE)\s*)*", re.IGNORECASE)
+
+
+def _mask(query: str) -> str:
+    """
+    Same length as `query`, with IRIs, literals and comments blanked out.
+    """
+    return _OPAQUE.sub(lambda m: " " * len(m.group(0)), query)
+
+
+def split_limit_offset(query: str) -> Tuple[str, Optional[int], Optional[int]]:
+    """
+    (query without its outer LIMIT/OFFSET, limit, offset). Sub-query LIMITs (inside
+    braces) and the word LIMIT inside IRIs or literals are left alone.
+    """
+    query = query.strip()
+    masked = _mask(query)
+    m = _TRAILING.search(masked)
+    if not m or "}" in masked[m.start():]:
+        return query, None, None
+
+    limit: Optional[int] = None
+    offset: Optional[int] = None
+    for kw, n in _MODIFIER.findall(masked[m.start():]):
+        if kw.upper() == "LIMIT":
+            limit = int(n)
+        else:
+            offset = int(n)
+    return query[:m.start()].rstrip(), limit, offset
+
+
+def split_prologue(query: str) -> Tuple[str, str]:
+    """
+    (PREFIX/BASE declarations, rest of the query).
+    """
+    end = _PROLOGUE.match(_mask(query)).end()
+    return query[:end].strip(), query[end:].strip()
+
+
+def has_outer_order_by(query: str) -> bool:
+    masked = _mask(query)
+    tail = masked[masked.rfind("}") + 1:]
+    return bool(_ORDER_BY.search(tail))
+
+
+async def paginate(
+    sparql: "SparqlClient",
+    query: str,
+    page_size: int,
+    max_rows: int,
+    concurrency: int = 4,
+    use_cache: bool = True,
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Yields the rows of `query` page by page (LIMIT page_size OFFSET k*page_size),
+    in order, with up to `concurrency` pages fetched ahead. Stops at the first short
+    page, at the query's own LIMIT, or at `max_rows`.
+
+    The query needs an outer ORDER BY: without it the endpoint may return
+    overlapping or missing rows between pages. The ordered query is wrapped in a
+    sub-SELECT and only the outer one is paged: Virtuoso rejects a sorted query
+    whose OFFSET + LIMIT exceeds MaxSortedTopRows (error SR353, 10000 rows on
+    dbpedia.org), not a plain page over a sorted sub-query.
+    """
+    body, own_limit, own_offset = split_limit_offset(query)
+    if not has_outer_order_by(body):
+        raise ValueError("paged queries need an outer ORDER BY for stable pages")
+    prologue, select = split_prologue(body)
+    wrapped = f"{prologue}\n\nSELECT * WHERE {{\n{{\n{select}\n}}\n}}".lstrip()
+
+    page_size = max(1, int(page_size))
+    total = max(0, int(max_rows))
+    if own_limit is not None:
+        total = min(total, own_limit)
+    start = own_offset or 0
+
+    async def fetch(offset: int, size: int) -> List[Dict[str, Any]]:
+        data = await sparql.query(
+            query=f"{wrapped}\nLIMIT {size}\nOFFSET {offset}",
+            endpoint="dbpedia",
+            limit=size,
+            use_cache=use_cache,
+            max_limit=size,
+        )
+        return list(sparql_json_to_rows(data))
+
+    pending: Deque[Tuple[int, "asyncio.Task[List[Dict[str, Any]]]"]] = deque()
+    scheduled = 0
+
+    def schedule() -> None:
+        nonlocal scheduled
+        while len(pending) < max(1, concurrency) and scheduled < total:
+            size = min(page_size, total - scheduled)
+            pending.append((size, asyncio.ensure_future(fetch(start + scheduled, size))))
+            scheduled += size
+
+    try:
+        schedule()
+        while pending:
+            size, task = pending.popleft()
+            rows = await task
+            if rows:
+                yield rows
+            if len(rows) < size:
+                break  # end of the result set
+            schedule()
+    finally:
+        for _, task in pending:
+            task.cancel()
@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+from itertools import repeat
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Sequence, Union, overload
+import json
+import sys
+
+try:
+    import orjson  # fast path (C parser)
+except Exception:
+    orjson = None
+
+# A column attribute (type, xml:lang, datatype) is either one value shared by every
+# row (the common case: ?s always an IRI, no lang) or a per-row list
+_Attr = Union[None, str, List[Optional[str]]]
+
+
+def loads(content: Union[bytes, str]) -> Any:
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def _compact(values: List[Optional[str]]) -> _Attr:
+    if not values:
+        return None
+    first = values[0]
+    if values.count(first) == len(values):
+        return first
+    return [sys.intern(v) if v else None for v in values]
+
+
+def _attr_at(attr: _Attr, i: int) -> Optional[str]:
+    return attr[i] if isinstance(attr, list) else attr
+
+
+class SparqlResult:
+    """
+    Columnar SPARQL SELECT result: one value list per variable (None = unbound),
+    IRIs and repeated attributes interned. Much smaller than the raw binding dicts,
+    this is the form kept in the cache.
+
+    `rows()` gives lazy read-only row views ({var: value}); `to_json()` rebuilds
+    the standard SPARQL JSON when a route must return it verbatim.
+    """
+
+    __slots__ = ("vars", "columns", "types", "langs", "datatypes", "n", "typed")
+
+    def __init__(self, vars: List[str], columns: Dict[str, List[Optional[str]]],
+                 types: Dict[str, _Attr], langs: Dict[str, _Attr], datatypes: Dict[str, _Attr], n: int):
+        self.vars = vars
+        self.columns = columns
+        self.types = types
+        self.langs = langs
+        self.datatypes = datatypes
+        self.n = n
+        # converted columns (normalize.typed_columns), built on first typed read
+        self.typed: Optional[Dict[str, List[Any]]] = None
+
+    @classmethod
+    def from_json(cls, data: Any) -> "SparqlResult":
+        if isinstance(data, SparqlResult):
+            return data
+        data = data if isinstance(data, dict) else {}
+        bindings = (data.get("results") or {}).get("bindings") or []
+        bindings = [b for b in bindings if isinstance(b, dict)]
+        vars = list((data.get("head") or {}).get("vars") or [])
+        seen = set(vars)
+        for b in bindings:
+            for k in b:
+                if k not in seen:
+                    seen.add(k)
+                    vars.append(k)
+
+        intern = sys.intern
+        vars = [intern(v) for v in vars]
+        columns: Dict[str, List[Optional[str]]] = {}
+        types: Dict[str, _Attr] = {}
+        langs: Dict[str, _Attr] = {}
+        datatypes: Dict[str, _Attr] = {}
+        for var in vars:
+            # This runs on every upstream response: keep it to C-level loops where possible
+            cells = list(map(dict.get, bindings, repeat(var)))
+            try:
+                # C-level map() over dict.get: no Python frame per cell
+                kinds = list(map(dict.get, cells, repeat("type")))
+                values = list(map(dict.get, cells, repeat("value")))
+                kind = _compact(kinds)
+                if kind == "uri":
+                    lang_col = dt_col = []  # IRIs carry neither
+                else:
+                    lang_col = list(map(dict.get, cells, repeat("xml:lang")))
+                    dt_col = list(map(dict.get, cells, repeat("datatype")))
+            except TypeError:
+                # unbound (None) or non-dict cells: slow path
+                cells = [c if c is None or type(c) is dict else {"value": str(c)} for c in cells]
+                kinds = [c.get("type") if c is not None else None for c in cells]
+                values = [c.get("value") if c is not None else None for c in cells]
+                lang_col = [c.get("xml:lang") if c is not None else None for c in cells]
+                dt_col = [c.get("datatype") if c is not None else None for c in cells]
+                kind = _compact(kinds)
+
+            # IRIs repeat a lot across rows and cached results: keep one copy of each
+            if kind == "uri":
+                values = list(map(intern, values))
+            elif isinstance(kind, list) and "uri" in kinds:
+                try:
+                    values = list(map(intern, values))  # literals too: cheaper than a per-cell test
+                except TypeError:
+                    values = [intern(v) if k == "uri" and v is not None else v for v, k in zip(values, kinds)]
+
+            columns[var] = values
+            types[var] = kind
+            langs[var] = _compact(lang_col)
+            datatypes[var] = _compact(dt_col)
+
+        return cls(vars, columns, types, langs, datatypes, len(bindings))
+
+    def __len__(self) -> int:
+        return self.n
+
+    def rows(self, columns: Optional[Dict[str, List[Any]]] = None) -> "RowsView":
+        return RowsView(self, columns)
+
+    def lang(self, var: str, i: int) -> Optional[str]:
+        attr = self.langs.get(var)
+        return _attr_at(attr, i) if attr is not None else None
+
+    def binding(self, i: int) -> Dict[str, Dict[str, str]]:
+        out: Dict[str, Dict[str, str]] = {}
+        for var in self.vars:
+            value = self.columns[var][i]
+            if value is None:
+                continue
+            cell = {"type": _attr_at(self.types[var], i) or "literal", "value": value}
+            lang = _attr_at(self.langs[var], i)
+            if lang:
+                cell["xml:lang"] = lang
+            dt = _attr_at(self.datatypes[var], i)
+            if dt:
+                cell["datatype"] = dt
+            out[var] = cell
+        return out
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "head": {"vars": list(self.vars)},
+            "results": {"bindings": [self.binding(i) for i in range(self.n)]},
+        }
+
+
+class RowView(Mapping[str, Any]):
+    """
+    Read-only {var: value} view of one row (unbound variables are absent).
+    `lang(var)` gives the literal's language tag.
+    """
+
+    __slots__ = ("_res", "_cols", "_i")
+
+    def __init__(self, res: SparqlResult, i: int, columns: Optional[Dict[str, List[Any]]] = None):
+        self._res = res
+        self._cols = res.columns if columns is None else columns
+        self._i = i
+
+    def lang(self, key: str) -> Optional[str]:
+        return self._res.lang(key, self._i)
+
+    def __getitem__(self, key: str) -> Any:
+        col = self._cols.get(key)
+        if col is None:
+            raise KeyError(key)
+        value = col[self._i]
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def get(self, key: str, default: Any = None) -> Any:
+        # Mapping.get goes through __getitem__ + KeyError: this is the hot accessor
+        col = self._cols.get(key)
+        if col is None:
+            return default
+        value = col[self._i]
+        return default if value is None else value
+
+    def __iter__(self) -> Iterator[str]:
+        i, cols = self._i, self._cols
+        return (v for v in self._res.vars if cols[v][i] is not None)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return f"RowView({dict(self)!r})"
+
+
+class RowsView(Sequence[RowView]):
+    __slots__ = ("_res", "_cols")
+
+    def __init__(self, res: SparqlResult, columns: Optional[Dict[str, List[Any]]] = None):
+        self._res = res
+        self._cols = res.columns if columns is None else columns
+
+    def __len__(self) -> int:
+        return self._res.n
+
+    @overload
+    def __getitem__(self, i: int) -> RowView: ...
+
+    @overload
+    def __getitem__(self, i: slice) -> List[RowView]: ...
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [RowView(self._res, j, self._cols) for j in range(*i.indices(self._res.n))]
+        if i < 0:
+            i += self._res.n
+        if not 0 <= i < self._res.n:
+            raise IndexError(i)
+        return RowView(self._res, i, self._cols)
+
+    def __iter__(self) -> Iterator[RowView]:
+        res, cols = self._res, self._cols
+        return (RowView(res, i, cols) for i in range(res.n))
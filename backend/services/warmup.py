@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from collections import Counter
+from contextvars import ContextVar
+from threading import Lock
+import asyncio
+import json
+import logging
+import os
+import time
+
+from services.cache import cache_bypass
+
+logger = logging.getLogger(__name__)
+
+WarmupJob = Tuple[str, Callable[[], Awaitable[Any]]]
+
+# Warm-up traffic must not count as production traffic in the recorder
+_warming: ContextVar[bool] = ContextVar("warming", default=False)
+
+
+class QueryRecorder:
+    """
+    Counts cached SPARQL queries (limit + final query text) so the hottest ones
+    can be replayed after a deploy. Bounded: the rarest half is dropped when full.
+    """
+
+    def __init__(self, max_items: int = 5000):
+        self.max_items = max(10, int(max_items))
+        self._counts: "Counter[Tuple[int, str]]" = Counter()
+        self._lock = Lock()
+
+    def record(self, limit: int, query: str) -> None:
+        if _warming.get():
+            return
+        with self._lock:
+            self._counts[(int(limit), query)] += 1
+            if len(self._counts) > self.max_items:
+                self._counts = Counter(dict(self._counts.most_common(self.max_items // 2)))
+
+    def top(self, n: int) -> List[Tuple[int, str]]:
+        with self._lock:
+            return [key for key, _ in self._counts.most_common(n)]
+
+    def save(self, path: str) -> None:
+        with self._lock:
+            items = [{"limit": k[0], "query": k[1], "count": c} for k, c in self._counts.most_common()]
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(items, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    def load(self, path: str) -> int:
+        if not os.path.exists(path):
+            return 0
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                items = json.load(f)
+            with self._lock:
+                for it in items:
+                    self._counts[(int(it["limit"]), str(it["query"]))] += int(it.get("count", 1))
+            return len(items)
+        except Exception as e:
+            logger.warning("Could not load recorded queries from %s: %s", path, e)
+            return 0
+
+
+@dataclass
+class WarmupStatus:
+    state: str = "idle"  # idle | running | done
+    runs: int = 0
+    total: int = 0
+    done: int = 0
+    failed: int = 0
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    time_to_warm_s: Optional[float] = None
+    errors: List[str] = field(default_factory=list)
+
+    def as_dict(self) -> Dict[str, Any]:
+        elapsed = None
+        if self.started_at is not None:
+            elapsed = round((self.finished_at or time.time()) - self.started_at, 3)
+        return {
+            "state": self.state,
+            "runs": self.runs,
+            "total": self.total,
+            "done": self.done,
+            "failed": self.failed,
+            "progress": round(self.done / self.total, 3) if self.total else 0.0,
+            "elapsed_s": elapsed,
+            "time_to_warm_s": self.time_to_warm_s,
+            "errors": self.errors[-10:],
+        }
+
+
+class WarmupRunner:
+    """
+    Replays warm-up jobs with bounded concurrency, at startup and optionally every interval_s.
+
+    Jobs are built fresh for each run by `jobs_factory`. Scheduled runs set
+    `cache_bypass`, so entries are refreshed before they expire instead of being
+    served from the cache.
+    """
+
+    def __init__(
+        self,
+        jobs_factory: Callable[[], List[WarmupJob]],
+        concurrency: int = 4,
+        interval_s: int = 0,
+    ):
+        self.jobs_factory = jobs_factory
+        self.concurrency = max(1, int(concurrency))
+        self.interval_s = max(0, int(interval_s))
+        self.status = WarmupStatus()
+
+    async def run_once(self, refresh: bool = False) -> Dict[str, Any]:
+        jobs = self.jobs_factory()
+        st = self.status
+        st.state = "running"
+        st.runs += 1
+        st.total = len(jobs)
+        st.done = 0
+        st.failed = 0
+        st.errors = []
+        st.started_at = time.time()
+        st.finished_at = None
+
+        sem = asyncio.Semaphore(self.concurrency)
+        token = cache_bypass.set(refresh)
+        warming_token = _warming.set(True)
+
+        async def run_job(name: str, fn: Callable[[], Awaitable[Any]]) -> None:
+            async with sem:
+                try:
+                    await fn()
+                except Exception as e:
+                    st.failed += 1
+                    st.errors.append(f"{name}: {e}")
+                    logger.warning("Warm-up job %s failed: %s", name, e)
+                finally:
+                    st.done += 1
+                    if st.done % 10 == 0 or st.done == st.total:
+                        logger.info("Warm-up progress: %d/%d (%d failed)", st.done, st.total, st.failed)
+
+        try:
+            await asyncio.gather(*(run_job(name, fn) for name, fn in jobs))
+        finally:
+            _warming.reset(warming_token)
+            cache_bypass.reset(token)
+
+        st.finished_at = time.time()
+        st.time_to_warm_s = round(st.finished_at - st.started_at, 3)
+        st.state = "done"
+        logger.info("Warm-up finished: %d jobs in %.2fs (%d failed)", st.total, st.time_to_warm_s, st.failed)
+        return st.as_dict()
+
+    async def run_forever(self) -> None:
+        await self.run_once(refresh=False)
+        while self.interval_s > 0:
+            await asyncio.sleep(self.interval_s)
+            await self.run_once(refresh=True)
@@ -0,0 +1,32 @@
+from services.intent_rules import _BUILTIN, Gazetteer, IntentClassifier
+
+
+def _classifier() -> IntentClassifier:
+    return IntentClassifier(Gazetteer(_BUILTIN), min_confidence=0.7)
+
+
+def test_exact_gazetteer_label_bypasses_the_llm():
+    res = _classifier().confident("Dans quel club joue Lionel Messi ?")
+    assert res is not None
+    assert (res.intent, res.entity, res.source) == ("player_club", "Lionel Messi", "pattern+gazetteer")
+
+
+def test_other_ronaldo_is_left_to_the_llm():
+    clf = _classifier()
+    assert clf.confident("Où joue Ronaldo Nazario ?") is None
+    res = clf.classify("Où joue Ronaldo Nazario ?")
+    assert res.entity == "Ronaldo Nazario"
+    assert res.confidence < clf.min_confidence
+
+
+def test_relative_of_a_known_player_is_left_to_the_llm():
+    clf = _classifier()
+    assert clf.confident("Dans quel club joue le fils de Zidane ?") is None
+    assert clf.classify("Dans quel club joue le fils de Zidane ?").entity == "fils de Zidane"
+
+
+def test_homonym_club_is_left_to_the_llm():
+    clf = _classifier()
+    assert clf.confident("Quel est le stade de Barcelona SC ?") is None
+    assert clf.classify("Quel est le stade de Barcelona SC ?").entity == "Barcelona SC"
+    assert clf.confident("Barcelona SC") is None
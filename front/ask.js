@@ -38,18 +38,10 @@ async function handleAsk() {
     statusEl.innerHTML = `<span class="loading-dots">L'IA prépare une réponse pédagogique via DBpedia</span>`;
 
     try {
-        const response = await fetch(`${API_BASE}/ask`, {
-            method: "POST",
-            headers: { "Content-Type": "application/json" },
-            body: JSON.stringify({ question: question, endpoint: "dbpedia" })
-        });
-
-        if (!response.ok) throw new Error(`Erreur serveur (${response.status})`);
+        const answer = window.EventSource ? await askStream(question) : await askOnce(question);
 
-        const data = await response.json();
-        
         // Ajouter la réponse formatée de l'IA
-        addMessage(data.answer, 'ai');
+        addMessage(answer, 'ai');
         statusEl.innerText = "Réponse générée avec succès.";
     } catch (err) {
         console.error(err);
@@ -61,6 +53,63 @@ async function handleAsk() {
     }
 }
 
+/**
+ * /ask classique (une seule réponse JSON)
+ */
+async function askOnce(question) {
+    const response = await fetch(`${API_BASE}/ask`, {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ question: question, endpoint: "dbpedia" })
+    });
+
+    if (!response.ok) throw new Error(`Erreur serveur (${response.status})`);
+
+    const data = await response.json();
+    return data.answer;
+}
+
+/**
+ * /ask/stream (Server-Sent Events) : chaque étape met à jour le statut dès qu'elle est prête
+ */
+function askStream(question) {
+    return new Promise((resolve, reject) => {
+        const es = new EventSource(`${API_BASE}/ask/stream?question=${encodeURIComponent(question)}`);
+        let answer = null;
+
+        const setStatus = (text) => {
+            const span = document.createElement("span");
+            span.className = "loading-dots";
+            span.textContent = text;  // l'entité vient de la question : pas d'innerHTML
+            statusEl.replaceChildren(span);
+        };
+
+        es.addEventListener("intent", (e) => {
+            const d = JSON.parse(e.data);
+            const what = d.intent === "club_stadium" ? "stade" : "clubs";
+            setStatus(`Recherche (${what}) pour « ${d.entity} » sur DBpedia`);
+        });
+        es.addEventListener("sparql", () => setStatus("Requête SPARQL envoyée à DBpedia"));
+        es.addEventListener("rows", (e) => {
+            const d = JSON.parse(e.data);
+            setStatus(`${d.rows.length} résultat(s) reçu(s), rédaction de la réponse`);
+        });
+        es.addEventListener("answer", (e) => {
+            answer = JSON.parse(e.data).answer;
+        });
+        es.addEventListener("done", () => {
+            es.close();
+            answer !== null ? resolve(answer) : reject(new Error("Réponse vide"));
+        });
+        es.addEventListener("error", (e) => {
+            es.close();
+            // Erreur applicative (event "error" avec data) ou coupure réseau
+            const detail = e.data ? JSON.parse(e.data).detail : "connexion interrompue";
+            reject(new Error(detail));
+        });
+    });
+}
+
 // Events
 document.getElementById("askBtn").addEventListener("click", handleAsk);
 document.getElementById("askQuestion").addEventListener("keypress", (e) => {
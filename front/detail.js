@@ -1,3 +1,5 @@
+const API_BASE = "http://127.0.0.1:8000";
+
 document.addEventListener("DOMContentLoaded", () => {
 
     const params = new URLSearchParams(window.location.search);
@@ -12,50 +14,21 @@ document.addEventListener("DOMContentLoaded", () => {
         uri = uri.replace("/page/", "/resource/");
     }
 
-    loadEntityDetailsDirect(uri);
+    loadEntityDetails(uri);
 });
 
-async function loadEntityDetailsDirect(resourceUri) {
+async function loadEntityDetails(resourceUri) {
     const loader = document.getElementById("loading");
     const content = document.getElementById("entity-content");
 
     document.getElementById("error-msg").style.display = "none";
 
-    const sparqlQuery = `
-        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-        PREFIX dbo: <http://dbpedia.org/ontology/>
-        PREFIX foaf: <http://xmlns.com/foaf/0.1/>
-
-        SELECT DISTINCT ?property ?value ?propLabel ?valLabel WHERE {
-            <${resourceUri}> ?property ?value .
-            
-            # Filtres pour ne garder que les propriétés utiles
-            FILTER(STRSTARTS(STR(?property), "http://dbpedia.org/ontology/") || 
-                   STRSTARTS(STR(?property), "http://www.w3.org/2000/01/rdf-schema#") ||
-                   ?property = foaf:depiction || ?property = foaf:name)
-
-            # Récupérer le label de la propriété en français
-            OPTIONAL { 
-                ?property rdfs:label ?propLabel . 
-                FILTER(LANG(?propLabel) = "fr") 
-            }
-
-            # Si la valeur est une ressource, essayer d'avoir son label en français
-            OPTIONAL { 
-                ?value rdfs:label ?valLabel . 
-                FILTER(ISIRI(?value) && LANG(?valLabel) = "fr") 
-            }
-
-            # Garder français ou anglais ou sans langue
-            FILTER(!ISLITERAL(?value) || LANG(?value) = "" || LANG(?value) = "fr" || LANG(?value) = "en")
-        }
-    `;
-
-    const endpointUrl = `https://dbpedia.org/sparql?default-graph-uri=http%3A%2F%2Fdbpedia.org&query=${encodeURIComponent(sparqlQuery)}&format=application%2Fsparql-results%2Bjson`;
+    // Requête SPARQL exécutée côté backend (cache, retries, gestion maintenance DBpedia)
+    const url = `${API_BASE}/entity/detail?id=${encodeURIComponent(resourceUri)}`;
 
     try {
-        const response = await fetch(endpointUrl);
-        if (!response.ok) throw new Error(`Erreur DBpedia: ${response.status}`);
+        const response = await fetch(url);
+        if (!response.ok) throw new Error(`Erreur serveur (${response.status})`);
         
         const json = await response.json();
         const bindings = json.results.bindings;
@@ -72,7 +45,7 @@ async function loadEntityDetailsDirect(resourceUri) {
 
     } catch (err) {
         console.error(err);
-        showError("Impossible de contacter DBpedia directement.");
+        showError("Impossible de charger les données de l'entité.");
     }
 }
 
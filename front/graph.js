@@ -377,6 +377,30 @@ async function explainCurrentGraph() {
     lang: "fr"
   };
 
+  // Streaming d'abord : chaque champ s'affiche dès que le modèle l'a fini
+  try {
+    const partial = {};
+    const result = await explainStream(payload, (name, value) => {
+      partial[name] = value;
+      renderExplain(partial);
+    });
+    providerEl.textContent = result.provider || "ollama";
+    renderExplain(result.data || partial);
+    return;
+  } catch (e) {
+    // 503 : le LLM est saturé, la version non-stream serait refusée aussi (et l'ajouterait à la charge)
+    if (e.status === 503) {
+      providerEl.textContent = "";
+      titleEl.textContent = "Modèle occupé";
+      summaryEl.textContent = `Le LLM est saturé, réessaie dans ${e.retryAfter || "quelques"} secondes.`;
+      insightsEl.innerHTML = "";
+      limitsEl.innerHTML = "";
+      stepsEl.innerHTML = "";
+      return;
+    }
+    console.warn("explain stream failed, fallback to /graph/explain:", e);
+  }
+
   try {
     const resp = await fetch(`${API_BASE}/graph/explain`, {
       method: "POST",
@@ -450,6 +474,55 @@ async function explainCurrentGraph() {
     stepsEl.innerHTML = "";
   }
 }
+// POST + SSE : lit le flux à la main (EventSource ne fait que du GET)
+async function explainStream(payload, onField) {
+  const resp = await fetch(`${API_BASE}/graph/explain/stream`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify(payload)
+  });
+  if (!resp.ok || !resp.body) {
+    const err = new Error(`HTTP ${resp.status}`);
+    err.status = resp.status;
+    err.retryAfter = resp.headers.get("Retry-After");
+    throw err;
+  }
+
+  const reader = resp.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    let sep;
+    while ((sep = buffer.indexOf("\n\n")) !== -1) {
+      const block = buffer.slice(0, sep);
+      buffer = buffer.slice(sep + 2);
+
+      let event = "message";
+      let data = "";
+      for (const line of block.split("\n")) {
+        if (line.startsWith("event:")) event = line.slice(6).trim();
+        else if (line.startsWith("data:")) data += line.slice(5).trim();
+      }
+      const msg = data ? JSON.parse(data) : {};
+
+      if (event === "field") onField(msg.name, msg.value);
+      else if (event === "done") return msg;
+      else if (event === "error") {
+        const err = new Error(msg.detail || `HTTP ${msg.status}`);
+        err.status = msg.status;
+        err.retryAfter = msg.retry_after;
+        throw err;
+      }
+    }
+  }
+  throw new Error("stream ended without result");
+}
+
 function renderExplain(data) {
   const card = document.getElementById("explainCard");
   if (!card) return;